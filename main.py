@@ -10,10 +10,23 @@ import time
 
 from dotenv import load_dotenv
 
+from src.async_pipeline import DRIVE_API_URL, AioDriveBackend, AioS3Backend, AsyncSyncPipeline
+from src.bandwidth import build_limiter
+from src.drive_changes import RemoteTreeCache
+from src.drive_ids import DriveIdPool
+from src.drive_quota import DriveQuotaGovernor
+from src.drive_upload import MULTIPART_THRESHOLD, TARGET_CHUNK_SECONDS, DriveUploader
+from src.event_queue import create_event_queue
+from src.folder_cache import FolderCache
 from src.gdrive_client import GDriveClient
 from src.gdrive_oauth2_client import GDriveOAuth2Client
+from src.retry import RetryPolicy
 from src.s3_client import S3Client
+from src.spool import SpoolManager
+from src.state_store import SyncStateStore
 from src.sync_manager import SyncManager
+from src.transfer_scheduler import TransferScheduler
+from src.upload_journal import UploadJournal
 
 
 def setup_logging(log_level: str = "INFO"):
@@ -112,6 +125,43 @@ def run_sync_loop(sync_manager, sync_interval: int):
             time.sleep(sync_interval)
 
 
+def run_event_loop(sync_manager, event_queue, reconcile_interval: int, poll_wait: int = 20):
+    """Run event-driven incremental sync with a periodic full reconcile"""
+    logger = logging.getLogger(__name__)
+    last_reconcile = None
+    
+    while True:
+        try:
+            # Full sync on startup and every reconcile_interval as a safety net
+            if last_reconcile is None or time.monotonic() - last_reconcile >= reconcile_interval:
+                logger.info("Running full reconcile sync")
+                stats = sync_manager.sync()
+                log_sync_stats(stats)
+                last_reconcile = time.monotonic()
+            
+            messages = event_queue.receive(wait_seconds=poll_wait)
+            if not messages:
+                continue
+            
+            events = [event for message in messages for event in message['events']]
+            if events:
+                stats = sync_manager.sync_events(events)
+                log_sync_stats(stats)
+                if stats['errors'] > 0:
+                    logger.warning(f"{stats['errors']} event(s) failed, next reconcile will retry them")
+            
+            event_queue.ack(messages)
+        
+        except KeyboardInterrupt:
+            logger.info("Received interrupt signal, shutting down...")
+            break
+        
+        except Exception as e:
+            logger.error(f"Error during event sync: {e}", exc_info=True)
+            logger.info(f"Waiting {poll_wait} seconds before retry...")
+            time.sleep(poll_wait)
+
+
 def main():
     """Main application function"""
     # Load environment variables
@@ -137,6 +187,33 @@ def main():
         gdrive_folder_id = os.getenv('GDRIVE_FOLDER_ID')
         gdrive_credentials_path = os.getenv('GDRIVE_CREDENTIALS_PATH')
         sync_interval = int(os.getenv('SYNC_INTERVAL_SECONDS', '300'))
+        s3_list_parallelism = int(os.getenv('S3_LIST_PARALLELISM', '1'))
+        s3_inventory_manifest = os.getenv('S3_INVENTORY_MANIFEST')
+        s3_inventory_live_prefixes = [
+            p.strip() for p in os.getenv('S3_INVENTORY_LIVE_PREFIXES', '').split(',') if p.strip()
+        ]
+        
+        # Optional multipart download tuning (unset values keep the boto3 defaults)
+        mib = 1024 * 1024
+        s3_multipart_threshold = os.getenv('S3_MULTIPART_THRESHOLD_MB')
+        s3_multipart_chunksize = os.getenv('S3_MULTIPART_CHUNKSIZE_MB')
+        s3_max_concurrency = os.getenv('S3_MAX_CONCURRENCY')
+        s3_ranged_download = os.getenv('S3_RANGED_DOWNLOAD', 'false').lower() == 'true'
+        s3_download_retries = int(os.getenv('S3_DOWNLOAD_RETRIES', '0'))
+        
+        # Optional bandwidth limits in MiB/s, shared by all transfer workers
+        s3_bandwidth = build_limiter(
+            float(os.getenv('S3_DOWNLOAD_LIMIT_MB') or 0), os.getenv('S3_DOWNLOAD_LIMIT_SCHEDULE'), unit=mib
+        )
+        gdrive_bandwidth = build_limiter(
+            float(os.getenv('GDRIVE_UPLOAD_LIMIT_MB') or 0), os.getenv('GDRIVE_UPLOAD_LIMIT_SCHEDULE'), unit=mib
+        )
+        
+        # Shared retry policy for S3 and Google Drive calls failing with throttling or transient errors
+        retry_policy = RetryPolicy(
+            max_retries=int(os.getenv('MAX_RETRIES', '8')),
+            base_delay=float(os.getenv('RETRY_BASE_DELAY_SECONDS', '1'))
+        )
         
         # Initialize clients
         logger.info("Initializing S3 client...")
@@ -145,13 +222,43 @@ def main():
             secret_key=aws_secret_key,
             region=aws_region,
             bucket_name=s3_bucket,
-            endpoint_url=s3_endpoint_url  # Passa endpoint personalizzato
+            endpoint_url=s3_endpoint_url,  # Passa endpoint personalizzato
+            list_parallelism=s3_list_parallelism,
+            inventory_manifest=s3_inventory_manifest,
+            inventory_live_prefixes=s3_inventory_live_prefixes,
+            multipart_threshold=int(float(s3_multipart_threshold) * mib) if s3_multipart_threshold else None,
+            multipart_chunksize=int(float(s3_multipart_chunksize) * mib) if s3_multipart_chunksize else None,
+            max_concurrency=int(s3_max_concurrency) if s3_max_concurrency else None,
+            ranged_download=s3_ranged_download,
+            download_retries=s3_download_retries,
+            bandwidth=s3_bandwidth,
+            retry=retry_policy
         )
         
         logger.info("Initializing Google Drive client...")
         
         # Check if using OAuth2 or Service Account
         use_oauth2 = os.getenv('GDRIVE_USE_OAUTH2', 'true').lower() == 'true'
+        gdrive_list_workers = int(os.getenv('GDRIVE_LIST_WORKERS', '1'))
+        gdrive_list_mode = os.getenv('GDRIVE_LIST_MODE', 'tree').lower()
+        gdrive_multipart_threshold = os.getenv('GDRIVE_MULTIPART_THRESHOLD_MB')
+        gdrive_uploader = DriveUploader(
+            multipart_threshold=(
+                int(float(gdrive_multipart_threshold) * mib) if gdrive_multipart_threshold else MULTIPART_THRESHOLD
+            ),
+            target_seconds=float(os.getenv('GDRIVE_UPLOAD_CHUNK_SECONDS', str(TARGET_CHUNK_SECONDS))),
+            bandwidth=gdrive_bandwidth
+        )
+        
+        # Every Drive request goes through one quota governor (AIMD concurrency, backoff on 403/429)
+        gdrive_requests_per_100s = os.getenv('GDRIVE_REQUESTS_PER_100S')
+        gdrive_governor = DriveQuotaGovernor(
+            max_concurrency=int(os.getenv('GDRIVE_MAX_CONCURRENCY', '16')),
+            requests_per_100s=int(gdrive_requests_per_100s) if gdrive_requests_per_100s else None,
+            retry=retry_policy
+        )
+        # Pre-generated IDs make a retried create unable to duplicate a file or folder
+        gdrive_id_pool = DriveIdPool() if os.getenv('GDRIVE_IDEMPOTENT_CREATES', 'true').lower() == 'true' else None
         
         if use_oauth2:
             logger.info("Using OAuth2 authentication")
@@ -159,29 +266,138 @@ def main():
             gdrive_client = GDriveOAuth2Client(
                 credentials_path=gdrive_credentials_path,
                 folder_id=gdrive_folder_id,
-                token_path=token_path
+                token_path=token_path,
+                list_workers=gdrive_list_workers,
+                list_mode=gdrive_list_mode,
+                uploader=gdrive_uploader,
+                governor=gdrive_governor,
+                id_pool=gdrive_id_pool
             )
         else:
             logger.info("Using Service Account authentication (deprecated - use OAuth2)")
             gdrive_client = GDriveClient(
                 credentials_path=gdrive_credentials_path,
-                folder_id=gdrive_folder_id
+                folder_id=gdrive_folder_id,
+                list_workers=gdrive_list_workers,
+                list_mode=gdrive_list_mode,
+                uploader=gdrive_uploader,
+                governor=gdrive_governor,
+                id_pool=gdrive_id_pool
             )
         
         # Get preserve structure option (default: True to maintain S3 folder structure)
         preserve_structure = os.getenv('PRESERVE_STRUCTURE', 'true').lower() == 'true'
         
+        # Optional persistent sync state (avoids a full Google Drive listing on every run)
+        state_db_path = os.getenv('SYNC_STATE_DB')
+        state_store = SyncStateStore(state_db_path) if state_db_path else None
+        verify_interval = int(os.getenv('STATE_VERIFY_INTERVAL_SECONDS', '86400'))
+        
+        # Optional Changes API cache of the remote tree (replaces the recursive folder walk)
+        changes_state_path = os.getenv('GDRIVE_CHANGES_STATE_PATH')
+        remote_view = RemoteTreeCache(changes_state_path, gdrive_folder_id) if changes_state_path else None
+        
+        # Optional persisted folder path -> ID cache (keeps folder resolution warm across cron runs)
+        folder_cache = FolderCache(os.getenv('FOLDER_CACHE_PATH'), gdrive_folder_id)
+        
+        transfer_workers = int(os.getenv('TRANSFER_WORKERS', '1'))
+        
+        # Transfer order and optional large-file lane
+        large_file_threshold = os.getenv('LARGE_FILE_THRESHOLD_MB')
+        scheduler = TransferScheduler(
+            policy=os.getenv('TRANSFER_ORDER', 'none').lower(),
+            large_threshold=int(float(large_file_threshold) * mib) if large_file_threshold else None,
+            large_workers=int(os.getenv('LARGE_FILE_WORKERS', '1')),
+            priority_prefixes=[
+                p.strip() for p in os.getenv('TRANSFER_PRIORITY_PREFIXES', '').split(',') if p.strip()
+            ]
+        )
+        
+        # Detect same-size edits from S3 ETags (Drive md5Checksum / appProperties stamp)
+        content_check = os.getenv('CHANGE_DETECTION', 'size').lower() == 'content'
+        
+        # Stream S3 objects straight into Google Drive uploads instead of staging temp files
+        streaming = os.getenv('S3_STREAMING', 'true').lower() == 'true'
+        prefetch_depth = int(os.getenv('S3_PREFETCH_DEPTH', '2'))
+        
+        # Optional journal of open resumable uploads (interrupted uploads continue after a restart)
+        upload_journal_path = os.getenv('UPLOAD_JOURNAL_DB')
+        upload_journal = UploadJournal(upload_journal_path) if upload_journal_path else None
+        
+        # Transfer buffers: small files in memory, larger ones in SPOOL_DIR, under a shared budget
+        spool_budget = os.getenv('SPOOL_BUDGET_MB')
+        spool = SpoolManager(
+            directory=os.getenv('SPOOL_DIR') or None,
+            memory_threshold=int(float(os.getenv('SPOOL_MEMORY_THRESHOLD_MB', '1')) * mib),
+            max_bytes=int(float(spool_budget) * mib) if spool_budget else None
+        )
+        
+        # Optional asyncio execution mode (aiobotocore + aiohttp) instead of worker threads
+        async_pipeline = None
+        if os.getenv('SYNC_ENGINE', 'threads').lower() == 'asyncio':
+            async_buffer = os.getenv('ASYNC_BUFFER_MB', '256')
+            async_pipeline = AsyncSyncPipeline(
+                AioS3Backend(aws_access_key, aws_secret_key, aws_region, s3_bucket, s3_endpoint_url),
+                AioDriveBackend(
+                    gdrive_client.creds,
+                    gdrive_folder_id,
+                    base_url=os.getenv('GDRIVE_API_URL', DRIVE_API_URL)
+                ),
+                preserve_structure=preserve_structure,
+                workers=int(os.getenv('ASYNC_WORKERS', '64')),
+                folder_cache=folder_cache,
+                max_buffer_bytes=int(float(async_buffer) * mib) if async_buffer else None
+            )
+            logger.info("Sync engine: asyncio pipeline")
+            if content_check:
+                logger.warning("The asyncio sync engine compares file sizes only (CHANGE_DETECTION is not applied)")
+            if s3_bandwidth or gdrive_bandwidth:
+                logger.warning("Bandwidth limits are not applied by the asyncio sync engine")
+        
         # Initialize sync manager
-        sync_manager = SyncManager(s3_client, gdrive_client, preserve_structure=preserve_structure)
+        sync_manager = SyncManager(
+            s3_client,
+            gdrive_client,
+            preserve_structure=preserve_structure,
+            state_store=state_store,
+            verify_interval_seconds=verify_interval,
+            remote_view=remote_view,
+            folder_cache=folder_cache,
+            transfer_workers=transfer_workers,
+            async_pipeline=async_pipeline,
+            streaming=streaming,
+            prefetch_depth=prefetch_depth,
+            upload_journal=upload_journal,
+            spool=spool,
+            scheduler=scheduler,
+            content_check=content_check
+        )
         
         logger.info(f"Path handling: {'Preserve S3 folder structure' if preserve_structure else 'Flatten to root (replace / with _)'}")
         
         # Check if running in one-shot mode
         run_once = os.getenv('RUN_ONCE', 'false').lower() == 'true'
+        sync_mode = os.getenv('SYNC_MODE', 'poll').lower()
         
         if run_once:
             logger.info("Running in one-shot mode (RUN_ONCE=true)")
             run_sync_once(sync_manager)
+        elif sync_mode == 'events':
+            event_queue_type = os.getenv('EVENT_QUEUE_TYPE', 'sqs').lower()
+            if event_queue_type == 'sqs':
+                event_queue = create_event_queue(
+                    event_queue_type,
+                    os.getenv('EVENT_QUEUE_URL'),
+                    access_key=aws_access_key,
+                    secret_key=aws_secret_key,
+                    region=aws_region
+                )
+            else:
+                event_queue = create_event_queue(event_queue_type, os.getenv('EVENT_QUEUE_PATH'))
+            
+            reconcile_interval = int(os.getenv('RECONCILE_INTERVAL_SECONDS', '3600'))
+            logger.info(f"Starting event-driven sync (full reconcile every {reconcile_interval} seconds)")
+            run_event_loop(sync_manager, event_queue, reconcile_interval)
         else:
             logger.info(f"Starting sync loop (interval: {sync_interval} seconds)")
             run_sync_loop(sync_manager, sync_interval)
@@ -0,0 +1,519 @@
+"""
+Async Pipeline Module
+asyncio execution mode for the sync: S3 listing, diffing and transfers run as async
+stages connected by bounded queues, using aiobotocore for S3 and aiohttp for the
+Google Drive REST API
+"""
+
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from .drive_listing import FOLDER_MIME_TYPE
+from .s3_client import S3Client
+
+logger = logging.getLogger(__name__)
+
+DRIVE_API_URL = 'https://www.googleapis.com'
+
+
+class DriveRequestError(Exception):
+    """Error response from the Google Drive REST API"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Google Drive API error {status}: {message}")
+        self.status = status
+
+
+class AioS3Backend:
+    """Async S3 access through aiobotocore (optional dependency)"""
+    
+    def __init__(self, access_key: str, secret_key: str, region: str, bucket_name: str, endpoint_url: str = None):
+        """
+        Initialize async S3 backend (the connection is opened by `async with`)
+        
+        Args:
+            access_key: AWS access key ID or S3-compatible access key
+            secret_key: AWS secret access key or S3-compatible secret key
+            region: AWS region
+            bucket_name: S3 bucket name
+            endpoint_url: Custom S3 endpoint URL (e.g., MinIO or a local moto server)
+        """
+        self.bucket_name = bucket_name
+        self._client_config = {
+            'aws_access_key_id': access_key,
+            'aws_secret_access_key': secret_key,
+            'region_name': region
+        }
+        if endpoint_url:
+            self._client_config['endpoint_url'] = endpoint_url
+        self._client_context = None
+        self.client = None
+    
+    async def __aenter__(self):
+        try:
+            from aiobotocore.session import get_session
+        except ImportError:
+            raise ImportError("aiobotocore is required for SYNC_ENGINE=asyncio (pip install aiobotocore)")
+        
+        self._client_context = get_session().create_client('s3', **self._client_config)
+        self.client = await self._client_context.__aenter__()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self._client_context.__aexit__(*exc_info)
+        self.client = None
+    
+    async def iter_files(self) -> AsyncIterator[Dict[str, any]]:
+        """
+        Page through the bucket listing
+        
+        Yields:
+            File information dicts (key, size, etag), directory markers and placeholders
+            excluded as in S3Client.list_files()
+        """
+        paginator = self.client.get_paginator('list_objects_v2')
+        async for page in paginator.paginate(Bucket=self.bucket_name):
+            for obj in page.get('Contents', []):
+                if S3Client._is_directory_marker(obj['Key'], obj['Size']):
+                    continue
+                yield {'key': obj['Key'], 'size': obj['Size'], 'etag': obj.get('ETag', '').strip('"')}
+    
+    async def read(self, key: str) -> bytes:
+        """
+        Download an object into memory
+        
+        Args:
+            key: S3 object key
+        
+        Returns:
+            Object content
+        """
+        response = await self.client.get_object(Bucket=self.bucket_name, Key=key)
+        async with response['Body'] as body:
+            return await body.read()
+
+
+class AioDriveBackend:
+    """Async Google Drive v3 REST access through aiohttp (optional dependency)"""
+    
+    def __init__(self, credentials, folder_id: str, base_url: str = DRIVE_API_URL, connections: int = 100):
+        """
+        Initialize async Drive backend (the session is opened by `async with`)
+        
+        Args:
+            credentials: google-auth credentials (e.g. the `creds` of a Drive client)
+            folder_id: Google Drive folder ID where files are synced
+            base_url: API root, overridable to benchmark against a fake Drive HTTP server
+            connections: Maximum number of concurrent HTTP connections
+        """
+        self.credentials = credentials
+        self.folder_id = folder_id
+        self.base_url = base_url.rstrip('/')
+        self.connections = connections
+        self._session = None
+        self._refresh_lock = None
+    
+    async def __aenter__(self):
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("aiohttp is required for SYNC_ENGINE=asyncio (pip install aiohttp)")
+        
+        self._aiohttp = aiohttp
+        # Created per session: asyncio locks must not outlive the event loop of one sync
+        self._refresh_lock = asyncio.Lock()
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.connections))
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+        self._session = None
+    
+    async def _auth_header(self) -> Dict[str, str]:
+        """Bearer header, refreshing the token in a thread when it has expired"""
+        if not self.credentials.valid:
+            async with self._refresh_lock:
+                if not self.credentials.valid:
+                    from google.auth.transport.requests import Request
+                    await asyncio.to_thread(self.credentials.refresh, Request())
+        return {'Authorization': f"Bearer {self.credentials.token}"}
+    
+    async def _request(self, method: str, path: str, **kwargs) -> Dict[str, any]:
+        """
+        Send one API request
+        
+        Args:
+            method: HTTP method
+            path: Path below base_url (e.g. '/drive/v3/files')
+            **kwargs: Passed to aiohttp (params, json, data, headers)
+        
+        Returns:
+            Decoded JSON response ({} when empty)
+        """
+        headers = {**kwargs.pop('headers', {}), **await self._auth_header()}
+        async with self._session.request(method, f"{self.base_url}{path}", headers=headers, **kwargs) as response:
+            if response.status >= 400:
+                raise DriveRequestError(response.status, await response.text())
+            if response.status == 204:
+                return {}
+            return await response.json(content_type=None) or {}
+    
+    async def _list_children(self, folder_id: str) -> List[Dict[str, any]]:
+        """List every page of a folder's children"""
+        items = []
+        params = {
+            'q': f"'{folder_id}' in parents and trashed=false",
+            'fields': "nextPageToken, files(id, name, mimeType, size, modifiedTime, md5Checksum)",
+            'pageSize': '1000'
+        }
+        while True:
+            results = await self._request('GET', '/drive/v3/files', params=params)
+            items.extend(results.get('files', []))
+            if not results.get('nextPageToken'):
+                return items
+            params['pageToken'] = results['nextPageToken']
+    
+    async def list_files(self) -> Tuple[List[Dict[str, any]], Dict[str, str]]:
+        """
+        List the synced tree breadth-first, one level of folders at a time concurrently
+        
+        Returns:
+            Tuple of (file information dicts as returned by the Drive clients' list_files(),
+            dictionary mapping folder path to folder ID)
+        """
+        files = []
+        folders = {}
+        level = [(self.folder_id, '')]
+        
+        while level:
+            children = await asyncio.gather(*(self._list_children(folder_id) for folder_id, _ in level))
+            next_level = []
+            for (folder_id, path), items in zip(level, children):
+                for item in items:
+                    item_path = f"{path}/{item['name']}" if path else item['name']
+                    if item.get('mimeType') == FOLDER_MIME_TYPE:
+                        folders[item_path] = item['id']
+                        next_level.append((item['id'], item_path))
+                    else:
+                        files.append({
+                            'id': item['id'],
+                            'name': item_path,
+                            'size': int(item.get('size', 0)),
+                            'modified_time': item.get('modifiedTime'),
+                            'md5': item.get('md5Checksum'),
+                            'parent_id': folder_id
+                        })
+            level = next_level
+        
+        return files, folders
+    
+    async def upload(self, data: bytes, name: str, parent_id: str) -> str:
+        """
+        Create a file with a single multipart request
+        
+        Args:
+            data: File content
+            name: File name
+            parent_id: Parent folder ID
+        
+        Returns:
+            ID of the new file
+        """
+        with self._aiohttp.MultipartWriter('related') as body:
+            body.append(json.dumps({'name': name, 'parents': [parent_id]}),
+                        {'Content-Type': 'application/json; charset=UTF-8'})
+            body.append(data, {'Content-Type': 'application/octet-stream'})
+        
+        result = await self._request(
+            'POST', '/upload/drive/v3/files', params={'uploadType': 'multipart', 'fields': 'id'}, data=body
+        )
+        return result['id']
+    
+    async def update(self, file_id: str, data: bytes) -> bool:
+        """
+        Replace the content of a file
+        
+        Args:
+            file_id: Google Drive file ID
+            data: New content
+        
+        Returns:
+            True on success
+        """
+        await self._request(
+            'PATCH', f"/upload/drive/v3/files/{file_id}", params={'uploadType': 'media'}, data=data,
+            headers={'Content-Type': 'application/octet-stream'}
+        )
+        return True
+    
+    async def delete(self, file_id: str) -> bool:
+        """
+        Delete a file
+        
+        Args:
+            file_id: Google Drive file ID
+        
+        Returns:
+            True on success
+        """
+        await self._request('DELETE', f"/drive/v3/files/{file_id}")
+        return True
+    
+    async def get_or_create_folder(self, name: str, parent_id: str) -> str:
+        """
+        Find a folder by name under a parent, creating it if missing
+        
+        Args:
+            name: Folder name
+            parent_id: Parent folder ID
+        
+        Returns:
+            Folder ID
+        """
+        escaped = name.replace("\\", "\\\\").replace("'", "\\'")
+        results = await self._request('GET', '/drive/v3/files', params={
+            'q': f"name='{escaped}' and '{parent_id}' in parents and mimeType='{FOLDER_MIME_TYPE}' and trashed=false",
+            'fields': 'files(id)'
+        })
+        if results.get('files'):
+            return results['files'][0]['id']
+        
+        created = await self._request('POST', '/drive/v3/files', params={'fields': 'id'}, json={
+            'name': name, 'mimeType': FOLDER_MIME_TYPE, 'parents': [parent_id]
+        })
+        return created['id']
+
+
+class AsyncSyncPipeline:
+    """
+    One-way S3 -> Google Drive sync as asyncio stages
+    
+    The Drive tree is listed while the S3 listing streams into a bounded queue; the
+    diff stage consumes it and feeds a bounded transfer queue drained by `workers`
+    coroutines, so thousands of small transfers are in flight without one thread
+    each. Files are held in memory while transferred; with max_buffer_bytes set, a
+    transfer waits until its object fits in that budget (an object larger than the
+    whole budget runs alone), otherwise memory grows to workers x largest file.
+    Uses the plain listing diff (size comparison), not the state store or the
+    Changes API view.
+    """
+    
+    def __init__(
+        self,
+        s3_backend,
+        drive_backend,
+        preserve_structure: bool = True,
+        workers: int = 64,
+        queue_size: int = 1000,
+        folder_cache: Dict[str, str] = None,
+        max_buffer_bytes: int = None
+    ):
+        """
+        Initialize async pipeline
+        
+        Args:
+            s3_backend: Async S3 backend (AioS3Backend or a stand-in)
+            drive_backend: Async Drive backend (AioDriveBackend or a stand-in)
+            preserve_structure: Recreate the S3 directory structure (True) or flatten names with _
+            workers: Number of concurrent transfer coroutines
+            queue_size: Capacity of each queue between stages
+            folder_cache: Optional folder path -> ID cache shared with SyncManager
+            max_buffer_bytes: Budget for the file content held in memory by all transfers
+                              at once (None for unlimited)
+        """
+        self.s3_backend = s3_backend
+        self.drive_backend = drive_backend
+        self.preserve_structure = preserve_structure
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.folder_cache = folder_cache if folder_cache is not None else {}
+        self.max_buffer_bytes = max_buffer_bytes
+        self._folder_locks: Dict[str, asyncio.Lock] = {}
+        self._buffer_condition = None
+        self._buffered = 0
+    
+    def _get_file_identifier(self, s3_key: str) -> str:
+        """Identifier used to match files (full path, or flattened name)"""
+        return s3_key if self.preserve_structure else s3_key.replace('/', '_')
+    
+    async def _folder_for_path(self, path: str) -> str:
+        """
+        Get or create the Drive folder for a directory path
+        
+        Each path has its own lock, so concurrent transfers never create the same
+        folder twice while unrelated folders resolve in parallel.
+        
+        Args:
+            path: Directory path (e.g., 'dir1/dir2' or '' for root)
+        
+        Returns:
+            Folder ID
+        """
+        if not path:
+            return self.drive_backend.folder_id
+        if path in self.folder_cache:
+            return self.folder_cache[path]
+        
+        lock = self._folder_locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            if path not in self.folder_cache:
+                parent_path, _, name = path.rpartition('/')
+                parent_id = await self._folder_for_path(parent_path)
+                self.folder_cache[path] = await self.drive_backend.get_or_create_folder(name, parent_id)
+        return self.folder_cache[path]
+    
+    @asynccontextmanager
+    async def _buffer(self, size: int):
+        """Hold size bytes of the buffer budget while a file is in memory"""
+        if self.max_buffer_bytes is None:
+            yield
+            return
+        
+        async with self._buffer_condition:
+            await self._buffer_condition.wait_for(
+                lambda: self._buffered == 0 or self._buffered + size <= self.max_buffer_bytes
+            )
+            self._buffered += size
+        try:
+            yield
+        finally:
+            async with self._buffer_condition:
+                self._buffered -= size
+                self._buffer_condition.notify_all()
+    
+    async def _list_stage(self, s3_queue: asyncio.Queue):
+        """Stream the S3 listing into the queue, ending with None, or with the error if it fails"""
+        try:
+            async for s3_file in self.s3_backend.iter_files():
+                await s3_queue.put(s3_file)
+        except Exception as e:
+            # Not None: a partial listing must not look complete to the diff stage
+            await s3_queue.put(e)
+            raise
+        await s3_queue.put(None)
+    
+    async def _diff_stage(
+        self,
+        s3_queue: asyncio.Queue,
+        gdrive_files: List[Dict[str, any]],
+        transfer_queue: asyncio.Queue,
+        stats: Dict[str, int]
+    ):
+        """
+        Turn the S3 stream into transfer jobs against the Drive listing
+        
+        Args:
+            s3_queue: S3 file stream from the list stage
+            gdrive_files: Drive listing
+            transfer_queue: Queue of (action, identifier, s3_key, gdrive_file_id, size) jobs
+            stats: Sync statistics
+        
+        Raises:
+            Exception: The S3 listing failed (no deletes are queued)
+        """
+        gdrive_map = {f['name']: f for f in gdrive_files}
+        
+        while True:
+            s3_file = await s3_queue.get()
+            if s3_file is None:
+                break
+            if isinstance(s3_file, Exception):
+                raise s3_file
+            
+            identifier = self._get_file_identifier(s3_file['key'])
+            gdrive_file = gdrive_map.pop(identifier, None)
+            if gdrive_file is None:
+                await transfer_queue.put(('upload', identifier, s3_file['key'], None, s3_file['size']))
+            elif s3_file['size'] != int(gdrive_file.get('size', 0)):
+                await transfer_queue.put(('update', identifier, s3_file['key'], gdrive_file['id'], s3_file['size']))
+            else:
+                stats['unchanged'] += 1
+        
+        # What is left in Drive no longer exists in S3
+        for identifier, gdrive_file in gdrive_map.items():
+            await transfer_queue.put(('delete', identifier, None, gdrive_file['id'], 0))
+    
+    async def _transfer(
+        self,
+        action: str,
+        identifier: str,
+        s3_key: Optional[str],
+        gdrive_file_id: Optional[str],
+        size: int
+    ):
+        """Run one transfer job"""
+        if action == 'delete':
+            await self.drive_backend.delete(gdrive_file_id)
+            return
+        
+        if self.preserve_structure and action == 'upload':
+            # Resolve the folder before taking buffer budget
+            dir_path, _, filename = s3_key.rpartition('/')
+            parent_id = await self._folder_for_path(dir_path)
+        else:
+            filename, parent_id = identifier, self.drive_backend.folder_id
+        
+        async with self._buffer(size):
+            data = await self.s3_backend.read(s3_key)
+            if action == 'update':
+                await self.drive_backend.update(gdrive_file_id, data)
+            else:
+                await self.drive_backend.upload(data, filename, parent_id)
+    
+    async def _transfer_stage(self, transfer_queue: asyncio.Queue, stats: Dict[str, int]):
+        """Worker coroutine: run transfer jobs until the None sentinel"""
+        stat_names = {'upload': 'uploaded', 'update': 'updated', 'delete': 'deleted'}
+        while True:
+            job = await transfer_queue.get()
+            if job is None:
+                return
+            try:
+                await self._transfer(*job)
+                stats[stat_names[job[0]]] += 1
+            except Exception as e:
+                logger.error(f"Error during {job[0]} of {job[1]}: {e}")
+                stats['errors'] += 1
+    
+    async def run(self) -> Dict[str, int]:
+        """
+        Run one sync
+        
+        Returns:
+            Dictionary with sync statistics (uploaded, updated, deleted, errors, unchanged)
+        """
+        stats = {'uploaded': 0, 'updated': 0, 'deleted': 0, 'errors': 0, 'unchanged': 0}
+        self._folder_locks = {}
+        # Created per run: asyncio primitives must not outlive the event loop of one sync
+        self._buffer_condition = asyncio.Condition()
+        self._buffered = 0
+        
+        async with self.s3_backend, self.drive_backend:
+            s3_queue = asyncio.Queue(maxsize=self.queue_size)
+            transfer_queue = asyncio.Queue(maxsize=self.queue_size)
+            
+            list_task = asyncio.create_task(self._list_stage(s3_queue))
+            workers = [asyncio.create_task(self._transfer_stage(transfer_queue, stats)) for _ in range(self.workers)]
+            
+            try:
+                gdrive_files, folders = await self.drive_backend.list_files()
+                self.folder_cache.clear()
+                self.folder_cache.update(folders)
+                logger.info(f"Google Drive files count: {len(gdrive_files)}")
+                
+                await self._diff_stage(s3_queue, gdrive_files, transfer_queue, stats)
+                await list_task
+            except BaseException:
+                # A failed listing leaves the diff incomplete: drop the queued jobs
+                for task in workers + [list_task]:
+                    task.cancel()
+                await asyncio.gather(*workers, list_task, return_exceptions=True)
+                raise
+            
+            for _ in workers:
+                await transfer_queue.put(None)
+            await asyncio.gather(*workers)
+        
+        return stats
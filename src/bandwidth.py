@@ -0,0 +1,212 @@
+"""
+Bandwidth Module
+Process-wide token-bucket rate limiting of transfer bytes, with optional time-of-day schedules
+"""
+
+import datetime
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BURST_SECONDS = 1.0  # Unused allowance a bucket may accumulate, in seconds of its rate
+
+
+class RateSchedule:
+    """
+    Time-of-day rates in bytes per second
+    
+    Windows are (start minute, end minute, rate) on the local clock; a window whose
+    end is before its start runs past midnight. Outside every window the default
+    rate applies. A rate of 0 means unlimited.
+    """
+    
+    def __init__(self, windows: List[Tuple[int, int, float]], default: float = 0):
+        """
+        Initialize schedule
+        
+        Args:
+            windows: List of (start minute of day, end minute of day, bytes per second)
+            default: Bytes per second outside the windows (0 for unlimited)
+        """
+        self.windows = windows
+        self.default = default
+    
+    @classmethod
+    def parse(cls, spec: str, default: float = 0, unit: float = 1) -> 'RateSchedule':
+        """
+        Parse a schedule like '08:00-19:00=2,19:00-08:00=20'
+        
+        Args:
+            spec: Comma-separated HH:MM-HH:MM=rate windows
+            default: Bytes per second outside the windows (0 for unlimited)
+            unit: Bytes per second of one rate unit (e.g. 1048576 for MiB/s)
+        
+        Returns:
+            RateSchedule
+        
+        Raises:
+            ValueError: The spec is malformed
+        """
+        windows = []
+        for window in filter(None, (part.strip() for part in spec.split(','))):
+            try:
+                times, rate = window.split('=')
+                start, end = (cls._minute_of_day(t) for t in times.split('-'))
+                windows.append((start, end, float(rate) * unit))
+            except ValueError:
+                raise ValueError(f"Invalid bandwidth schedule window '{window}' (expected HH:MM-HH:MM=rate)")
+        return cls(windows, default)
+    
+    @staticmethod
+    def _minute_of_day(value: str) -> int:
+        hours, minutes = value.strip().split(':')
+        hours, minutes = int(hours), int(minutes)
+        if not (0 <= hours <= 24 and 0 <= minutes < 60) or hours * 60 + minutes > 24 * 60:
+            raise ValueError(value)
+        return hours * 60 + minutes
+    
+    def rate_at(self, moment: datetime.datetime) -> float:
+        """
+        Get the rate in effect at a time
+        
+        Args:
+            moment: Local time
+        
+        Returns:
+            Bytes per second (0 for unlimited)
+        """
+        minute = moment.hour * 60 + moment.minute
+        for start, end, rate in self.windows:
+            if start <= end:
+                if start <= minute < end:
+                    return rate
+            elif minute >= start or minute < end:
+                return rate
+        return self.default
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every transfer in one direction
+    
+    Callers take tokens for the bytes they are about to move (or just moved). A
+    caller may take more than the bucket holds: the balance goes negative and the
+    caller sleeps until its share has been earned, so concurrent callers queue up
+    behind each other and the aggregate stays at the rate in a steady stream rather
+    than alternating between full speed and pauses. At most burst_seconds of unused
+    allowance is kept, so an idle period does not turn into a burst above the cap.
+    """
+    
+    def __init__(
+        self,
+        rate: float = 0,
+        schedule: RateSchedule = None,
+        burst_seconds: float = BURST_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        now: Callable[[], datetime.datetime] = datetime.datetime.now
+    ):
+        """
+        Initialize token bucket
+        
+        Args:
+            rate: Bytes per second (0 for unlimited); ignored when a schedule is given
+            schedule: Time-of-day rates replacing rate
+            burst_seconds: Unused allowance kept, in seconds of the current rate
+            clock: Monotonic time source
+            sleep: Sleep function
+            now: Wall clock for the schedule
+        """
+        self.schedule = schedule or RateSchedule([], rate)
+        self.burst_seconds = burst_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self._now = now
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self._updated = clock()
+        self.bytes = 0
+        self.wait_seconds = 0.0
+    
+    @property
+    def rate(self) -> float:
+        """Bytes per second currently in effect (0 for unlimited)"""
+        return self.schedule.rate_at(self._now())
+    
+    def consume(self, amount: int) -> float:
+        """
+        Take tokens for amount bytes, sleeping while the bucket is in debt
+        
+        Args:
+            amount: Bytes transferred
+        
+        Returns:
+            Seconds slept
+        """
+        rate = self.rate
+        with self._lock:
+            now = self._clock()
+            self.bytes += amount
+            if not rate:
+                self._tokens = 0.0
+                self._updated = now
+                return 0.0
+            
+            self._tokens = min(rate * self.burst_seconds, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            self._tokens -= amount
+            delay = -self._tokens / rate if self._tokens < 0 else 0.0
+            self.wait_seconds += delay
+        
+        if delay > 0:
+            self._sleep(delay)
+        return delay
+
+
+class ThrottledReader:
+    """File-like wrapper that takes tokens for every read from the wrapped stream"""
+    
+    def __init__(self, raw, bucket: TokenBucket):
+        """
+        Initialize reader
+        
+        Args:
+            raw: Object with read() and close() (e.g. a boto3 StreamingBody)
+            bucket: Token bucket charged for the bytes read
+        """
+        self.raw = raw
+        self.bucket = bucket
+    
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        if data:
+            self.bucket.consume(len(data))
+        return data
+    
+    def close(self):
+        self.raw.close()
+
+
+def build_limiter(rate: float = 0, schedule: str = None, unit: float = 1) -> Optional[TokenBucket]:
+    """
+    Build a token bucket from configuration values
+    
+    Args:
+        rate: Limit in units per second (0 or None for unlimited)
+        schedule: Optional time-of-day windows (see RateSchedule.parse); rate applies outside them
+        unit: Bytes per second of one rate unit (e.g. 1048576 for MiB/s)
+    
+    Returns:
+        TokenBucket, or None when no limit is configured
+    """
+    rate = (rate or 0) * unit
+    if schedule:
+        bucket = TokenBucket(schedule=RateSchedule.parse(schedule, default=rate, unit=unit))
+        logger.info(f"Bandwidth schedule: {schedule}")
+        return bucket
+    if rate:
+        return TokenBucket(rate)
+    return None
@@ -0,0 +1,110 @@
+"""
+Change Detection Module
+Decides whether an S3 object differs from its Google Drive copy beyond a size comparison:
+single-part ETags against the Drive md5Checksum, and the S3 ETag recorded in the file's
+appProperties at upload time for everything else
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, Optional
+
+ETAG_PROPERTY = 's3_etag'
+LAST_MODIFIED_PROPERTY = 's3_last_modified'
+
+_MD5_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def is_multipart_etag(etag: str) -> bool:
+    """
+    Check whether an S3 ETag belongs to a multipart upload ('<md5 of part md5s>-<parts>')
+    
+    Args:
+        etag: S3 ETag, with or without quotes
+    
+    Returns:
+        True for multipart ETags, which are not the MD5 of the content
+    """
+    return '-' in etag.strip('"')
+
+
+def source_properties(s3_file: Dict[str, any]) -> Dict[str, str]:
+    """
+    Build the appProperties stamp recording which S3 content a Drive file holds
+    
+    Args:
+        s3_file: S3 file information (etag, last_modified)
+    
+    Returns:
+        appProperties for files().create()/update() (empty when the ETag is unknown)
+    """
+    etag = s3_file.get('etag')
+    if not etag:
+        return {}
+    
+    properties = {ETAG_PROPERTY: etag.strip('"')}
+    last_modified = s3_file.get('last_modified')
+    if isinstance(last_modified, datetime):
+        properties[LAST_MODIFIED_PROPERTY] = last_modified.isoformat()
+    return properties
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def content_changed(s3_file: Dict[str, any], gdrive_file: Dict[str, any]) -> Optional[str]:
+    """
+    Compare an S3 object with its Google Drive copy
+    
+    Checks, in order: size; the ETag of the last sync known to the state store;
+    the ETag stamped into appProperties at upload time; the Drive md5Checksum
+    against a single-part ETag; and, for a multipart ETag without a stamp, whether
+    the object was modified after the Drive file was last written. Objects encrypted
+    with SSE-KMS have single-part ETags that are not MD5s; they are transferred once
+    more and compared by their stamp from then on.
+    
+    Args:
+        s3_file: S3 file information (size, etag, last_modified)
+        gdrive_file: Google Drive file information (size, md5, modified_time,
+                     app_properties, and etag when loaded from the state store)
+    
+    Returns:
+        Reason the file needs a transfer, or None when it is unchanged
+    """
+    s3_size = s3_file['size']
+    gdrive_size = int(gdrive_file.get('size', 0))
+    if s3_size != gdrive_size:
+        return f"size S3={s3_size}, GDrive={gdrive_size}"
+    
+    etag = (s3_file.get('etag') or '').strip('"')
+    if not etag:
+        return None
+    
+    synced_etag = gdrive_file.get('etag')
+    if synced_etag:
+        return None if synced_etag == etag else "ETag changed since last sync"
+    
+    stamped_etag = (gdrive_file.get('app_properties') or {}).get(ETAG_PROPERTY)
+    if stamped_etag:
+        return None if stamped_etag == etag else "ETag differs from the one stamped at upload"
+    
+    md5 = gdrive_file.get('md5')
+    if not is_multipart_etag(etag):
+        if md5 and _MD5_PATTERN.match(etag) and md5 != etag:
+            return "ETag differs from Drive md5Checksum"
+        return None
+    
+    # Multipart upload without a stamp (synced before stamping): fall back to timestamps
+    last_modified = _parse_time(s3_file.get('last_modified'))
+    gdrive_modified = _parse_time(gdrive_file.get('modified_time'))
+    if last_modified and gdrive_modified and last_modified > gdrive_modified:
+        return "S3 object modified after the Drive copy"
+    return None
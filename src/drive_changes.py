@@ -0,0 +1,250 @@
+"""
+Drive Changes Module
+Keeps a cached view of the remote Google Drive tree up to date with the
+Changes API instead of walking every folder on each sync
+"""
+
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from googleapiclient.errors import HttpError
+
+from .drive_listing import FOLDER_MIME_TYPE
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteTreeCache:
+    """
+    Cached Google Drive tree under the sync folder, refreshed from changes.list deltas
+    
+    The first refresh saves a changes.getStartPageToken cursor and lists the
+    whole tree once. Later refreshes only apply the changes since the cursor,
+    keeping nodes whose parent chain reaches the sync folder. A cursor Drive no
+    longer accepts is discarded and the tree is listed again. The cache is saved
+    as JSON so the cursor survives restarts.
+    """
+    
+    def __init__(self, state_path: str, folder_id: str):
+        """
+        Initialize remote tree cache
+        
+        Args:
+            state_path: JSON file where the cursor and tree are persisted
+            folder_id: Google Drive folder ID that is the root of the synced tree
+        """
+        self.state_path = state_path
+        self.folder_id = folder_id
+        self.page_token: Optional[str] = None
+        self.last_refresh: Optional[str] = None
+        self.nodes: Dict[str, Dict[str, any]] = {}
+        self._load()
+    
+    def _load(self):
+        """Load the persisted cursor and tree, ignoring state for another folder"""
+        if not os.path.exists(self.state_path):
+            return
+        
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable remote tree cache {self.state_path}: {e}")
+            return
+        
+        if state.get('folder_id') != self.folder_id:
+            logger.info("Remote tree cache belongs to another folder, rebuilding")
+            return
+        
+        self.page_token = state.get('page_token')
+        self.last_refresh = state.get('last_refresh')
+        self.nodes = state.get('nodes', {})
+        logger.info(f"Loaded remote tree cache: {len(self.nodes)} items")
+    
+    def save(self):
+        """Persist the cursor and tree atomically"""
+        state = {
+            'folder_id': self.folder_id,
+            'page_token': self.page_token,
+            'last_refresh': self.last_refresh,
+            'nodes': self.nodes
+        }
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+    
+    @staticmethod
+    def _to_node(item: Dict[str, any]) -> Dict[str, any]:
+        """Keep only the fields needed to rebuild paths and diff files"""
+        parents = item.get('parents') or []
+        return {
+            'name': item['name'],
+            'parent': parents[0] if parents else None,
+            'mimeType': item.get('mimeType'),
+            'size': int(item.get('size', 0)),
+            'modifiedTime': item.get('modifiedTime'),
+            'md5': item.get('md5Checksum'),
+            'app_properties': item.get('appProperties') or {}
+        }
+    
+    def refresh(self, gdrive_client):
+        """
+        Bring the cached tree up to date
+        
+        Args:
+            gdrive_client: Google Drive client providing get_start_page_token,
+                           list_changes and list_tree
+        """
+        # Same RFC 3339 format as Drive timestamps, so they compare as strings
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        
+        if not self.page_token:
+            self._rebuild(gdrive_client)
+        else:
+            try:
+                changes, self.page_token = gdrive_client.list_changes(self.page_token)
+            except HttpError as e:
+                # Expired or invalid cursor: the deltas since it are lost
+                if e.resp.status not in (400, 404):
+                    raise
+                logger.warning(f"Google Drive rejected the changes cursor, relisting the tree: {e}")
+                self.page_token = None
+                self._rebuild(gdrive_client)
+            else:
+                self._apply_changes(changes, gdrive_client)
+                logger.info(f"Applied {len(changes)} Google Drive changes to remote tree cache")
+        
+        self.last_refresh = now
+        self.save()
+    
+    def _rebuild(self, gdrive_client):
+        """
+        Replace the cached tree with a full listing and take a new cursor
+        
+        Args:
+            gdrive_client: Google Drive client providing get_start_page_token and list_tree
+        """
+        # Take the cursor before listing so nothing changed during the listing is missed
+        page_token = gdrive_client.get_start_page_token()
+        self.nodes = {item['id']: self._to_node(item) for item in gdrive_client.list_tree(self.folder_id)}
+        self.page_token = page_token
+        logger.info(f"Remote tree cache built from full listing: {len(self.nodes)} items")
+    
+    def _apply_changes(self, changes: List[Dict[str, any]], gdrive_client):
+        """
+        Apply changes.list entries to the cached tree
+        
+        Args:
+            changes: Change dicts from list_changes()
+            gdrive_client: Client used to list folders moved in from outside the tree
+        """
+        moved_in_folders = []
+        
+        for change in changes:
+            if change.get('changeType', 'file') != 'file':
+                continue
+            
+            file_id = change['fileId']
+            item = change.get('file')
+            
+            if change.get('removed') or not item or item.get('trashed'):
+                self.nodes.pop(file_id, None)
+                continue
+            
+            is_new = file_id not in self.nodes
+            self.nodes[file_id] = self._to_node(item)
+            
+            # A folder created before the last refresh but new to us was moved in:
+            # its existing children produce no changes, so they must be listed
+            created_time = item.get('createdTime')
+            if (is_new and item.get('mimeType') == FOLDER_MIME_TYPE and self.last_refresh
+                    and created_time and created_time < self.last_refresh):
+                moved_in_folders.append(file_id)
+        
+        self._prune()
+        
+        for folder_id in moved_in_folders:
+            if folder_id in self.nodes:
+                for item in gdrive_client.list_tree(folder_id):
+                    self.nodes.setdefault(item['id'], self._to_node(item))
+        
+        if moved_in_folders:
+            self._prune()
+    
+    def _paths(self) -> Dict[str, str]:
+        """
+        Resolve the path of every node reachable from the sync folder
+        
+        Returns:
+            Dictionary mapping node ID to its path relative to the sync folder
+        """
+        paths = {self.folder_id: ''}
+        
+        for node_id in self.nodes:
+            chain = []
+            current = node_id
+            while current not in paths:
+                node = self.nodes.get(current)
+                if node is None or current in chain:
+                    break  # Parent outside the tree (or a cycle)
+                chain.append(current)
+                current = node['parent']
+            else:
+                base = paths[current]
+                for chained_id in reversed(chain):
+                    name = self.nodes[chained_id]['name']
+                    base = f"{base}/{name}" if base else name
+                    paths[chained_id] = base
+        
+        del paths[self.folder_id]
+        return paths
+    
+    def _prune(self):
+        """Drop nodes that are no longer under the sync folder"""
+        reachable = self._paths()
+        removed = [node_id for node_id in self.nodes if node_id not in reachable]
+        for node_id in removed:
+            del self.nodes[node_id]
+        if removed:
+            logger.debug(f"Pruned {len(removed)} items outside the sync folder")
+    
+    def files(self) -> List[Dict[str, any]]:
+        """
+        List cached files in the same shape as the Drive clients' list_files()
+        
+        Returns:
+            List of file information dicts (id, name as full path, size, modified_time, md5,
+            app_properties, parent_id)
+        """
+        paths = self._paths()
+        return [
+            {
+                'id': node_id,
+                'name': paths[node_id],
+                'size': node['size'],
+                'modified_time': node['modifiedTime'],
+                'md5': node['md5'],
+                'app_properties': node.get('app_properties', {}),
+                'parent_id': node['parent']
+            }
+            for node_id, node in self.nodes.items()
+            if node_id in paths and node['mimeType'] != FOLDER_MIME_TYPE
+        ]
+    
+    def folders(self) -> Dict[str, str]:
+        """
+        Map cached folder paths to folder IDs
+        
+        Returns:
+            Dictionary mapping folder path to Google Drive folder ID
+        """
+        paths = self._paths()
+        return {
+            paths[node_id]: node_id
+            for node_id, node in self.nodes.items()
+            if node_id in paths and node['mimeType'] == FOLDER_MIME_TYPE
+        }
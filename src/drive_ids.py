@@ -0,0 +1,117 @@
+"""
+Drive IDs Module
+Pre-generated Google Drive file IDs, which make file and folder creation safe to retry
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+ID_BATCH_SIZE = 100
+DUPLICATE_ID_REASONS = ('duplicate', 'fileIdInUse')
+
+
+def is_duplicate_id(error: HttpError) -> bool:
+    """
+    Check whether a create was rejected because its pre-generated ID already exists
+    
+    Args:
+        error: Error raised by files().create()
+    
+    Returns:
+        True for 409 responses and duplicate-ID reasons
+    """
+    if error.resp.status == 409:
+        return True
+    details = error.error_details if isinstance(error.error_details, list) else []
+    return any(isinstance(d, dict) and d.get('reason') in DUPLICATE_ID_REASONS for d in details)
+
+
+class DriveIdPool:
+    """
+    Thread-safe pool of IDs from files().generateIds()
+    
+    A create that carries its own ID is idempotent: when a retry follows an attempt
+    that reached Drive but whose response was lost, Drive rejects the duplicate ID
+    instead of creating a second file or folder with the same name. IDs are fetched
+    in batches, so this costs one extra request per batch_size creates.
+    """
+    
+    def __init__(self, batch_size: int = ID_BATCH_SIZE):
+        """
+        Initialize ID pool
+        
+        Args:
+            batch_size: IDs requested per generateIds call (at most 1000)
+        """
+        self.batch_size = max(1, min(1000, batch_size))
+        self._ids: List[str] = []
+        self._lock = threading.Lock()
+    
+    def take(self, service) -> Optional[str]:
+        """
+        Get an unused file ID
+        
+        Args:
+            service: Drive service used to fetch a new batch when the pool is empty
+        
+        Returns:
+            File ID valid for one create, or None if generateIds returned no IDs
+        """
+        with self._lock:
+            if not self._ids:
+                response = service.files().generateIds(count=self.batch_size, space='drive').execute()
+                self._ids = list(response.get('ids') or [])
+                logger.debug(f"Fetched {len(self._ids)} pre-generated file IDs")
+                if not self._ids:
+                    logger.warning("files.generateIds returned no IDs, creating without a pre-generated ID")
+                    return None
+            return self._ids.pop()
+    
+    def assign(self, service, metadata: Dict[str, any]) -> Optional[str]:
+        """
+        Give create metadata a pre-generated ID
+        
+        Without an ID (see take()) the create is sent as is, and is not retried
+        by the DriveQuotaGovernor.
+        
+        Args:
+            service: Drive service (see take())
+            metadata: files().create() body, updated in place
+        
+        Returns:
+            The assigned ID, or None if none was available
+        """
+        file_id = self.take(service)
+        if file_id:
+            metadata['id'] = file_id
+        return file_id
+
+
+def execute_create(service, send: Callable[[], Dict[str, any]], metadata: Dict[str, any], fields: str) -> Dict[str, any]:
+    """
+    Send a create request, treating a duplicate-ID rejection as an earlier attempt that succeeded
+    
+    Args:
+        service: Drive service
+        send: Callable sending the files().create() request
+        metadata: The create body (with 'id' when assigned from a DriveIdPool)
+        fields: Fields of the response
+    
+    Returns:
+        The created (or previously created) file resource
+    
+    Raises:
+        HttpError: The create failed for another reason
+    """
+    try:
+        return send()
+    except HttpError as e:
+        if not (metadata.get('id') and is_duplicate_id(e)):
+            raise
+        logger.info(f"{metadata.get('name')} was already created by an earlier attempt (ID: {metadata['id']})")
+        return service.files().get(fileId=metadata['id'], fields=fields).execute()
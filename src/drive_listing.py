@@ -0,0 +1,304 @@
+"""
+Drive Listing Module
+Breadth-first, paginated listing of a Google Drive folder tree on a bounded thread pool
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Deque, Dict, List, Tuple
+
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+ITEM_FIELDS = "id, name, parents, mimeType, size, modifiedTime, md5Checksum, appProperties"
+# Drive rejects very long q strings; stay well below the limit
+MAX_QUERY_LENGTH = 8000
+
+
+class DriveTreeLister:
+    """
+    Walks a Drive folder tree breadth-first, following nextPageToken
+    
+    Pending folders are combined into a single query ('A' in parents or 'B' in
+    parents ...) up to max_query_length, and results are mapped back to their
+    folder with the parents field, so wide trees cost far fewer requests.
+    Batches are listed concurrently as soon as a worker is idle. Each worker
+    thread builds its own Drive service object because httplib2 is not thread-safe;
+    with a single worker the client's own service is used inline.
+    """
+    
+    def __init__(self, gdrive_client, workers: int = 1, max_query_length: int = MAX_QUERY_LENGTH):
+        """
+        Initialize tree lister
+        
+        Args:
+            gdrive_client: Google Drive client providing `service` and `_build_service()`
+            workers: Number of folder batches listed concurrently
+            max_query_length: Maximum length of the combined parents clause of one query
+                              (0 lists one folder per query)
+        """
+        self.gdrive_client = gdrive_client
+        self.workers = max(1, workers)
+        self.max_query_length = max_query_length
+        self.last_stats: Dict[str, any] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._api_calls = 0
+        self._errors = 0
+        self._strict = False
+    
+    def _service(self):
+        """Get the Drive service for the current thread"""
+        if self.workers == 1:
+            return self.gdrive_client.service
+        if not hasattr(self._local, 'service'):
+            self._local.service = self.gdrive_client._build_service()
+        return self._local.service
+    
+    def _list_batch(self, batch: Dict[str, str]) -> Tuple[List[Dict[str, any]], List[Tuple[str, str]]]:
+        """
+        List every page of the children of a batch of folders with one combined query
+        
+        A failing batch of several folders is split in two and each half is listed
+        again, so one folder that cannot be listed does not drop its siblings' subtrees;
+        only a single folder that still fails counts as an error.
+        
+        Args:
+            batch: Dictionary mapping folder ID to its path relative to the listing root
+        
+        Returns:
+            Tuple of (child items with 'path' and 'parent_id' added, subfolders as (id, path))
+        """
+        items = []
+        subfolders = []
+        page_token = None
+        parents_clause = " or ".join(f"'{folder_id}' in parents" for folder_id in batch)
+        query = f"({parents_clause}) and trashed=false" if len(batch) > 1 else f"{parents_clause} and trashed=false"
+        only_folder = next(iter(batch)) if len(batch) == 1 else None
+        
+        try:
+            while True:
+                results = self._service().files().list(
+                    q=query,
+                    fields=f"nextPageToken, files({ITEM_FIELDS})",
+                    pageSize=1000,
+                    pageToken=page_token
+                ).execute()
+                
+                with self._lock:
+                    self._api_calls += 1
+                
+                for item in results.get('files', []):
+                    # Map the item back to the batched folder it was listed from
+                    parent_id = only_folder or next((p for p in item.get('parents', []) if p in batch), None)
+                    if parent_id is None:
+                        continue
+                    path = batch[parent_id]
+                    item_path = f"{path}/{item['name']}" if path else item['name']
+                    item['path'] = item_path
+                    item['parent_id'] = parent_id
+                    items.append(item)
+                    if item.get('mimeType') == FOLDER_MIME_TYPE:
+                        subfolders.append((item['id'], item_path))
+                
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+        
+        except HttpError as e:
+            if len(batch) > 1:
+                logger.warning(f"Error listing {len(batch)} folders in one query, splitting the batch: {e}")
+                return self._list_split(batch)
+            logger.error(f"Error listing files in folder {only_folder}: {e}")
+            with self._lock:
+                self._errors += 1
+            if self._strict:
+                raise
+        
+        return items, subfolders
+    
+    def _list_split(self, batch: Dict[str, str]) -> Tuple[List[Dict[str, any]], List[Tuple[str, str]]]:
+        """List a batch of folders as two half-size batches (see _list_batch)"""
+        folder_ids = list(batch)
+        half = len(folder_ids) // 2
+        items = []
+        subfolders = []
+        for part in (folder_ids[:half], folder_ids[half:]):
+            part_items, part_subfolders = self._list_batch({folder_id: batch[folder_id] for folder_id in part})
+            items.extend(part_items)
+            subfolders.extend(part_subfolders)
+        return items, subfolders
+    
+    def _take_batch(self, pending: Deque[Tuple[str, str]]) -> Dict[str, str]:
+        """
+        Pop folders off the front of the pending list until the query length limit
+        
+        Args:
+            pending: Folders waiting to be listed, as (id, path); modified in place
+        
+        Returns:
+            Dictionary mapping folder ID to path (always at least one folder)
+        """
+        batch = {}
+        length = 0
+        while pending:
+            folder_id, path = pending[0]
+            clause_length = len(folder_id) + len(" in parents or ''")
+            if batch and length + clause_length > self.max_query_length:
+                break
+            batch[folder_id] = path
+            length += clause_length
+            pending.popleft()
+        return batch
+    
+    def walk(self, root_id: str, strict: bool = False) -> List[Dict[str, any]]:
+        """
+        List all files and folders under a folder
+        
+        Args:
+            root_id: Folder to list
+            strict: Raise on the first folder that fails to list instead of skipping it
+        
+        Returns:
+            List of raw Drive items, each with 'path' (relative to root_id) and 'parent_id'
+        """
+        start = time.monotonic()
+        self._api_calls = 0
+        self._errors = 0
+        self._strict = strict
+        all_items = []
+        folders = 1
+        # FIFO order keeps the walk breadth-first
+        pending = deque([(root_id, '')])
+        
+        if self.workers == 1:
+            while pending:
+                items, subfolders = self._list_batch(self._take_batch(pending))
+                all_items.extend(items)
+                pending.extend(subfolders)
+                folders += len(subfolders)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='drive-list') as executor:
+                running = set()
+                while pending or running:
+                    # Only submit to idle workers, so folders found meanwhile fill larger batches
+                    while pending and len(running) < self.workers:
+                        running.add(executor.submit(self._list_batch, self._take_batch(pending)))
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        items, subfolders = future.result()
+                        all_items.extend(items)
+                        pending.extend(subfolders)
+                        folders += len(subfolders)
+        
+        self._record_stats(start, folders, all_items)
+        return all_items
+    
+    def scan(self, root_id: str, strict: bool = False) -> List[Dict[str, any]]:
+        """
+        List the tree under a folder with one flat, paginated query over every visible file
+        
+        Paths are rebuilt in memory from the parent links, and items not under root_id
+        are dropped. Only worthwhile when the credentials see little besides the synced
+        tree, e.g. with the drive.file scope, which only exposes files the app created.
+        
+        Args:
+            root_id: Folder to rebuild the tree from
+            strict: Raise if a page fails instead of resolving the pages read so far
+        
+        Returns:
+            List of raw Drive items, each with 'path' (relative to root_id) and 'parent_id'
+        """
+        start = time.monotonic()
+        self._api_calls = 0
+        self._errors = 0
+        nodes = {}
+        page_token = None
+        
+        try:
+            while True:
+                results = self._service().files().list(
+                    q="trashed=false",
+                    fields=f"nextPageToken, files({ITEM_FIELDS})",
+                    pageSize=1000,
+                    pageToken=page_token
+                ).execute()
+                self._api_calls += 1
+                
+                for item in results.get('files', []):
+                    nodes[item['id']] = item
+                
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+        
+        except HttpError as e:
+            logger.error(f"Error scanning Google Drive files: {e}")
+            self._errors += 1
+            if strict:
+                raise
+        
+        all_items = self._resolve(nodes, root_id)
+        folders = 1 + sum(1 for item in all_items if item.get('mimeType') == FOLDER_MIME_TYPE)
+        self._record_stats(start, folders, all_items)
+        return all_items
+    
+    @staticmethod
+    def _resolve(nodes: Dict[str, Dict[str, any]], root_id: str) -> List[Dict[str, any]]:
+        """
+        Rebuild paths from parent links and keep the items under root_id
+        
+        Args:
+            nodes: Dictionary mapping item ID to raw Drive item
+            root_id: Folder the paths are relative to
+        
+        Returns:
+            Items under root_id with 'path' and 'parent_id' added
+        """
+        paths = {root_id: ''}
+        unreachable = set()
+        resolved = []
+        
+        for node_id in nodes:
+            chain = []
+            current = node_id
+            # Climb until reaching a resolved ancestor (or leaving the tree)
+            while current not in paths:
+                node = nodes.get(current)
+                if node is None or current in unreachable or current in chain:
+                    unreachable.update(chain)
+                    break
+                chain.append(current)
+                parents = node.get('parents') or []
+                current = next((p for p in parents if p in paths or p in nodes), parents[0] if parents else None)
+            else:
+                for chained_id in reversed(chain):
+                    node = nodes[chained_id]
+                    base = paths[current]
+                    node['path'] = f"{base}/{node['name']}" if base else node['name']
+                    node['parent_id'] = current
+                    paths[chained_id] = node['path']
+                    resolved.append(node)
+                    current = chained_id
+        
+        return resolved
+    
+    def _record_stats(self, start: float, folders: int, all_items: List[Dict[str, any]]):
+        """Store and log the stats of the listing that began at start"""
+        elapsed = time.monotonic() - start
+        self.last_stats = {
+            'api_calls': self._api_calls,
+            'folders': folders,
+            'items': len(all_items),
+            'errors': self._errors,
+            'seconds': elapsed
+        }
+        logger.info(
+            f"Listed {len(all_items)} items in {folders} folders with {self._api_calls} API calls "
+            f"in {elapsed:.2f}s (workers={self.workers})"
+        )
@@ -0,0 +1,218 @@
+"""
+Drive Quota Module
+Central governor for Google Drive API calls: tracks requests per 100 seconds, retries throttled
+calls with jittered exponential backoff and adapts the allowed concurrency with AIMD
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from email.parser import BytesParser
+from functools import partial
+from typing import Callable, Dict, TypeVar
+
+from googleapiclient.http import HttpRequest
+
+from .retry import THROTTLED, RetryPolicy, classify_error
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+QUOTA_WINDOW_SECONDS = 100  # Drive quotas are counted per 100 seconds
+
+
+class DriveQuotaGovernor:
+    """
+    Admission control for every Drive request of the process
+    
+    Each request takes one of `concurrency` slots. Successful requests grow the
+    limit additively (one slot per `concurrency` successes); a throttled response
+    halves it (at most once per backoff period, so a burst of rejections from
+    requests already in flight counts as one signal) and the request is retried
+    after an exponential backoff with jitter. The limit therefore settles just below
+    the point where Drive starts rejecting requests. With requests_per_100s set, a
+    request also waits until the last 100 seconds hold fewer than that many requests.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        initial_concurrency: int = None,
+        requests_per_100s: int = None,
+        max_retries: int = 8,
+        base_delay: float = 1.0,
+        max_delay: float = 64.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        retry: RetryPolicy = None
+    ):
+        """
+        Initialize governor
+        
+        Args:
+            max_concurrency: Upper bound for concurrent Drive requests
+            min_concurrency: Lower bound the limit never drops below
+            initial_concurrency: Starting limit (default: max_concurrency)
+            requests_per_100s: Optional cap on requests per 100 seconds (the project quota)
+            max_retries: Retries of a throttled, 5xx or interrupted request before its error is raised
+            base_delay: Backoff before the first retry, doubled for each further one
+            max_delay: Longest backoff
+            sleep: Sleep function
+            clock: Monotonic time source
+            retry: Shared retry policy, replacing max_retries, base_delay, max_delay and sleep
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.requests_per_100s = requests_per_100s
+        self.retry = retry or RetryPolicy(max_retries, base_delay, max_delay, sleep)
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._limit = float(initial_concurrency or self.max_concurrency)
+        self._in_flight = 0
+        self._window = deque()  # Start times of the requests of the last 100 seconds
+        self._decreased_at = None
+        self._stats = {'requests': 0, 'throttled': 0, 'retries': 0}
+    
+    @property
+    def concurrency(self) -> int:
+        """Number of requests currently allowed in flight"""
+        return max(self.min_concurrency, int(self._limit))
+    
+    @property
+    def request_builder(self) -> Callable[..., HttpRequest]:
+        """requestBuilder for googleapiclient.discovery.build() that sends requests through this governor"""
+        return partial(GovernedHttpRequest, governor=self)
+    
+    def requests_in_window(self) -> int:
+        """Number of requests started in the last 100 seconds"""
+        with self._condition:
+            self._expire(self._clock())
+            return len(self._window)
+    
+    def _expire(self, now: float):
+        while self._window and self._window[0] <= now - QUOTA_WINDOW_SECONDS:
+            self._window.popleft()
+    
+    def _acquire(self):
+        """Wait for a free slot (and room in the 100 second window), then take it"""
+        with self._condition:
+            while True:
+                now = self._clock()
+                self._expire(now)
+                if self._in_flight >= self.concurrency:
+                    self._condition.wait()
+                elif self.requests_per_100s and len(self._window) >= self.requests_per_100s:
+                    self._condition.wait(self._window[0] + QUOTA_WINDOW_SECONDS - now)
+                else:
+                    break
+            self._in_flight += 1
+            self._window.append(now)
+            self._stats['requests'] += 1
+    
+    def _release(self, throttled: bool = False):
+        """Free a slot and apply the AIMD update"""
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self._stats['throttled'] += 1
+                now = self._clock()
+                if self._decreased_at is None or now - self._decreased_at >= self.retry.base_delay:
+                    self._decreased_at = now
+                    self._limit = max(float(self.min_concurrency), self._limit / 2)
+                    logger.warning(f"Drive API throttled, concurrency limit lowered to {self.concurrency}")
+            else:
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            self._condition.notify_all()
+    
+    def _count_retry(self, error: BaseException, kind: str):
+        with self._condition:
+            self._stats['retries'] += 1
+    
+    def _attempt(self, request: Callable[[], T]) -> T:
+        """Send one attempt of a request in a slot, feeding its outcome to the AIMD update"""
+        self._acquire()
+        try:
+            result = request()
+        except BaseException as e:
+            self._release(throttled=classify_error(e) == THROTTLED)
+            raise
+        self._release()
+        return result
+    
+    def call(self, request: Callable[[], T], retry: bool = True) -> T:
+        """
+        Run one Drive request under the governor, retrying throttled, 5xx and interrupted attempts
+        
+        Every attempt takes its own slot; the backoff between attempts holds none.
+        
+        Args:
+            request: Callable sending the request
+            retry: False sends a single attempt (for requests that are not safe to repeat)
+        
+        Returns:
+            The request's result
+        
+        Raises:
+            HttpError: The request failed, or still failed after the retries of the policy
+        """
+        if not retry:
+            return self._attempt(request)
+        return self.retry.call(partial(self._attempt, request), 'Drive request', on_retry=self._count_retry)
+    
+    def stats(self) -> Dict[str, any]:
+        """
+        Get governor counters
+        
+        Returns:
+            Dictionary with requests, throttled, retries, concurrency and requests_per_100s
+        """
+        with self._condition:
+            stats = dict(self._stats)
+        stats['concurrency'] = self.concurrency
+        stats['requests_per_100s'] = self.requests_in_window()
+        return stats
+
+
+def _create_metadata(request: HttpRequest) -> Dict[str, any]:
+    """Decode the file metadata of a non-resumable files.create request (JSON or multipart body)"""
+    body = request.body or b''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    content_type = request.headers.get('content-type', '')
+    if content_type.startswith('multipart/'):
+        # The metadata is the first part, the media the second
+        message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        parts = message.get_payload() if message.is_multipart() else []
+        body = parts[0].get_payload(decode=True) if parts else b''
+    try:
+        metadata = json.loads(body)
+    except ValueError:
+        return {}
+    return metadata if isinstance(metadata, dict) else {}
+
+
+class GovernedHttpRequest(HttpRequest):
+    """
+    HttpRequest whose execute() and next_chunk() run through a DriveQuotaGovernor
+    
+    A non-resumable files.create without a pre-generated ID (see DriveIdPool) is
+    sent once: if its response is lost, a retry would create a duplicate file.
+    """
+    
+    def __init__(self, *args, governor: DriveQuotaGovernor, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.governor = governor
+    
+    def execute(self, http=None, num_retries=0):
+        if self.resumable is not None:
+            # A resumable upload is sent through next_chunk(), which takes a slot per chunk
+            return super().execute(http=http, num_retries=num_retries)
+        retry = self.methodId != 'drive.files.create' or bool(_create_metadata(self).get('id'))
+        return self.governor.call(partial(super().execute, http=http, num_retries=num_retries), retry=retry)
+    
+    def next_chunk(self, http=None, num_retries=0):
+        return self.governor.call(partial(super().next_chunk, http=http, num_retries=num_retries))
@@ -0,0 +1,344 @@
+"""
+Drive Upload Module
+Sends Google Drive uploads as a single multipart request for small files, or as a
+resumable session whose chunk size adapts to the measured throughput
+"""
+
+import logging
+import threading
+import time
+from functools import partial
+from typing import Callable, Dict, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaInMemoryUpload, MediaUpload
+
+from .bandwidth import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ALIGNMENT = 256 * 1024  # Resumable chunks must be multiples of 256 KiB
+MIN_CHUNK_SIZE = CHUNK_ALIGNMENT
+MAX_CHUNK_SIZE = 128 * 1024 * 1024
+INITIAL_CHUNK_SIZE = 8 * 1024 * 1024
+MULTIPART_THRESHOLD = 5 * 1024 * 1024  # Google's recommended limit for single-request uploads
+TARGET_CHUNK_SECONDS = 4.0
+EXPIRED_SESSION_STATUSES = (404, 410)
+
+# Called after each committed chunk with (session URI, bytes committed)
+ProgressCallback = Callable[[str, int], None]
+
+
+class AdaptiveChunkMedia(MediaUpload):
+    """
+    Resumable MediaUpload wrapper whose chunk size can change between requests
+    
+    Every other call is delegated to the wrapped upload, so file, stream and
+    in-memory sources all keep their own reading strategy.
+    """
+    
+    def __init__(self, media: MediaUpload, chunksize: int):
+        """
+        Initialize wrapper
+        
+        Args:
+            media: Resumable upload source
+            chunksize: Initial bytes per request
+        """
+        super().__init__()
+        self.media = media
+        self._chunksize = chunksize
+    
+    def set_chunksize(self, chunksize: int):
+        self._chunksize = chunksize
+    
+    def chunksize(self) -> int:
+        return self._chunksize
+    
+    def mimetype(self) -> str:
+        return self.media.mimetype()
+    
+    def size(self) -> Optional[int]:
+        return self.media.size()
+    
+    def resumable(self) -> bool:
+        return True
+    
+    def has_stream(self) -> bool:
+        return self.media.has_stream()
+    
+    def stream(self):
+        return self.media.stream()
+    
+    def getbytes(self, begin: int, length: int) -> bytes:
+        return self.media.getbytes(begin, length)
+    
+    def to_json(self):
+        return self.media.to_json()
+
+
+class ChunkSizer:
+    """
+    Chunk size controller for one resumable session
+    
+    After each request the throughput is measured and the next chunk is sized to
+    take about target_seconds: long enough that per-request latency is a small
+    share of the transfer, short enough that a failed request loses little. The
+    size may at most double per request and is kept a multiple of 256 KiB.
+    """
+    
+    def __init__(
+        self,
+        initial: int = INITIAL_CHUNK_SIZE,
+        minimum: int = MIN_CHUNK_SIZE,
+        maximum: int = MAX_CHUNK_SIZE,
+        target_seconds: float = TARGET_CHUNK_SECONDS
+    ):
+        """
+        Initialize chunk sizer
+        
+        Args:
+            initial: First chunk size
+            minimum: Smallest chunk size
+            maximum: Largest chunk size
+            target_seconds: Wall time each request should take
+        """
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.target_seconds = target_seconds
+        self.chunksize = self._clamp(initial)
+        self.throughput = None  # Smoothed bytes per second
+    
+    def _clamp(self, size: float) -> int:
+        aligned = int(size) // CHUNK_ALIGNMENT * CHUNK_ALIGNMENT
+        return min(self.maximum, max(self.minimum, aligned))
+    
+    def record(self, sent: int, seconds: float):
+        """
+        Account for one request and size the next one
+        
+        Args:
+            sent: Bytes acknowledged by the request
+            seconds: Wall time of the request
+        """
+        if sent <= 0 or seconds <= 0:
+            return
+        
+        measured = sent / seconds
+        self.throughput = measured if self.throughput is None else 0.5 * self.throughput + 0.5 * measured
+        self.chunksize = self._clamp(min(self.throughput * self.target_seconds, self.chunksize * 2))
+
+
+class DriveUploader:
+    """
+    Executes Drive create/update requests carrying media
+    
+    Media with a known size up to multipart_threshold is sent with the metadata in
+    one multipart request, skipping the round trip that opens a resumable session.
+    Larger (or unknown-size) media goes through a resumable session driven chunk by
+    chunk with an adaptive chunk size. Each session starts from the chunk size the
+    previous session settled on.
+    
+    One uploader is shared by all transfer workers: the settled chunk size is
+    guarded by a lock, and each upload's stats are returned by execute_with_stats()
+    (last_stats only holds those of the calling thread's last upload).
+    """
+    
+    def __init__(
+        self,
+        multipart_threshold: int = MULTIPART_THRESHOLD,
+        target_seconds: float = TARGET_CHUNK_SECONDS,
+        min_chunk_size: int = MIN_CHUNK_SIZE,
+        max_chunk_size: int = MAX_CHUNK_SIZE,
+        bandwidth: TokenBucket = None
+    ):
+        """
+        Initialize uploader
+        
+        Args:
+            multipart_threshold: Largest size sent as a single multipart request
+            target_seconds: Wall time each resumable chunk request should take
+            min_chunk_size: Smallest resumable chunk (multiple of 256 KiB)
+            max_chunk_size: Largest resumable chunk (multiple of 256 KiB)
+            bandwidth: Token bucket shared by all uploads (None for unlimited). Each request
+                       takes its bytes before it is sent
+        """
+        self.multipart_threshold = multipart_threshold
+        self.target_seconds = target_seconds
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.bandwidth = bandwidth
+        self.initial_chunk_size = INITIAL_CHUNK_SIZE
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    @property
+    def last_stats(self) -> Optional[Dict[str, any]]:
+        """Stats of the last resumable upload run by the calling thread"""
+        return getattr(self._local, 'stats', None)
+    
+    def prepare(self, media: MediaUpload) -> MediaUpload:
+        """
+        Choose how a media body is sent
+        
+        Args:
+            media: Upload source
+        
+        Returns:
+            The media body to pass to files().create()/update()
+        """
+        size = media.size()
+        if size is not None and size <= self.multipart_threshold:
+            return MediaInMemoryUpload(media.getbytes(0, size), mimetype=media.mimetype(), resumable=False)
+        
+        with self._lock:
+            chunksize = self.initial_chunk_size
+        return AdaptiveChunkMedia(media, chunksize)
+    
+    def execute(
+        self,
+        request,
+        media: MediaUpload,
+        session_uri: str = None,
+        on_progress: ProgressCallback = None
+    ):
+        """
+        Run a request built with a media body from prepare()
+        
+        Same as execute_with_stats(), returning only the API response.
+        """
+        return self.execute_with_stats(request, media, session_uri, on_progress)[0]
+    
+    def _resume_session(self, request, media: MediaUpload, session_uri: str):
+        """
+        Point a request at a saved resumable session, after the bytes Drive has committed
+        
+        Sends the status query of the resumable protocol (an empty PUT with
+        'Content-Range: bytes */<size>') and sets the public resumable_uri and
+        resumable_progress fields from the 308 answer's Range header.
+        
+        Args:
+            request: HttpRequest from files().create()/update()
+            media: The media body returned by prepare()
+            session_uri: Saved session URI
+        
+        Returns:
+            The API response if the session had already completed, otherwise None
+        
+        Raises:
+            HttpError: The query failed (404/410 when the session expired)
+        """
+        size = media.size()
+        headers = {'Content-Range': f"bytes */{'*' if size is None else size}", 'Content-Length': '0'}
+        query = partial(request.http.request, session_uri, 'PUT', headers=headers)
+        # Requests built by a DriveQuotaGovernor count the query against the quota
+        governor = getattr(request, 'governor', None)
+        resp, content = governor.call(query) if governor else query()
+        
+        if resp.status in (200, 201):
+            return request.postproc(resp, content)
+        if resp.status != 308:
+            raise HttpError(resp, content, uri=session_uri)
+        
+        request.resumable_uri = session_uri
+        committed = resp.get('range')
+        request.resumable_progress = int(committed.split('-')[1]) + 1 if committed else 0
+        return None
+    
+    def execute_with_stats(
+        self,
+        request,
+        media: MediaUpload,
+        session_uri: str = None,
+        on_progress: ProgressCallback = None
+    ) -> Tuple[any, Optional[Dict[str, any]]]:
+        """
+        Run a request built with a media body from prepare()
+        
+        Args:
+            request: HttpRequest from files().create()/update()
+            media: The media body returned by prepare()
+            session_uri: Resumable session to continue instead of opening a new one. Google
+                         Drive is first asked how many bytes it has, and the upload goes on
+                         from there; an expired session is replaced by a new one
+            on_progress: Called after each committed chunk of a resumable upload with
+                         (session URI, bytes committed), e.g. to journal the session
+        
+        Returns:
+            Tuple of (API response, stats of the resumable session: requests, seconds,
+            chunk_size and bytes_per_second; None for a multipart request)
+        
+        Raises:
+            HttpError: A request failed
+        """
+        if not media.resumable():
+            if self.bandwidth:
+                self.bandwidth.consume(media.size() or 0)
+            return request.execute(), None
+        
+        resuming = False
+        if session_uri:
+            logger.info("Resuming saved upload session")
+            try:
+                response = self._resume_session(request, media, session_uri)
+            except HttpError as e:
+                if e.resp.status not in EXPIRED_SESSION_STATUSES:
+                    raise
+                logger.warning(f"Upload session expired ({e.resp.status}), starting a new one")
+            else:
+                if response is not None:
+                    return response, None
+                resuming = True
+        
+        # A source that cannot seek bounds its own buffer, so never ask for more than its chunk
+        maximum = self.max_chunk_size if media.has_stream() else min(self.max_chunk_size, media.media.chunksize())
+        sizer = ChunkSizer(media.chunksize(), self.min_chunk_size, maximum, self.target_seconds)
+        start_time = time.monotonic()
+        requests = 0
+        response = None
+        
+        while response is None:
+            media.set_chunksize(sizer.chunksize)
+            before = request.resumable_progress
+            chunk_start = time.monotonic()
+            if self.bandwidth:
+                # Waiting for the limit counts towards the chunk time, so chunks are sized for the capped rate
+                size = media.size()
+                self.bandwidth.consume(sizer.chunksize if size is None else min(sizer.chunksize, size - before))
+            try:
+                _, response = request.next_chunk()
+            except HttpError as e:
+                if not resuming or e.resp.status not in EXPIRED_SESSION_STATUSES:
+                    raise
+                logger.warning(f"Upload session expired ({e.resp.status}), starting a new one")
+                request.resumable_uri = None
+                request.resumable_progress = 0
+                resuming = False
+                continue
+            
+            requests += 1
+            if resuming:
+                # The first request after the status query resumed the session: not a throughput sample
+                resuming = False
+            else:
+                sent = (media.size() or 0) - before if response is not None else request.resumable_progress - before
+                sizer.record(sent, time.monotonic() - chunk_start)
+            
+            if response is None and on_progress:
+                on_progress(request.resumable_uri, request.resumable_progress)
+        
+        with self._lock:
+            self.initial_chunk_size = sizer.chunksize
+        seconds = time.monotonic() - start_time
+        stats = {
+            'requests': requests,
+            'seconds': seconds,
+            'chunk_size': sizer.chunksize,
+            'bytes_per_second': sizer.throughput
+        }
+        self._local.stats = stats
+        logger.debug(
+            f"Resumable upload: {requests} requests in {seconds:.2f}s, "
+            f"chunk size settled at {sizer.chunksize // 1024} KiB"
+        )
+        return response, stats
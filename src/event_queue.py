@@ -0,0 +1,300 @@
+"""
+Event Queue Module
+Pluggable sources of S3 event notifications (ObjectCreated / ObjectRemoved)
+for event-driven incremental sync
+"""
+
+import json
+import logging
+import os
+import queue
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Union
+from urllib.parse import unquote_plus
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+
+def parse_s3_notification(notification: Union[str, Dict]) -> List[Dict[str, any]]:
+    """
+    Parse an S3 event notification into a list of key events
+    
+    Accepts direct S3 notifications ({"Records": [...]}), notifications wrapped
+    in an SNS envelope ({"Message": "<json>"}) and EventBridge events
+    ({"detail-type": "Object Created", "detail": {...}}). Test events are ignored.
+    
+    Args:
+        notification: Notification body as JSON string or already-decoded dict
+    
+    Returns:
+        List of event dicts with keys: action ('created' or 'removed'), key, size, etag, sequencer
+    """
+    if isinstance(notification, str):
+        try:
+            notification = json.loads(notification)
+        except json.JSONDecodeError:
+            logger.warning(f"Ignoring malformed event notification: {notification[:200]}")
+            return []
+    
+    # SNS envelope
+    if 'Message' in notification and 'Records' not in notification:
+        return parse_s3_notification(notification['Message'])
+    
+    events = []
+    
+    # EventBridge format
+    if 'detail-type' in notification:
+        detail_type = notification['detail-type']
+        obj = notification.get('detail', {}).get('object', {})
+        if detail_type in ('Object Created', 'Object Deleted') and 'key' in obj:
+            events.append({
+                'action': 'created' if detail_type == 'Object Created' else 'removed',
+                'key': obj['key'],
+                'size': obj.get('size'),
+                'etag': obj.get('etag'),
+                'sequencer': obj.get('sequencer', '')
+            })
+        return events
+    
+    for record in notification.get('Records', []):
+        event_name = record.get('eventName', '')
+        obj = record.get('s3', {}).get('object', {})
+        
+        if event_name.startswith('ObjectCreated'):
+            action = 'created'
+        elif event_name.startswith('ObjectRemoved'):
+            action = 'removed'
+        else:
+            logger.debug(f"Ignoring S3 event: {event_name}")
+            continue
+        
+        events.append({
+            'action': action,
+            # Keys in S3 notifications are URL-encoded
+            'key': unquote_plus(obj.get('key', '')),
+            'size': obj.get('size'),
+            'etag': obj.get('eTag'),
+            'sequencer': obj.get('sequencer', '')
+        })
+    
+    return events
+
+
+class EventQueue(ABC):
+    """
+    Base class for S3 event notification sources
+    
+    receive() returns messages as dicts with keys 'handle' (opaque, passed back
+    to ack()) and 'events' (parsed key events).
+    """
+    
+    @abstractmethod
+    def receive(self, max_messages: int = 10, wait_seconds: float = 20) -> List[Dict[str, any]]:
+        """
+        Wait for and return the next batch of messages
+        
+        Args:
+            max_messages: Maximum number of messages to return
+            wait_seconds: How long to wait for the first message
+        
+        Returns:
+            List of messages (empty if none arrived in time)
+        """
+    
+    @abstractmethod
+    def ack(self, messages: List[Dict[str, any]]):
+        """
+        Acknowledge processed messages so they are not delivered again
+        
+        Args:
+            messages: Messages previously returned by receive()
+        """
+
+
+class InMemoryEventQueue(EventQueue):
+    """In-process event queue, fed with put() (useful for tests and embedding)"""
+    
+    def __init__(self):
+        self._queue = queue.Queue()
+    
+    def put(self, notification: Union[str, Dict]):
+        """
+        Add an S3 event notification to the queue
+        
+        Args:
+            notification: Notification body as JSON string or dict
+        """
+        self._queue.put(notification)
+    
+    def receive(self, max_messages: int = 10, wait_seconds: float = 20) -> List[Dict[str, any]]:
+        messages = []
+        try:
+            notification = self._queue.get(timeout=wait_seconds) if wait_seconds > 0 else self._queue.get_nowait()
+        except queue.Empty:
+            return messages
+        
+        while True:
+            messages.append({'handle': None, 'events': parse_s3_notification(notification)})
+            if len(messages) >= max_messages:
+                break
+            try:
+                notification = self._queue.get_nowait()
+            except queue.Empty:
+                break
+        
+        return messages
+    
+    def ack(self, messages: List[Dict[str, any]]):
+        # Messages are removed from the queue when received
+        pass
+
+
+class FileEventQueue(EventQueue):
+    """
+    Event queue backed by a local JSON-lines file (one notification per line)
+    
+    The read position is stored in '<path>.offset' when messages are acknowledged,
+    so restarts continue after the last processed line.
+    """
+    
+    POLL_INTERVAL = 1.0
+    
+    def __init__(self, path: str):
+        """
+        Initialize file event queue
+        
+        Args:
+            path: Path to the JSON-lines notification file
+        """
+        self.path = path
+        self.offset_path = f"{path}.offset"
+        self._offset = 0
+        
+        if os.path.exists(self.offset_path):
+            with open(self.offset_path, 'r') as f:
+                self._offset = int(f.read().strip() or 0)
+        
+        logger.info(f"File event queue initialized: {path} (offset {self._offset})")
+    
+    def _read_lines(self, max_messages: int) -> List[Dict[str, any]]:
+        """Read complete lines after the current offset"""
+        messages = []
+        if not os.path.exists(self.path):
+            return messages
+        
+        offset = self._offset
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            while len(messages) < max_messages:
+                line = f.readline()
+                if not line or not line.endswith(b'\n'):
+                    break  # EOF or a partially written line
+                offset += len(line)
+                if line.strip():
+                    messages.append({
+                        'handle': offset,
+                        'events': parse_s3_notification(line.decode('utf-8'))
+                    })
+        
+        return messages
+    
+    def receive(self, max_messages: int = 10, wait_seconds: float = 20) -> List[Dict[str, any]]:
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            messages = self._read_lines(max_messages)
+            if messages or time.monotonic() >= deadline:
+                return messages
+            time.sleep(min(self.POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+    
+    def ack(self, messages: List[Dict[str, any]]):
+        if not messages:
+            return
+        
+        self._offset = max(self._offset, max(m['handle'] for m in messages))
+        with open(self.offset_path, 'w') as f:
+            f.write(str(self._offset))
+
+
+class SQSEventQueue(EventQueue):
+    """Event queue backed by an Amazon SQS queue receiving S3 notifications"""
+    
+    def __init__(self, queue_url: str, access_key: str = None, secret_key: str = None, region: str = None):
+        """
+        Initialize SQS event queue
+        
+        Args:
+            queue_url: SQS queue URL
+            access_key: AWS access key ID (optional, defaults to the boto3 credential chain)
+            secret_key: AWS secret access key (optional)
+            region: AWS region of the queue
+        """
+        self.queue_url = queue_url
+        self.sqs_client = boto3.client(
+            'sqs',
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region
+        )
+        logger.info(f"SQS event queue initialized: {queue_url}")
+    
+    def receive(self, max_messages: int = 10, wait_seconds: float = 20) -> List[Dict[str, any]]:
+        try:
+            response = self.sqs_client.receive_message(
+                QueueUrl=self.queue_url,
+                MaxNumberOfMessages=min(max_messages, 10),
+                WaitTimeSeconds=int(min(wait_seconds, 20))
+            )
+        except ClientError as e:
+            logger.error(f"Error receiving messages from SQS: {e}")
+            raise
+        
+        return [
+            {'handle': message['ReceiptHandle'], 'events': parse_s3_notification(message['Body'])}
+            for message in response.get('Messages', [])
+        ]
+    
+    def ack(self, messages: List[Dict[str, any]]):
+        # delete_message_batch accepts at most 10 entries per call
+        for start in range(0, len(messages), 10):
+            batch = messages[start:start + 10]
+            entries = [{'Id': str(i), 'ReceiptHandle': m['handle']} for i, m in enumerate(batch)]
+            try:
+                response = self.sqs_client.delete_message_batch(QueueUrl=self.queue_url, Entries=entries)
+                for failure in response.get('Failed', []):
+                    logger.warning(f"Failed to delete SQS message: {failure}")
+            except ClientError as e:
+                logger.error(f"Error deleting messages from SQS: {e}")
+
+
+def create_event_queue(queue_type: str, location: Optional[str] = None, **aws_config) -> EventQueue:
+    """
+    Create an event queue from configuration
+    
+    Args:
+        queue_type: 'sqs', 'file' or 'memory'
+        location: SQS queue URL or notification file path
+        **aws_config: access_key, secret_key, region for SQS
+    
+    Returns:
+        EventQueue instance
+    """
+    queue_type = queue_type.lower()
+    
+    if queue_type == 'sqs':
+        if not location:
+            raise ValueError("An SQS queue URL is required for the 'sqs' event queue")
+        return SQSEventQueue(location, **aws_config)
+    
+    if queue_type == 'file':
+        if not location:
+            raise ValueError("A file path is required for the 'file' event queue")
+        return FileEventQueue(location)
+    
+    if queue_type == 'memory':
+        return InMemoryEventQueue()
+    
+    raise ValueError(f"Unknown event queue type: {queue_type}")
@@ -0,0 +1,103 @@
+"""
+Folder Cache Module
+Folder path -> Google Drive folder ID map, optionally persisted between runs
+"""
+
+import json
+import logging
+import os
+from typing import Dict
+
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+
+def is_stale_folder_error(error: BaseException) -> bool:
+    """
+    Check whether a Drive request failed because a folder it refers to no longer exists
+    
+    Args:
+        error: Error raised by an upload into a folder
+    
+    Returns:
+        True for Drive 404 (file not found) responses
+    """
+    return isinstance(error, HttpError) and error.resp.status == 404
+
+
+class FolderCache(dict):
+    """
+    Dictionary of folder path -> Google Drive folder ID, saved as JSON when a path is given
+    
+    Entries are trusted without validation; when a cached ID turns out to be stale
+    (e.g. the folder was deleted in Google Drive), invalidate() drops it together with
+    its subtree so the folders are resolved again.
+    """
+    
+    def __init__(self, path: str = None, folder_id: str = None):
+        """
+        Initialize folder cache, loading the saved map if present
+        
+        Args:
+            path: JSON file where the map is persisted (None keeps it in memory only)
+            folder_id: Google Drive folder ID the paths are relative to; a saved map
+                       for another folder is ignored
+        """
+        super().__init__()
+        self.path = path
+        self.folder_id = folder_id
+        self._load()
+    
+    def _load(self):
+        """Load the saved map, ignoring a map for another root folder"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable folder cache {self.path}: {e}")
+            return
+        
+        if state.get('folder_id') != self.folder_id:
+            logger.info("Folder cache belongs to another folder, starting empty")
+            return
+        
+        self.update(state.get('folders', {}))
+        logger.info(f"Loaded folder cache: {len(self)} folders")
+    
+    def save(self):
+        """Persist the map atomically (no-op without a path)"""
+        if not self.path:
+            return
+        
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'folder_id': self.folder_id, 'folders': dict(self)}, f)
+        os.replace(tmp_path, self.path)
+    
+    def replace(self, folders: Dict[str, str]):
+        """
+        Replace every entry with an authoritative map (e.g. from a full Drive listing)
+        
+        Args:
+            folders: Dictionary mapping folder path to folder ID
+        """
+        self.clear()
+        self.update(folders)
+    
+    def invalidate(self, path: str):
+        """
+        Drop a folder and every folder below it
+        
+        Args:
+            path: Folder path (e.g. 'dir1/dir2')
+        """
+        prefix = f"{path}/"
+        stale = [p for p in self if p == path or p.startswith(prefix)]
+        for p in stale:
+            del self[p]
+        if stale:
+            logger.info(f"Invalidated {len(stale)} cached folders under {path}")
@@ -3,15 +3,22 @@ Google Drive Client Module
 Handles all Google Drive operations for uploading and deleting files
 """
 
+import copy
 import logging
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from google.oauth2 import service_account
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaFileUpload, MediaUpload
+
+from .drive_ids import DriveIdPool, execute_create
+from .drive_listing import FOLDER_MIME_TYPE, DriveTreeLister
+from .drive_quota import DriveQuotaGovernor
+from .drive_upload import DriveUploader, ProgressCallback
+from .folder_cache import is_stale_folder_error
 
 logger = logging.getLogger(__name__)
 
@@ -21,16 +28,32 @@ class GDriveClient:
     
     SCOPES = ['https://www.googleapis.com/auth/drive']
     
-    def __init__(self, credentials_path: str, folder_id: str):
+    def __init__(self, credentials_path: str, folder_id: str, list_workers: int = 1,
+                 list_mode: str = 'tree', uploader: DriveUploader = None,
+                 governor: DriveQuotaGovernor = None, id_pool: DriveIdPool = None):
         """
         Initialize Google Drive client
         
         Args:
             credentials_path: Path to credentials.json file
             folder_id: Google Drive folder ID where files will be synced
+            list_workers: Number of folders listed concurrently when walking the tree
+            list_mode: 'tree' walks folder by folder, 'flat' scans every visible file in one
+                       paginated query and rebuilds paths locally
+            uploader: Upload strategy (default: DriveUploader with multipart uploads for small
+                      files and adaptive resumable chunks for large ones)
+            governor: Optional quota governor every Drive request goes through (shared by clones)
+            id_pool: Optional source of pre-generated IDs for creates, so that a retried create
+                     cannot produce a duplicate file or folder (shared by clones)
         """
         self.folder_id = folder_id
         self.credentials_path = credentials_path
+        self.list_workers = list_workers
+        self.list_mode = list_mode
+        self.last_list_stats: Dict[str, any] = {}
+        self.uploader = uploader or DriveUploader()
+        self.governor = governor
+        self.id_pool = id_pool
         
         if not os.path.exists(credentials_path):
             logger.error(f"Credentials file not found: {credentials_path}")
@@ -41,53 +64,91 @@ class GDriveClient:
             credentials_path, scopes=self.SCOPES
         )
         
-        self.service = build('drive', 'v3', credentials=self.creds)
+        self.service = self._build_service()
         logger.info(f"Google Drive client initialized for folder: {folder_id}")
     
-    def _list_files_recursive(self, folder_id: str, path: str = "") -> List[Dict[str, any]]:
+    def _build_service(self):
+        """
+        Build a Drive service object
+        
+        httplib2 is not thread-safe, so each listing worker thread builds its own.
+        
+        Returns:
+            Google Drive API v3 service
+        """
+        if self.governor:
+            return build('drive', 'v3', credentials=self.creds, requestBuilder=self.governor.request_builder)
+        return build('drive', 'v3', credentials=self.creds)
+    
+    def clone(self):
+        """
+        Copy this client with its own Drive service, for use by another thread
+        
+        Returns:
+            Client sharing configuration and credentials but not the HTTP connection
+        """
+        client = copy.copy(self)
+        client.service = self._build_service()
+        return client
+    
+    def _walk(self, folder_id: str, strict: bool = False) -> List[Dict[str, any]]:
+        """
+        List all items under a folder, following every result page
+        
+        Walks the tree breadth-first, or with list_mode 'flat' runs a single scan.
+        
+        Args:
+            folder_id: ID of the folder to walk
+            strict: Raise on listing errors instead of skipping the failed folder
+            
+        Returns:
+            List of raw Drive items with 'path' and 'parent_id' added
+        """
+        lister = DriveTreeLister(self, workers=self.list_workers)
+        if self.list_mode == 'flat':
+            items = lister.scan(folder_id, strict=strict)
+        else:
+            items = lister.walk(folder_id, strict=strict)
+        self.last_list_stats = lister.last_stats
+        return items
+    
+    def _list_files_recursive(self, folder_id: str, path: str = "",
+                              folders: Dict[str, str] = None) -> List[Dict[str, any]]:
         """
         Recursively list all files in a folder and its subfolders
         
         Args:
             folder_id: ID of the folder to search
             path: Current path prefix (for tracking file locations)
+            folders: Optional dict filled with the path -> ID of every folder walked
             
         Returns:
             List of file information dictionaries
+        
+        Raises:
+            HttpError: A folder could not be listed (the tree would be incomplete)
         """
         all_files = []
         
-        try:
-            query = f"'{folder_id}' in parents and trashed=false"
-            results = self.service.files().list(
-                q=query,
-                fields="files(id, name, size, modifiedTime, mimeType)",
-                pageSize=1000
-            ).execute()
-            
-            items = results.get('files', [])
-            
-            for item in items:
-                mime_type = item.get('mimeType')
-                item_name = item['name']
-                item_path = f"{path}/{item_name}" if path else item_name
-                
-                if mime_type == 'application/vnd.google-apps.folder':
-                    # Recursively search subfolders
-                    subfolder_files = self._list_files_recursive(item['id'], item_path)
-                    all_files.extend(subfolder_files)
-                else:
-                    # It's a file, add it to the list
-                    all_files.append({
-                        'id': item['id'],
-                        'name': item_path,  # Use full path as name
-                        'size': int(item.get('size', 0)),
-                        'modified_time': item.get('modifiedTime')
-                    })
-            
-        except HttpError as e:
-            logger.error(f"Error listing files in folder {folder_id}: {e}")
-            
+        # Strict: a partial tree would make the sync re-upload (and forget) the unlisted files
+        for item in self._walk(folder_id, strict=True):
+            item_path = f"{path}/{item['path']}" if path else item['path']
+            
+            if item.get('mimeType') == FOLDER_MIME_TYPE:
+                if folders is not None:
+                    folders[item_path] = item['id']
+                continue
+            
+            all_files.append({
+                'id': item['id'],
+                'name': item_path,  # Use full path as name
+                'size': int(item.get('size', 0)),
+                'modified_time': item.get('modifiedTime'),
+                'md5': item.get('md5Checksum'),
+                'app_properties': item.get('appProperties') or {},
+                'parent_id': item['parent_id']
+            })
+        
         return all_files
     
     def list_files(self) -> List[Dict[str, any]]:
@@ -97,19 +158,99 @@ class GDriveClient:
         Returns:
             List of dictionaries containing file information (id, name, size)
         """
+        files, _ = self.list_files_with_folders()
+        return files
+    
+    def list_files_with_folders(self) -> Tuple[List[Dict[str, any]], Dict[str, str]]:
+        """
+        List all files in the Google Drive folder (recursively), with the folders walked
+        
+        Returns:
+            Tuple of (file information dicts as returned by list_files(),
+            dictionary mapping folder path to folder ID)
+        """
         try:
             logger.info(f"Listing files recursively in Google Drive folder: {self.folder_id}")
             
-            files = self._list_files_recursive(self.folder_id)
+            folders = {}
+            files = self._list_files_recursive(self.folder_id, folders=folders)
             
-            logger.info(f"Found {len(files)} files in total (including subfolders)")
-            return files
+            logger.info(f"Found {len(files)} files in total (including {len(folders)} subfolders)")
+            return files, folders
         
         except HttpError as e:
             logger.error(f"Error listing Google Drive files: {e}")
             raise
     
-    def upload_file(self, local_path: str, filename: str, parent_folder_id: str = None) -> Optional[str]:
+    def list_tree(self, root_id: str = None) -> List[Dict[str, any]]:
+        """
+        Recursively list all files and folders under a folder, as raw Drive items
+        
+        Used to (re)build the cached remote tree for the Changes API.
+        
+        Args:
+            root_id: Folder to list (if None, uses root folder_id)
+            
+        Returns:
+            List of Drive items (id, name, parents, mimeType, size, modifiedTime, md5Checksum,
+            appProperties, plus 'path' and 'parent_id')
+        """
+        return self._walk(root_id if root_id else self.folder_id, strict=True)
+    
+    def get_start_page_token(self) -> str:
+        """
+        Get the current Changes API cursor
+        
+        Returns:
+            Page token marking "now" in the change log
+        """
+        try:
+            response = self.service.changes().getStartPageToken().execute()
+            return response['startPageToken']
+        
+        except HttpError as e:
+            logger.error(f"Error getting Changes API start page token: {e}")
+            raise
+    
+    def list_changes(self, page_token: str) -> Tuple[List[Dict[str, any]], str]:
+        """
+        List all changes since a Changes API cursor
+        
+        Args:
+            page_token: Cursor from get_start_page_token() or a previous list_changes()
+            
+        Returns:
+            Tuple of (list of change dicts, new cursor to use next time)
+        """
+        changes = []
+        
+        try:
+            while True:
+                response = self.service.changes().list(
+                    pageToken=page_token,
+                    spaces='drive',
+                    pageSize=1000,
+                    fields=(
+                        "nextPageToken, newStartPageToken, changes(fileId, removed, changeType, "
+                        "file(id, name, parents, mimeType, size, modifiedTime, createdTime, md5Checksum, "
+                        "appProperties, trashed))"
+                    )
+                ).execute()
+                
+                changes.extend(response.get('changes', []))
+                
+                if 'newStartPageToken' in response:
+                    return changes, response['newStartPageToken']
+                
+                page_token = response['nextPageToken']
+        
+        except HttpError as e:
+            logger.error(f"Error listing Google Drive changes: {e}")
+            raise
+    
+    def upload_file(self, local_path: str, filename: str, parent_folder_id: str = None,
+                    session_uri: str = None, on_progress: ProgressCallback = None,
+                    app_properties: Dict[str, str] = None) -> Optional[str]:
         """
         Upload a file to Google Drive
         
@@ -117,9 +258,39 @@ class GDriveClient:
             local_path: Local file path
             filename: Name for the file in Google Drive
             parent_folder_id: Parent folder ID (if None, uses root folder_id)
+            session_uri: Saved resumable session to continue (see DriveUploader.execute)
+            on_progress: Called with (session URI, bytes committed) after each resumable chunk
+            app_properties: Optional appProperties to set on the file (e.g. the S3 source stamp)
+            
+        Returns:
+            File ID if successful, None otherwise
+        
+        Raises:
+            HttpError: The parent folder does not exist (404), so a cached folder ID can be re-resolved
+        """
+        return self.upload_media(MediaFileUpload(local_path, resumable=True), filename, parent_folder_id,
+                                 session_uri=session_uri, on_progress=on_progress,
+                                 app_properties=app_properties)
+    
+    def upload_media(self, media: MediaUpload, filename: str, parent_folder_id: str = None,
+                     session_uri: str = None, on_progress: ProgressCallback = None,
+                     app_properties: Dict[str, str] = None) -> Optional[str]:
+        """
+        Upload content from any MediaUpload (e.g. a StreamingMediaUpload) to Google Drive
+        
+        Args:
+            media: Upload source
+            filename: Name for the file in Google Drive
+            parent_folder_id: Parent folder ID (if None, uses root folder_id)
+            session_uri: Saved resumable session to continue (see DriveUploader.execute)
+            on_progress: Called with (session URI, bytes committed) after each resumable chunk
+            app_properties: Optional appProperties to set on the file (e.g. the S3 source stamp)
             
         Returns:
             File ID if successful, None otherwise
+        
+        Raises:
+            HttpError: The parent folder does not exist (404), so a cached folder ID can be re-resolved
         """
         try:
             parent_id = parent_folder_id if parent_folder_id else self.folder_id
@@ -131,13 +302,23 @@ class GDriveClient:
                 'parents': [parent_id]
             }
             
-            media = MediaFileUpload(local_path, resumable=True)
+            if app_properties:
+                file_metadata['appProperties'] = app_properties
+            if self.id_pool:
+                self.id_pool.assign(self.service, file_metadata)
             
-            file = self.service.files().create(
+            media_body = self.uploader.prepare(media)
+            request = self.service.files().create(
                 body=file_metadata,
-                media_body=media,
+                media_body=media_body,
                 fields='id'
-            ).execute()
+            )
+            file = execute_create(
+                self.service,
+                lambda: self.uploader.execute(request, media_body, session_uri, on_progress),
+                file_metadata,
+                'id'
+            )
             
             file_id = file.get('id')
             logger.info(f"Successfully uploaded file: {filename} (ID: {file_id})")
@@ -145,6 +326,8 @@ class GDriveClient:
         
         except HttpError as e:
             logger.error(f"Error uploading file {filename}: {e}")
+            if is_stale_folder_error(e):
+                raise
             return None
     
     def delete_file(self, file_id: str, filename: str) -> bool:
@@ -168,18 +351,20 @@ class GDriveClient:
             logger.error(f"Error deleting file {filename}: {e}")
             return False
     
-    def find_file_by_name(self, filename: str) -> Optional[Dict[str, any]]:
+    def find_file_by_name(self, filename: str, parent_folder_id: str = None) -> Optional[Dict[str, any]]:
         """
         Find a file in the folder by name
         
         Args:
             filename: Name of the file to find
+            parent_folder_id: Folder to search in (if None, uses root folder_id)
             
         Returns:
             File information dict if found, None otherwise
         """
         try:
-            query = f"name='{filename}' and '{self.folder_id}' in parents and trashed=false"
+            parent_id = parent_folder_id if parent_folder_id else self.folder_id
+            query = f"name='{filename}' and '{parent_id}' in parents and trashed=false"
             
             results = self.service.files().list(
                 q=query,
@@ -194,7 +379,9 @@ class GDriveClient:
             logger.error(f"Error finding file {filename}: {e}")
             return None
     
-    def update_file(self, file_id: str, local_path: str, filename: str) -> bool:
+    def update_file(self, file_id: str, local_path: str, filename: str,
+                    session_uri: str = None, on_progress: ProgressCallback = None,
+                    app_properties: Dict[str, str] = None) -> bool:
         """
         Update an existing file in Google Drive
         
@@ -202,6 +389,30 @@ class GDriveClient:
             file_id: Google Drive file ID
             local_path: Local file path
             filename: Filename (for logging purposes)
+            session_uri: Saved resumable session to continue (see DriveUploader.execute)
+            on_progress: Called with (session URI, bytes committed) after each resumable chunk
+            app_properties: Optional appProperties to set on the file (e.g. the S3 source stamp)
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        return self.update_media(file_id, MediaFileUpload(local_path, resumable=True), filename,
+                                 session_uri=session_uri, on_progress=on_progress,
+                                 app_properties=app_properties)
+    
+    def update_media(self, file_id: str, media: MediaUpload, filename: str,
+                     session_uri: str = None, on_progress: ProgressCallback = None,
+                     app_properties: Dict[str, str] = None) -> bool:
+        """
+        Update an existing file in Google Drive from any MediaUpload
+        
+        Args:
+            file_id: Google Drive file ID
+            media: New content source
+            filename: Filename (for logging purposes)
+            session_uri: Saved resumable session to continue (see DriveUploader.execute)
+            on_progress: Called with (session URI, bytes committed) after each resumable chunk
+            app_properties: Optional appProperties to set on the file (e.g. the S3 source stamp)
             
         Returns:
             True if successful, False otherwise
@@ -209,12 +420,13 @@ class GDriveClient:
         try:
             logger.info(f"Updating file in Google Drive: {filename} (ID: {file_id})")
             
-            media = MediaFileUpload(local_path, resumable=True)
-            
-            self.service.files().update(
+            media_body = self.uploader.prepare(media)
+            request = self.service.files().update(
                 fileId=file_id,
-                media_body=media
-            ).execute()
+                body={'appProperties': app_properties} if app_properties else None,
+                media_body=media_body
+            )
+            self.uploader.execute(request, media_body, session_uri, on_progress)
             
             logger.info(f"Successfully updated file: {filename}")
             return True
@@ -244,11 +456,15 @@ class GDriveClient:
                 'mimeType': 'application/vnd.google-apps.folder',
                 'parents': [parent_id]
             }
+            if self.id_pool:
+                self.id_pool.assign(self.service, file_metadata)
             
-            folder = self.service.files().create(
-                body=file_metadata,
-                fields='id, name'
-            ).execute()
+            folder = execute_create(
+                self.service,
+                self.service.files().create(body=file_metadata, fields='id, name').execute,
+                file_metadata,
+                'id, name'
+            )
             
             folder_id = folder.get('id')
             logger.info(f"Folder created successfully: {folder_name} (ID: {folder_id})")
@@ -338,3 +554,26 @@ class GDriveClient:
                 current_parent = self.get_or_create_folder(folder_name, current_parent)
         
         return current_parent
+    
+    def find_path(self, path: str) -> Optional[str]:
+        """
+        Resolve an existing nested folder path (e.g., 'dir1/dir2') without creating folders
+        
+        Args:
+            path: Path string with folders separated by '/'
+            
+        Returns:
+            ID of the deepest folder in the path, or None if any folder is missing
+        """
+        if not path or path == '/':
+            return self.folder_id
+        
+        current_parent = self.folder_id
+        
+        for folder_name in path.strip('/').split('/'):
+            if folder_name:  # Skip empty parts
+                current_parent = self.find_folder_by_name(folder_name, current_parent)
+                if not current_parent:
+                    return None
+        
+        return current_parent
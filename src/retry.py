@@ -0,0 +1,180 @@
+"""
+Retry Module
+Shared error classification (retryable, throttled, fatal) and retry policy for the S3 and
+Google Drive clients
+"""
+
+import logging
+import random
+import socket
+import time
+from typing import Callable, TypeVar
+
+import httplib2
+from botocore.exceptions import ClientError, HTTPClientError, IncompleteReadError
+from botocore.exceptions import ConnectionError as BotoConnectionError
+from google.auth.exceptions import TransportError
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+RETRYABLE = 'retryable'
+THROTTLED = 'throttled'
+FATAL = 'fatal'
+
+DRIVE_RATE_LIMIT_REASONS = ('userRateLimitExceeded', 'rateLimitExceeded')
+S3_THROTTLING_CODES = ('SlowDown', 'Throttling', 'ThrottlingException', 'RequestLimitExceeded', 'TooManyRequestsException')
+S3_TRANSIENT_CODES = ('RequestTimeout', 'RequestTimeTooSkewed', 'InternalError')
+TRANSIENT_STATUSES = (408, 500, 502, 503, 504)
+
+# Network failures of either SDK: the request may or may not have reached the server
+NETWORK_ERRORS = (
+    BotoConnectionError, HTTPClientError, IncompleteReadError,
+    httplib2.HttpLib2Error, TransportError,
+    ConnectionError, TimeoutError, socket.timeout
+)
+
+
+def is_rate_limited(error: HttpError) -> bool:
+    """
+    Check whether a Drive error means the quota was exceeded
+    
+    Args:
+        error: Error raised by a Drive request
+    
+    Returns:
+        True for 429 responses and 403 responses with a rate-limit reason
+    """
+    status = error.resp.status
+    if status == 429:
+        return True
+    if status != 403:
+        return False
+    
+    details = error.error_details if isinstance(error.error_details, list) else []
+    reasons = {detail.get('reason') for detail in details if isinstance(detail, dict)}
+    return bool(reasons.intersection(DRIVE_RATE_LIMIT_REASONS)) or any(
+        reason.encode() in error.content for reason in DRIVE_RATE_LIMIT_REASONS
+    )
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classify an error raised by an S3 or Drive call
+    
+    Args:
+        error: The exception
+    
+    Returns:
+        THROTTLED for quota/rate-limit responses, RETRYABLE for network failures and
+        5xx/timeout responses, FATAL for anything else (missing objects, permissions, bad requests)
+    """
+    if isinstance(error, HttpError):
+        if is_rate_limited(error):
+            return THROTTLED
+        return RETRYABLE if error.resp.status in TRANSIENT_STATUSES else FATAL
+    
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        if code in S3_THROTTLING_CODES or status == 429:
+            return THROTTLED
+        if code in S3_TRANSIENT_CODES or status in TRANSIENT_STATUSES:
+            return RETRYABLE
+        return FATAL
+    
+    return RETRYABLE if isinstance(error, NETWORK_ERRORS) else FATAL
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Check whether a failed call is worth repeating
+    
+    Args:
+        error: The exception
+    
+    Returns:
+        True unless the error is fatal
+    """
+    return classify_error(error) != FATAL
+
+
+class RetryPolicy:
+    """
+    Retries calls failing with retryable or throttled errors
+    
+    The delay before retry n is base_delay * 2^(n-1), capped at max_delay, with
+    jitter drawn from its upper half so that workers throttled together do not
+    retry together. Fatal errors are raised at once.
+    """
+    
+    def __init__(
+        self,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 64.0,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Initialize retry policy
+        
+        Args:
+            max_retries: Retries before the last error is raised (0 disables retries)
+            base_delay: Delay before the first retry in seconds
+            max_delay: Longest delay in seconds
+            sleep: Sleep function
+        """
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+    
+    def backoff(self, attempt: int) -> float:
+        """
+        Jittered exponential delay
+        
+        Args:
+            attempt: Retry number, starting at 1
+        
+        Returns:
+            Seconds to wait before the retry
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * (0.5 + random.random() / 2)
+    
+    def call(
+        self,
+        request: Callable[[], T],
+        description: str = 'request',
+        on_retry: Callable[[BaseException, str], None] = None
+    ) -> T:
+        """
+        Run a call, retrying it while it fails with a non-fatal error
+        
+        Args:
+            request: Callable performing the call
+            description: What is being called, for log messages
+            on_retry: Called with (error, classification) before each retry
+        
+        Returns:
+            The call's result
+        
+        Raises:
+            Exception: The last error, once it is fatal or the retries are used up
+        """
+        attempt = 0
+        while True:
+            try:
+                return request()
+            except Exception as e:
+                kind = classify_error(e)
+                if kind == FATAL or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                if on_retry:
+                    on_retry(e, kind)
+                delay = self.backoff(attempt)
+                logger.info(f"{description} failed ({kind}: {e}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                self._sleep(delay)
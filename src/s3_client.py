@@ -3,14 +3,26 @@ S3 Client Module
 Handles all S3 operations for listing and downloading files
 """
 
+import copy
 import logging
-from typing import Dict, List
+import os
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
 
 import boto3
-from botocore.exceptions import ClientError
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import BotoCoreError, ClientError
+
+from .bandwidth import ThrottledReader, TokenBucket
+from .retry import RetryPolicy
+from .s3_inventory import S3InventoryReader, normalize_prefixes
+from .s3_parallel_lister import ParallelS3Lister
+from .s3_ranged_downloader import DEFAULT_PART_SIZE, RangedDownloader
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
 
 class S3Client:
     """Client for interacting with AWS S3 or S3-compatible storage"""
@@ -21,7 +33,17 @@ class S3Client:
         secret_key: str, 
         region: str, 
         bucket_name: str,
-        endpoint_url: str = None
+        endpoint_url: str = None,
+        list_parallelism: int = 1,
+        inventory_manifest: str = None,
+        inventory_live_prefixes: List[str] = None,
+        multipart_threshold: int = None,
+        multipart_chunksize: int = None,
+        max_concurrency: int = None,
+        ranged_download: bool = False,
+        download_retries: int = 0,
+        bandwidth: TokenBucket = None,
+        retry: RetryPolicy = None
     ):
         """
         Initialize S3 client
@@ -33,9 +55,48 @@ class S3Client:
             bucket_name: S3 bucket name
             endpoint_url: Custom S3 endpoint URL (e.g., for MinIO, Wasabi, etc.)
                          If None, uses standard AWS S3
+            list_parallelism: Number of concurrent list requests. Values above 1 enable
+                              prefix-sharded parallel listing (see ParallelS3Lister)
+            inventory_manifest: Path to a local S3 Inventory manifest.json (or its directory).
+                                If set, the file list is built from the inventory instead of LIST
+            inventory_live_prefixes: Prefixes that change after the inventory was taken.
+                                     These are still listed live and override the inventory
+            multipart_threshold: Object size from which downloads are split into parts
+                                 (None keeps the boto3 default of 8 MiB)
+            multipart_chunksize: Bytes per part (None keeps the boto3 default of 8 MiB)
+            max_concurrency: Concurrent part requests per download (None keeps the boto3 default of 10)
+            ranged_download: Download with RangedDownloader (concurrent ranged GETs written in
+                             place with os.pwrite) instead of boto3's transfer manager
+            download_retries: Times an interrupted download is resumed from the last byte written
+                              (ranged GET guarded by IfMatch on the ETag). Used by ranged downloads,
+                              and by plain downloads when no multipart settings are customized
+            bandwidth: Token bucket shared by all downloads (None for unlimited). Clones share it
+            retry: Retry policy for listing, download, upload and delete calls failing with
+                   throttling or transient errors (None makes a single attempt)
         """
         self.bucket_name = bucket_name
         self.endpoint_url = endpoint_url
+        self.list_parallelism = list_parallelism
+        self.last_shard_stats = []  # Per-shard throughput of the last parallel listing
+        self.inventory_manifest = inventory_manifest
+        self.inventory_live_prefixes = normalize_prefixes(inventory_live_prefixes or [])
+        self.last_download_stats = None  # Throughput of the last ranged download
+        self.bandwidth = bandwidth
+        self.retry = retry
+        
+        # Multipart download settings (passed to boto3 only when customized)
+        transfer_settings = {
+            name: value for name, value in (
+                ('multipart_threshold', multipart_threshold),
+                ('multipart_chunksize', multipart_chunksize),
+                ('max_concurrency', max_concurrency)
+            ) if value is not None
+        }
+        self.transfer_config = TransferConfig(**transfer_settings) if transfer_settings else None
+        self.ranged_download = ranged_download and hasattr(os, 'pwrite')
+        self.download_retries = download_retries if hasattr(os, 'pwrite') else 0
+        if ranged_download and not self.ranged_download:
+            logger.warning("Ranged downloads need os.pwrite, using the boto3 transfer manager")
         
         # Configurazione client S3
         client_config = {
@@ -49,6 +110,7 @@ class S3Client:
             client_config['endpoint_url'] = endpoint_url
             logger.info(f"Using custom S3 endpoint: {endpoint_url}")
         
+        self._client_config = client_config
         self.s3_client = boto3.client('s3', **client_config)
         
         if endpoint_url:
@@ -56,57 +118,196 @@ class S3Client:
         else:
             logger.info(f"S3 client initialized for bucket '{bucket_name}' (AWS S3)")
     
-    def list_files(self) -> List[Dict[str, any]]:
+    def clone(self) -> 'S3Client':
         """
-        List all files in the S3 bucket
+        Copy this client with its own boto3 client, for use by another thread
         
-        Filters out directory markers (keys ending with '/') and returns only actual files.
+        Returns:
+            S3Client with the same configuration
+        """
+        client = copy.copy(self)
+        client.s3_client = boto3.client('s3', **self._client_config)
+        return client
+    
+    def _call(self, request: Callable[[], T], description: str) -> T:
+        """Run an S3 call through the retry policy, if any"""
+        if self.retry is None:
+            return request()
+        return self.retry.call(request, description)
+    
+    PAGE_SIZE = 1000
+    
+    @staticmethod
+    def _is_directory_marker(key: str, size: int) -> bool:
+        """
+        Check whether an S3 object is a directory marker rather than a real file
         
+        Args:
+            key: S3 object key
+            size: Object size in bytes
+            
         Returns:
-            List of dictionaries containing file information (key, size, last_modified)
+            True for keys ending with '/' and zero-byte placeholders inside a path
         """
-        try:
-            logger.info(f"Listing files in S3 bucket: {self.bucket_name}")
-            response = self.s3_client.list_objects_v2(Bucket=self.bucket_name)
+        if key.endswith('/'):
+            return True
+        return size == 0 and '/' in key
+    
+    def _iter_pages(self, **list_kwargs) -> Iterator[Dict[str, any]]:
+        """
+        Iterate over ListObjectsV2 response pages, following ContinuationToken
+        
+        Args:
+            **list_kwargs: Extra arguments for list_objects_v2 (Prefix, Delimiter, ...)
             
-            if 'Contents' not in response:
-                logger.info("No files found in S3 bucket")
-                return []
+        Yields:
+            Raw list_objects_v2 response pages
+        """
+        kwargs = {'Bucket': self.bucket_name, 'MaxKeys': self.PAGE_SIZE, **list_kwargs}
+        
+        while True:
+            response = self._call(partial(self.s3_client.list_objects_v2, **kwargs), 'ListObjectsV2')
+            yield response
             
-            files = []
-            directories_skipped = 0
+            if not response.get('IsTruncated'):
+                break
             
-            for obj in response['Contents']:
-                key = obj['Key']
-                
-                # Skip directory markers (keys ending with '/')
-                if key.endswith('/'):
-                    directories_skipped += 1
-                    logger.debug(f"Skipping directory marker: {key}")
+            token = response.get('NextContinuationToken')
+            if not token:
+                break
+            kwargs['ContinuationToken'] = token
+    
+    def _iter_objects(self, prefix: str = None) -> Iterator[Dict[str, any]]:
+        """
+        Iterate over raw S3 objects, sequentially or through parallel shards
+        
+        Args:
+            prefix: Only list keys starting with this prefix (optional)
+            
+        Yields:
+            Raw S3 object dictionaries in key order
+        """
+        if self.inventory_manifest:
+            yield from self._iter_inventory_objects(prefix)
+            return
+        
+        if self.list_parallelism > 1:
+            lister = ParallelS3Lister(self, parallelism=self.list_parallelism)
+            self.last_shard_stats = lister.last_shard_stats
+            yield from lister.iter_objects(prefix or '')
+            return
+        
+        list_kwargs = {'Prefix': prefix} if prefix else {}
+        for response in self._iter_pages(**list_kwargs):
+            yield from response.get('Contents', [])
+    
+    def _iter_inventory_objects(self, prefix: str = None) -> Iterator[Dict[str, any]]:
+        """
+        Iterate over objects from the S3 Inventory, refreshed with live LIST for live prefixes
+        
+        Objects under inventory_live_prefixes are taken from a live listing only, so
+        keys created, changed or deleted there since the inventory date are accurate.
+        Everything else comes from the inventory data files without any LIST call.
+        
+        Args:
+            prefix: Only return keys starting with this prefix (optional)
+            
+        Yields:
+            Raw S3 object dictionaries
+        """
+        reader = S3InventoryReader(self.inventory_manifest)
+        
+        if reader.source_bucket and reader.source_bucket != self.bucket_name:
+            logger.warning(
+                f"S3 Inventory is for bucket '{reader.source_bucket}', not '{self.bucket_name}'"
+            )
+        
+        logger.info(f"Using S3 Inventory from {reader.creation_time.isoformat()} ({reader.age_hours():.1f}h old)")
+        
+        live_prefixes = tuple(self.inventory_live_prefixes)
+        
+        for obj in reader.iter_objects():
+            key = obj['Key']
+            if prefix and not key.startswith(prefix):
+                continue
+            if live_prefixes and key.startswith(live_prefixes):
+                continue
+            yield obj
+        
+        for live_prefix in live_prefixes:
+            # Narrow to the more specific of the two prefixes, skip if disjoint
+            if prefix and not live_prefix.startswith(prefix):
+                if not prefix.startswith(live_prefix):
                     continue
+                live_prefix = prefix
+            
+            logger.info(f"Listing live prefix changed since inventory: {live_prefix}")
+            for response in self._iter_pages(Prefix=live_prefix):
+                yield from response.get('Contents', [])
+    
+    def iter_files(self, prefix: str = None) -> Iterator[Dict[str, any]]:
+        """
+        Iterate over all files in the S3 bucket, page by page
+        
+        Follows ContinuationToken so buckets with more than 1000 objects are listed
+        completely. Files are yielded as each page arrives, so the first key is
+        available after one round trip and memory does not grow with the bucket.
+        Directory markers (keys ending with '/') are filtered out.
+        
+        When list_parallelism > 1 the key space is listed as parallel prefix
+        shards instead, still in lexicographic key order.
+        
+        Args:
+            prefix: Only list keys starting with this prefix (optional)
+            
+        Yields:
+            Dictionaries containing file information (key, size, last_modified, etag)
+        """
+        files_found = 0
+        directories_skipped = 0
+        
+        try:
+            logger.info(f"Listing files in S3 bucket: {self.bucket_name}")
+            
+            for obj in self._iter_objects(prefix):
+                key = obj['Key']
                 
-                # Skip zero-byte files that might be directory placeholders
-                if obj['Size'] == 0 and '/' in key:
-                    logger.debug(f"Skipping potential directory placeholder: {key}")
+                if self._is_directory_marker(key, obj['Size']):
                     directories_skipped += 1
+                    logger.debug(f"Skipping directory marker/placeholder: {key}")
                     continue
                 
-                files.append({
+                files_found += 1
+                yield {
                     'key': key,
                     'size': obj['Size'],
                     'last_modified': obj['LastModified'],
                     'etag': obj['ETag'].strip('"')
-                })
-            
-            if directories_skipped > 0:
-                logger.info(f"Skipped {directories_skipped} directory markers/placeholders")
-            
-            logger.info(f"Found {len(files)} actual files in S3 bucket")
-            return files
+                }
         
         except ClientError as e:
             logger.error(f"Error listing S3 files: {e}")
             raise
+        
+        if directories_skipped > 0:
+            logger.info(f"Skipped {directories_skipped} directory markers/placeholders")
+        
+        if files_found == 0:
+            logger.info("No files found in S3 bucket")
+        else:
+            logger.info(f"Found {files_found} actual files in S3 bucket")
+    
+    def list_files(self) -> List[Dict[str, any]]:
+        """
+        List all files in the S3 bucket
+        
+        List-compatible wrapper around iter_files() for callers that need the
+        whole listing at once.
+        
+        Returns:
+            List of dictionaries containing file information (key, size, last_modified, etag)
+        """
+        return list(self.iter_files())
     
     def upload_file(self, local_path: str, key: str) -> bool:
         """
@@ -121,7 +322,7 @@ class S3Client:
         """
         try:
             logger.info(f"Uploading file to S3: {local_path} as {key}")
-            self.s3_client.upload_file(local_path, self.bucket_name, key)
+            self._call(partial(self.s3_client.upload_file, local_path, self.bucket_name, key), f"Upload of {key}")
             logger.info(f"Successfully uploaded: {key}")
             return True
         
@@ -142,14 +343,146 @@ class S3Client:
         """
         try:
             logger.info(f"Downloading S3 file: {key} to {local_path}")
-            self.s3_client.download_file(self.bucket_name, key, local_path)
+            self._download(key, local_path)
             logger.info(f"Successfully downloaded: {key}")
             return True
         
-        except ClientError as e:
+        except (BotoCoreError, ClientError, OSError) as e:
+            logger.error(f"Error downloading file {key}: {e}")
+            return False
+    
+    def _download(self, key: str, local_path: str):
+        """
+        Download a file with the configured strategy, through the retry policy
+        
+        RangedDownloader applies the policy itself, so a retry keeps the parts
+        already written; boto3 transfers are retried as a whole.
+        """
+        if self.ranged_download:
+            self.last_download_stats = self._ranged_downloader().download(key, local_path)
+        elif self.transfer_config:
+            self._call(partial(
+                self.s3_client.download_file,
+                self.bucket_name, key, local_path, Config=self.transfer_config, **self._transfer_callback()
+            ), f"Download of {key}")
+        elif self.download_retries:
+            # Single stream, resumed from the partial file after an interruption
+            downloader = RangedDownloader(self, workers=1, threshold=float('inf'), retries=self.download_retries)
+            self.last_download_stats = downloader.download(key, local_path)
+        else:
+            self._call(partial(
+                self.s3_client.download_file, self.bucket_name, key, local_path, **self._transfer_callback()
+            ), f"Download of {key}")
+    
+    def download_fileobj(self, key: str, fileobj) -> bool:
+        """
+        Download a file from S3 into a writable file object (e.g. an in-memory buffer)
+        
+        Args:
+            key: S3 object key
+            fileobj: Binary file object to write to
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            logger.info(f"Downloading S3 file into memory: {key}")
+            
+            def download():
+                # A retry starts over: drop whatever the failed attempt wrote
+                fileobj.seek(0)
+                fileobj.truncate()
+                if self.transfer_config:
+                    self.s3_client.download_fileobj(
+                        self.bucket_name, key, fileobj, Config=self.transfer_config, **self._transfer_callback()
+                    )
+                else:
+                    self.s3_client.download_fileobj(self.bucket_name, key, fileobj, **self._transfer_callback())
+            
+            self._call(download, f"Download of {key}")
+            return True
+        
+        except (BotoCoreError, ClientError) as e:
             logger.error(f"Error downloading file {key}: {e}")
             return False
     
+    def _transfer_callback(self) -> Dict[str, any]:
+        """
+        Extra boto3 transfer arguments for the bandwidth limit
+        
+        The transfer manager calls Callback from its I/O threads after each piece it
+        writes, so sleeping there slows every part of the download down to the limit.
+        """
+        return {'Callback': self.bandwidth.consume} if self.bandwidth else {}
+    
+    def _ranged_downloader(self) -> RangedDownloader:
+        """Build a RangedDownloader from the multipart settings"""
+        config = self.transfer_config or TransferConfig()
+        return RangedDownloader(
+            self,
+            part_size=config.multipart_chunksize or DEFAULT_PART_SIZE,
+            workers=config.max_concurrency,
+            threshold=config.multipart_threshold,
+            retries=self.download_retries
+        )
+    
+    def open_stream(self, key: str) -> Optional[Tuple[any, int]]:
+        """
+        Open an S3 object for sequential reading, without downloading it first
+        
+        Args:
+            key: S3 object key
+            
+        Returns:
+            Tuple of (streaming body with read()/close(), size in bytes), or None on error
+        """
+        try:
+            logger.info(f"Streaming S3 file: {key}")
+            response = self._call(
+                partial(self.s3_client.get_object, Bucket=self.bucket_name, Key=key), f"GetObject of {key}"
+            )
+            body = response['Body']
+            if self.bandwidth:
+                body = ThrottledReader(body, self.bandwidth)
+            return body, response['ContentLength']
+        
+        except ClientError as e:
+            logger.error(f"Error opening file {key}: {e}")
+            return None
+    
+    def read_range(self, key: str, start: int, length: int) -> Optional[Tuple[bytes, int]]:
+        """
+        Read a byte range of an S3 object with a ranged GetObject
+        
+        Args:
+            key: S3 object key
+            start: Offset of the first byte
+            length: Number of bytes to read (fewer are returned past the end of the object)
+        
+        Returns:
+            Tuple of (bytes read, total object size), or None on error
+        """
+        try:
+            def read():
+                response = self.s3_client.get_object(
+                    Bucket=self.bucket_name, Key=key, Range=f"bytes={start}-{start + length - 1}"
+                )
+                return response, response['Body'].read()
+            
+            response, data = self._call(read, f"Ranged GetObject of {key}")
+            if self.bandwidth:
+                self.bandwidth.consume(len(data))
+            # ContentRange is 'bytes <first>-<last>/<total>'
+            total = int(response['ContentRange'].rsplit('/', 1)[1])
+            return data, total
+        
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'InvalidRange' and start == 0:
+                # An empty object has no byte 0
+                return b'', 0
+            logger.error(f"Error reading range of file {key}: {e}")
+            return None
+    
     def file_exists(self, key: str) -> bool:
         """
         Check if a file exists in S3
@@ -178,7 +511,7 @@ class S3Client:
         """
         try:
             logger.info(f"Deleting S3 file: {key}")
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
+            self._call(partial(self.s3_client.delete_object, Bucket=self.bucket_name, Key=key), f"Delete of {key}")
             logger.info(f"Successfully deleted: {key}")
             return True
         
@@ -0,0 +1,198 @@
+"""
+S3 Inventory Module
+Reads S3 Inventory reports (manifest.json + CSV/ORC/Parquet data files)
+as an alternative to listing the bucket with ListObjectsV2
+"""
+
+import csv
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List
+from urllib.parse import unquote_plus
+
+logger = logging.getLogger(__name__)
+
+# Column names used in CSV manifests ("fileSchema": "Bucket, Key, Size, ...")
+CSV_COLUMNS = {
+    'Key': 'key',
+    'Size': 'size',
+    'LastModifiedDate': 'last_modified_date',
+    'ETag': 'e_tag',
+    'IsLatest': 'is_latest',
+    'IsDeleteMarker': 'is_delete_marker',
+}
+
+# Column names used inside ORC and Parquet data files
+COLUMNAR_COLUMNS = ['key', 'size', 'last_modified_date', 'e_tag', 'is_latest', 'is_delete_marker']
+
+PARQUET_BATCH_SIZE = 10000
+
+
+class S3InventoryReader:
+    """Streaming reader for a local copy of an S3 Inventory report"""
+    
+    def __init__(self, manifest_path: str):
+        """
+        Initialize inventory reader
+        
+        Args:
+            manifest_path: Path to manifest.json, or to the directory that contains it
+        
+        Raises:
+            FileNotFoundError: If the manifest cannot be found
+            ValueError: If the manifest uses an unsupported file format
+        """
+        if os.path.isdir(manifest_path):
+            manifest_path = os.path.join(manifest_path, 'manifest.json')
+        
+        if not os.path.exists(manifest_path):
+            logger.error(f"S3 Inventory manifest not found: {manifest_path}")
+            raise FileNotFoundError(f"S3 Inventory manifest not found: {manifest_path}")
+        
+        self.manifest_path = manifest_path
+        self.base_dir = os.path.dirname(os.path.abspath(manifest_path))
+        
+        with open(manifest_path, 'r') as f:
+            self.manifest = json.load(f)
+        
+        self.source_bucket = self.manifest.get('sourceBucket')
+        self.file_format = self.manifest.get('fileFormat', 'CSV').upper()
+        self.data_files = [entry['key'] for entry in self.manifest.get('files', [])]
+        
+        if self.file_format not in ('CSV', 'ORC', 'PARQUET'):
+            raise ValueError(f"Unsupported S3 Inventory file format: {self.file_format}")
+        
+        # creationTimestamp is milliseconds since epoch, as a string
+        timestamp_ms = int(self.manifest.get('creationTimestamp', 0))
+        self.creation_time = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+        
+        logger.info(
+            f"Loaded S3 Inventory manifest for bucket '{self.source_bucket}' "
+            f"({self.file_format}, {len(self.data_files)} data files, created {self.creation_time.isoformat()})"
+        )
+    
+    def _resolve_data_file(self, key: str) -> str:
+        """
+        Map a data file key from the manifest to a local path
+        
+        The manifest lists keys relative to the destination bucket
+        (e.g. 'source-bucket/config-id/data/<uuid>.csv.gz'). Local copies may keep
+        that layout or just a 'data/' directory next to manifest.json.
+        
+        Args:
+            key: Data file key from the manifest
+        
+        Returns:
+            Local path of the data file
+        """
+        filename = os.path.basename(key)
+        candidates = [
+            os.path.join(self.base_dir, key),
+            os.path.join(self.base_dir, 'data', filename),
+            os.path.join(self.base_dir, filename),
+        ]
+        
+        for candidate in candidates:
+            if os.path.exists(candidate):
+                return candidate
+        
+        raise FileNotFoundError(f"S3 Inventory data file not found for key: {key}")
+    
+    def _iter_csv(self, path: str) -> Iterator[Dict[str, any]]:
+        """Stream rows from a gzipped CSV data file, keeping only the needed columns"""
+        schema = [column.strip() for column in self.manifest.get('fileSchema', '').split(',')]
+        indexes = {CSV_COLUMNS[name]: i for i, name in enumerate(schema) if name in CSV_COLUMNS}
+        
+        if 'key' not in indexes:
+            raise ValueError(f"S3 Inventory CSV schema has no Key column: {schema}")
+        
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', newline='') as f:
+            for row in csv.reader(f):
+                record = {column: row[i] for column, i in indexes.items() if i < len(row)}
+                # Keys in CSV inventories are URL-encoded
+                record['key'] = unquote_plus(record['key'])
+                yield record
+    
+    def _iter_columnar(self, path: str) -> Iterator[Dict[str, any]]:
+        """Stream rows from an ORC or Parquet data file, batch by batch"""
+        try:
+            import pyarrow.orc as orc
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError(
+                f"pyarrow is required to read {self.file_format} S3 Inventory files (pip install pyarrow)"
+            )
+        
+        if self.file_format == 'PARQUET':
+            parquet_file = pq.ParquetFile(path)
+            columns = [c for c in COLUMNAR_COLUMNS if c in parquet_file.schema_arrow.names]
+            batches = parquet_file.iter_batches(batch_size=PARQUET_BATCH_SIZE, columns=columns)
+        else:
+            orc_file = orc.ORCFile(path)
+            columns = [c for c in COLUMNAR_COLUMNS if c in orc_file.schema.names]
+            batches = (orc_file.read_stripe(i, columns=columns) for i in range(orc_file.nstripes))
+        
+        for batch in batches:
+            yield from batch.to_pylist()
+    
+    def iter_objects(self) -> Iterator[Dict[str, any]]:
+        """
+        Iterate over the objects listed in the inventory
+        
+        Non-current versions and delete markers (versioned inventories) are skipped.
+        
+        Yields:
+            Object dictionaries shaped like ListObjectsV2 Contents (Key, Size, LastModified, ETag)
+        """
+        total = 0
+        
+        for data_key in self.data_files:
+            path = self._resolve_data_file(data_key)
+            logger.debug(f"Reading S3 Inventory data file: {path}")
+            
+            rows = self._iter_csv(path) if self.file_format == 'CSV' else self._iter_columnar(path)
+            
+            for row in rows:
+                if str(row.get('is_latest', 'true')).lower() == 'false':
+                    continue
+                if str(row.get('is_delete_marker', 'false')).lower() == 'true':
+                    continue
+                
+                last_modified = row.get('last_modified_date')
+                if isinstance(last_modified, str) and last_modified:
+                    last_modified = datetime.fromisoformat(last_modified.replace('Z', '+00:00'))
+                
+                total += 1
+                yield {
+                    'Key': row['key'],
+                    'Size': int(row.get('size') or 0),
+                    'LastModified': last_modified,
+                    'ETag': row.get('e_tag') or ''
+                }
+        
+        logger.info(f"Read {total} objects from S3 Inventory")
+    
+    def age_hours(self) -> float:
+        """Return the age of the inventory report in hours"""
+        return (datetime.now(timezone.utc) - self.creation_time).total_seconds() / 3600
+
+
+def normalize_prefixes(prefixes: List[str]) -> List[str]:
+    """
+    Drop prefixes that are already covered by a shorter prefix in the list
+    
+    Args:
+        prefixes: Key prefixes
+    
+    Returns:
+        Sorted list of non-overlapping prefixes
+    """
+    result = []
+    for prefix in sorted(set(p for p in prefixes if p)):
+        if not any(prefix.startswith(existing) for existing in result):
+            result.append(prefix)
+    return result
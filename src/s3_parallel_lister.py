@@ -0,0 +1,241 @@
+"""
+Parallel S3 Listing Module
+Lists very large buckets by splitting the key space into prefix and key range
+shards and listing the shards concurrently
+"""
+
+import heapq
+import logging
+import os
+import string
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Shard to list: (prefix, start after this key, last key included, split depth)
+Shard = Tuple[str, Optional[str], Optional[str], int]
+
+# Characters range boundaries are chosen from (in S3 key order)
+BOUNDARY_CHARACTERS = ''.join(sorted(string.digits + string.ascii_letters + '_'))
+
+
+class ParallelS3Lister:
+    """
+    Prefix-sharded ListObjectsV2 engine
+    
+    Every prefix is first probed with a single page request. Prefixes that fit
+    in one page are complete after the probe. Larger ones are split on the '/'
+    delimiter into their sub-prefixes when the probe shows sub-prefixes; flat
+    prefixes (and key ranges) are instead cut into key ranges after the probed
+    page, listed with StartAfter. Splitting recurses until every shard fits in
+    one page or the maximum split depth is reached (the remaining keys of such
+    a shard are then listed sequentially, continuing from the probe).
+    
+    Shards are listed on a thread pool and merged back in lexicographic key order.
+    The merge starts once every shard is listed, so all raw objects of the listing
+    are held in memory at once (a few hundred bytes per key), unlike the
+    sequential listing, which streams page by page.
+    """
+    
+    def __init__(self, s3_client, parallelism: int = 8, max_split_depth: int = 4):
+        """
+        Initialize parallel lister
+        
+        Args:
+            s3_client: S3Client used to issue list requests (boto3 clients are thread-safe)
+            parallelism: Number of concurrent list requests, also the number of key ranges
+                         a flat shard is cut into
+            max_split_depth: Maximum number of times a shard below the starting prefix is
+                             split again ('/' levels or key ranges)
+        """
+        self.s3_client = s3_client
+        self.parallelism = max(1, parallelism)
+        self.max_split_depth = max_split_depth
+        self.last_shard_stats: List[Dict[str, any]] = []
+    
+    @staticmethod
+    def _in_range(page: Dict[str, any], end: Optional[str]) -> Tuple[List[Dict], bool]:
+        """
+        Keep the objects of a page up to the last key of a shard
+        
+        Args:
+            page: Raw list_objects_v2 response page
+            end: Last key included in the shard (None for no limit)
+        
+        Returns:
+            Tuple of (objects in the shard, whether more keys of the shard may follow)
+        """
+        contents = page.get('Contents', [])
+        objects = [obj for obj in contents if end is None or obj['Key'] <= end]
+        return objects, bool(page.get('IsTruncated')) and len(objects) == len(contents)
+    
+    def _probe(self, shard: Shard) -> Tuple[List[List[Dict]], List[Shard]]:
+        """
+        List the first page of a shard and decide whether it must be split
+        
+        Args:
+            shard: Shard to list
+        
+        Returns:
+            Tuple of (sorted object segments, shards still to probe)
+        """
+        prefix, start_after, end, depth = shard
+        start = time.monotonic()
+        list_kwargs = {}
+        if prefix:
+            list_kwargs['Prefix'] = prefix
+        if start_after:
+            list_kwargs['StartAfter'] = start_after
+        
+        pages = self.s3_client._iter_pages(**list_kwargs)
+        objects, more = self._in_range(next(pages), end)
+        
+        if more and depth < self.max_split_depth:
+            # Too large for one page: split on the next '/' level, or into key ranges when flat
+            pages.close()
+            if start_after is None and end is None and any('/' in obj['Key'][len(prefix):] for obj in objects):
+                return self._split(prefix, depth)
+            self._record_shard(self._label(shard), len(objects), time.monotonic() - start)
+            return [objects], self._split_range(prefix, objects[0]['Key'], objects[-1]['Key'], end, depth)
+        
+        # Small shard (complete after the probe) or maximum depth reached
+        while more:
+            page = next(pages, None)
+            if page is None:
+                break
+            page_objects, more = self._in_range(page, end)
+            objects.extend(page_objects)
+        pages.close()
+        
+        self._record_shard(self._label(shard), len(objects), time.monotonic() - start)
+        return [objects], []
+    
+    def _split_range(
+        self,
+        prefix: str,
+        first_key: str,
+        last_key: str,
+        end: Optional[str],
+        depth: int
+    ) -> List[Shard]:
+        """
+        Cut the keys after a probed page into key ranges
+        
+        Boundaries are single characters at the first position where the keys of
+        the probed page differ, spread over the characters after last_key's, so
+        keys listed in order (e.g. numbered or timestamped names) land in
+        different ranges. A range that is still too large is split again.
+        
+        Args:
+            prefix: Key prefix of the shard
+            first_key: First key of the probed page
+            last_key: Last key of the probed page (the new ranges start after it)
+            end: Last key included in the shard (None for no limit)
+            depth: Split depth of the shard
+        
+        Returns:
+            Key range shards covering the keys after last_key up to end
+        """
+        position = len(os.path.commonprefix([first_key, last_key]))
+        bounds = []
+        
+        if position < len(last_key):
+            base = last_key[:position]
+            lowest = last_key[position]
+            highest = end[position] if end is not None and end.startswith(base) and len(end) > position else None
+            candidates = [c for c in BOUNDARY_CHARACTERS if c > lowest and (highest is None or c < highest)]
+            step = len(candidates) / self.parallelism
+            picked = sorted({candidates[int(step * i)] for i in range(1, self.parallelism)}) if candidates else []
+            bounds = [base + c for c in picked]
+        
+        edges = [last_key] + bounds + [end]
+        logger.debug(f"Split prefix '{prefix}' after '{last_key}' into {len(edges) - 1} key ranges")
+        return [(prefix, edges[i], edges[i + 1], depth + 1) for i in range(len(edges) - 1)]
+    
+    @staticmethod
+    def _label(shard: Shard) -> str:
+        """Describe a shard for stats and logs"""
+        prefix, start_after, end, _ = shard
+        if start_after is None and end is None:
+            return prefix
+        return f"{prefix} ({start_after or ''}, {end or ''}]"
+    
+    def _split(self, prefix: str, depth: int) -> Tuple[List[List[Dict]], List[Shard]]:
+        """
+        Split a prefix into its direct objects and its sub-prefixes
+        
+        Args:
+            prefix: Key prefix to split
+            depth: Split depth of the prefix
+        
+        Returns:
+            Tuple of (sorted object segments, sub-prefix shards still to probe)
+        """
+        start = time.monotonic()
+        list_kwargs = {'Delimiter': '/'}
+        if prefix:
+            list_kwargs['Prefix'] = prefix
+        
+        direct_objects = []
+        sub_prefixes = []
+        
+        for page in self.s3_client._iter_pages(**list_kwargs):
+            direct_objects.extend(page.get('Contents', []))
+            sub_prefixes.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+        
+        logger.debug(f"Split prefix '{prefix}' into {len(sub_prefixes)} sub-prefixes")
+        
+        segments = []
+        if direct_objects:
+            self._record_shard(f"{prefix} (direct)", len(direct_objects), time.monotonic() - start)
+            segments.append(direct_objects)
+        
+        return segments, [(p, None, None, depth + 1) for p in sub_prefixes]
+    
+    def _record_shard(self, prefix: str, keys: int, seconds: float):
+        """Record listing throughput for a completed shard"""
+        keys_per_second = keys / seconds if seconds > 0 else float(keys)
+        self.last_shard_stats.append({
+            'prefix': prefix,
+            'keys': keys,
+            'seconds': seconds,
+            'keys_per_second': keys_per_second
+        })
+        logger.debug(f"Shard '{prefix}': {keys} keys in {seconds:.2f}s ({keys_per_second:.0f} keys/s)")
+    
+    def iter_objects(self, prefix: str = '') -> Iterator[Dict[str, any]]:
+        """
+        List all objects under a prefix using parallel shards
+        
+        Args:
+            prefix: Starting key prefix ('' for the whole bucket)
+        
+        Yields:
+            Raw S3 object dictionaries (Key, Size, LastModified, ETag) in key order
+        """
+        self.last_shard_stats.clear()
+        segments: List[List[Dict]] = []
+        start = time.monotonic()
+        
+        with ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix='s3-list') as executor:
+            pending = {executor.submit(self._probe, (prefix, None, None, 0))}
+            
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    new_segments, shards = future.result()
+                    segments.extend(new_segments)
+                    for shard in shards:
+                        pending.add(executor.submit(self._probe, shard))
+        
+        elapsed = time.monotonic() - start
+        total_keys = sum(len(segment) for segment in segments)
+        logger.info(
+            f"Parallel listing: {total_keys} keys from {len(self.last_shard_stats)} shards "
+            f"in {elapsed:.2f}s (parallelism={self.parallelism})"
+        )
+        
+        # Every segment is already sorted (S3 returns keys in UTF-8 binary order)
+        yield from heapq.merge(*segments, key=lambda obj: obj['Key'])
@@ -0,0 +1,207 @@
+"""
+Ranged S3 Download Module
+Downloads large objects as concurrent ranged GETs written in place into a preallocated file,
+resuming interrupted ranges from the last byte written
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import Dict, List, Tuple
+
+from .retry import is_retryable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+READ_SIZE = 1024 * 1024  # Bytes read from a part response at a time
+
+
+class IncompleteRangeError(ConnectionError):
+    """A ranged GET ended before the last requested byte (the connection dropped mid-body)"""
+
+
+class RangedDownloader:
+    """
+    Parallel ranged GetObject downloader
+    
+    The object size comes from one HeadObject; the target file is then preallocated
+    and each part is fetched with its own Range request and written at its offset
+    with os.pwrite, so parts land in any order without a reassembly step and the
+    link is used by several TCP streams at once. A part is read in READ_SIZE pieces,
+    keeping memory at about one piece per worker.
+    
+    A part interrupted by a connection error is resumed from its last written byte,
+    up to retries times. HeadObject and the download as a whole go through the
+    S3Client's retry policy; a retried download keeps the file and only fetches
+    the parts that have not completed. Every request carries IfMatch with the ETag
+    from HeadObject, so an object replaced mid-download fails with PreconditionFailed
+    instead of producing a file mixing two versions.
+    """
+    
+    def __init__(
+        self,
+        s3_client,
+        part_size: int = DEFAULT_PART_SIZE,
+        workers: int = 8,
+        threshold: int = DEFAULT_PART_SIZE,
+        retries: int = 0,
+        retry_delay: float = 1.0
+    ):
+        """
+        Initialize ranged downloader
+        
+        Args:
+            s3_client: S3Client whose boto3 client issues the requests (boto3 clients are thread-safe)
+            part_size: Bytes per ranged request
+            workers: Number of concurrent ranged requests
+            threshold: Objects smaller than this are fetched with a single request
+            retries: Times an interrupted part is resumed before the download fails
+            retry_delay: Seconds before the first resume, doubled for each further one
+        """
+        self.s3_client = s3_client
+        self.part_size = max(1, part_size)
+        self.workers = max(1, workers)
+        self.threshold = threshold
+        self.retries = max(0, retries)
+        self.retry_delay = retry_delay
+    
+    def _parts(self, size: int) -> List[Tuple[int, int]]:
+        """Split an object size into (start, end inclusive) ranges"""
+        if size < self.threshold:
+            return [(0, size - 1)] if size else []
+        return [
+            (start, min(start + self.part_size, size) - 1)
+            for start in range(0, size, self.part_size)
+        ]
+    
+    def _download_part(self, fd: int, key: str, etag: str, start: int, end: int) -> Tuple[int, int]:
+        """
+        Fetch one range and write it at its offset, resuming after interruptions
+        
+        Returns:
+            Tuple of (number of bytes written, number of resumes)
+        """
+        bandwidth = getattr(self.s3_client, 'bandwidth', None)
+        offset = start
+        attempt = 0
+        while True:
+            try:
+                response = self.s3_client.s3_client.get_object(
+                    Bucket=self.s3_client.bucket_name, Key=key, Range=f"bytes={offset}-{end}", IfMatch=etag
+                )
+                body = response['Body']
+                try:
+                    for data in iter(lambda: body.read(READ_SIZE), b''):
+                        offset += os.pwrite(fd, data, offset)
+                        if bandwidth:
+                            bandwidth.consume(len(data))
+                finally:
+                    body.close()
+                
+                if offset == end + 1:
+                    return end + 1 - start, attempt
+                raise IncompleteRangeError(f"Short read for {key} bytes {start}-{end}: stopped at {offset}")
+            
+            except Exception as e:
+                if attempt >= self.retries or not is_retryable(e):
+                    raise
+                attempt += 1
+                logger.warning(
+                    f"Download of {key} interrupted at byte {offset} ({e}), "
+                    f"resuming (attempt {attempt}/{self.retries})"
+                )
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+    
+    def _download_parts(
+        self,
+        fd: int,
+        key: str,
+        etag: str,
+        parts: List[Tuple[int, int]],
+        done: Dict[Tuple[int, int], int]
+    ):
+        """
+        Fetch the parts not in done (one attempt of the retry policy)
+        
+        Args:
+            fd: File descriptor of the preallocated target file
+            key: S3 object key
+            etag: ETag from HeadObject
+            parts: All (start, end inclusive) ranges of the object
+            done: Completed parts mapped to their number of resumes; updated in place,
+                  including for parts that completed in an attempt that failed
+        """
+        remaining = [part for part in parts if part not in done]
+        with ThreadPoolExecutor(max_workers=min(self.workers, max(1, len(remaining)))) as executor:
+            futures = {
+                executor.submit(self._download_part, fd, key, etag, start, end): (start, end)
+                for start, end in remaining
+            }
+            try:
+                for future in as_completed(futures):
+                    done[futures[future]] = future.result()[1]
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=True)
+                # Parts still running when the first one failed are kept for the retry
+                for future, part in futures.items():
+                    if future.done() and not future.cancelled() and future.exception() is None:
+                        done[part] = future.result()[1]
+                raise
+    
+    def download(self, key: str, local_path: str) -> Dict[str, any]:
+        """
+        Download an object into local_path
+        
+        Args:
+            key: S3 object key
+            local_path: Local file path (created or truncated)
+        
+        Returns:
+            Dictionary with key, bytes, parts, resumes, seconds and mib_per_second
+        
+        Raises:
+            ClientError: A request failed
+            OSError: The file could not be written or a part was incomplete
+        """
+        start_time = time.monotonic()
+        head = self.s3_client._call(
+            partial(self.s3_client.s3_client.head_object, Bucket=self.s3_client.bucket_name, Key=key),
+            f"HeadObject of {key}"
+        )
+        size = head['ContentLength']
+        etag = head['ETag']
+        parts = self._parts(size)
+        done: Dict[Tuple[int, int], int] = {}
+        
+        fd = os.open(local_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if size and hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(fd, 0, size)
+            else:
+                os.ftruncate(fd, size)
+            
+            self.s3_client._call(partial(self._download_parts, fd, key, etag, parts, done), f"Download of {key}")
+        finally:
+            os.close(fd)
+        
+        resumes = sum(done.values())
+        
+        seconds = time.monotonic() - start_time
+        stats = {
+            'key': key,
+            'bytes': size,
+            'parts': len(parts),
+            'resumes': resumes,
+            'seconds': seconds,
+            'mib_per_second': size / (1024 * 1024) / seconds if seconds > 0 else 0.0
+        }
+        logger.info(
+            f"Downloaded {key}: {size} bytes in {len(parts)} parts ({resumes} resumed), "
+            f"{seconds:.2f}s ({stats['mib_per_second']:.1f} MiB/s)"
+        )
+        return stats
@@ -0,0 +1,174 @@
+"""
+Spool Module
+Transfer buffers between the S3 download and the Google Drive upload: small objects in
+memory, larger ones in a spool directory, under a byte budget shared by all transfers
+"""
+
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from googleapiclient.http import MediaIoBaseUpload
+
+logger = logging.getLogger(__name__)
+
+
+class SpoolBuffer:
+    """One transfer's buffer: an in-memory file, or a path in the spool directory"""
+    
+    def __init__(self, size: int, path: Optional[str] = None):
+        """
+        Initialize buffer
+        
+        Args:
+            size: Bytes reserved for the buffer
+            path: Spool file path (None keeps the data in memory)
+        """
+        self.size = size
+        self.path = path
+        self.file = io.BytesIO() if path is None else None
+    
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+    
+    def media(self, mimetype: str = 'application/octet-stream') -> MediaIoBaseUpload:
+        """
+        Upload source over the in-memory data
+        
+        Returns:
+            Resumable MediaIoBaseUpload reading the buffer from the start
+        """
+        self.file.seek(0)
+        return MediaIoBaseUpload(self.file, mimetype=mimetype, resumable=True)
+
+
+class SpoolManager:
+    """
+    Allocates transfer buffers under a shared byte budget
+    
+    Objects up to memory_threshold bytes are buffered in memory, larger ones in
+    temporary files under directory. Every buffer reserves its object size from
+    max_bytes (memory and disk together); a transfer that does not fit waits until
+    others release their buffers, so concurrent transfers cannot fill the disk. An
+    object larger than the whole budget is let through once nothing else is in flight.
+    Objects of unknown size go to disk without a reservation.
+    """
+    
+    def __init__(self, directory: str = None, memory_threshold: int = 0, max_bytes: int = None):
+        """
+        Initialize spool manager
+        
+        Args:
+            directory: Directory for spool files (None uses the system temporary directory)
+            memory_threshold: Largest object kept in memory (0 spools everything to disk)
+            max_bytes: Budget for all buffers in use at once (None for unlimited)
+        """
+        self.directory = directory
+        self.memory_threshold = memory_threshold
+        self.max_bytes = max_bytes
+        self._condition = threading.Condition()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._in_use = 0
+        self.reset_stats()
+        
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    def reset_stats(self):
+        """Start a new statistics period (e.g. one sync run)"""
+        with self._condition:
+            self._stats = {
+                'peak_memory_bytes': self._memory_bytes,
+                'peak_disk_bytes': self._disk_bytes,
+                'waits': 0,
+                'wait_seconds': 0.0
+            }
+    
+    def stats(self) -> Dict[str, any]:
+        """
+        Get buffer usage since the last reset_stats()
+        
+        Returns:
+            Dictionary with peak_memory_bytes, peak_disk_bytes, waits and wait_seconds
+        """
+        with self._condition:
+            return dict(self._stats)
+    
+    def _reserve(self, size: int, in_memory: bool):
+        """Wait until size bytes fit in the budget, then account for them"""
+        with self._condition:
+            if self.max_bytes is not None:
+                fits = lambda: (self._memory_bytes + self._disk_bytes + size <= self.max_bytes
+                                or self._in_use == 0)
+                if not fits():
+                    started = time.monotonic()
+                    self._stats['waits'] += 1
+                    logger.debug(f"Waiting for {size} bytes of spool budget")
+                    self._condition.wait_for(fits)
+                    self._stats['wait_seconds'] += time.monotonic() - started
+            
+            self._in_use += 1
+            if in_memory:
+                self._memory_bytes += size
+                self._stats['peak_memory_bytes'] = max(self._stats['peak_memory_bytes'], self._memory_bytes)
+            else:
+                self._disk_bytes += size
+                self._stats['peak_disk_bytes'] = max(self._stats['peak_disk_bytes'], self._disk_bytes)
+    
+    def _release(self, size: int, in_memory: bool):
+        """Return size bytes to the budget and wake waiting transfers"""
+        with self._condition:
+            self._in_use -= 1
+            if in_memory:
+                self._memory_bytes -= size
+            else:
+                self._disk_bytes -= size
+            self._condition.notify_all()
+    
+    @contextmanager
+    def acquire(self, size: Optional[int]) -> Iterator[SpoolBuffer]:
+        """
+        Reserve a buffer for an object, waiting for budget if needed
+        
+        The spool file (if any) is removed when the context exits.
+        
+        Args:
+            size: Object size in bytes (None if unknown)
+        
+        Yields:
+            SpoolBuffer to download into and upload from
+        """
+        in_memory = size is not None and size <= self.memory_threshold
+        reserved = size or 0
+        self._reserve(reserved, in_memory)
+        
+        path = None
+        try:
+            if not in_memory:
+                with tempfile.NamedTemporaryFile(delete=False, dir=self.directory) as tmp:
+                    path = tmp.name
+            yield SpoolBuffer(reserved, path)
+        
+        finally:
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except Exception as e:
+                    logger.warning(f"Failed to remove temporary file {path}: {e}")
+            self._release(reserved, in_memory)
+    
+    def log_stats(self):
+        """Log buffer usage since the last reset_stats()"""
+        stats = self.stats()
+        logger.info(
+            f"Spool: peak {stats['peak_memory_bytes']} bytes in memory, "
+            f"{stats['peak_disk_bytes']} bytes on disk; "
+            f"{stats['waits']} waits for budget ({stats['wait_seconds']:.1f}s)"
+        )
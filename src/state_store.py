@@ -0,0 +1,258 @@
+"""
+Sync State Store Module
+Persists what has been synced (S3 key -> Google Drive file) in a local SQLite database
+so that the diff does not need a full Google Drive listing on every run
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    identifier TEXT PRIMARY KEY,
+    s3_key TEXT,
+    drive_file_id TEXT NOT NULL,
+    parent_id TEXT,
+    etag TEXT,
+    size INTEGER,
+    md5 TEXT,
+    synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SyncStateStore:
+    """SQLite-backed record of synced files, keyed by file identifier"""
+    
+    def __init__(self, db_path: str):
+        """
+        Initialize state store (creates the database if needed)
+        
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        
+        logger.info(f"Sync state store opened: {db_path}")
+    
+    @staticmethod
+    def _to_file_info(row: sqlite3.Row) -> Dict[str, any]:
+        """Convert a database row to the file dict shape used by the Drive listing"""
+        return {
+            'id': row['drive_file_id'],
+            'name': row['identifier'],
+            's3_key': row['s3_key'],
+            'parent_id': row['parent_id'],
+            'etag': row['etag'],
+            'size': row['size'] if row['size'] is not None else 0,
+            'md5': row['md5']
+        }
+    
+    def get(self, identifier: str) -> Optional[Dict[str, any]]:
+        """
+        Get the stored record for a file
+        
+        Args:
+            identifier: File identifier (path in Google Drive)
+        
+        Returns:
+            File information dict if found, None otherwise
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM files WHERE identifier = ?", (identifier,)
+            ).fetchone()
+        return self._to_file_info(row) if row else None
+    
+    def load_all(self) -> Dict[str, Dict[str, any]]:
+        """
+        Load all stored records
+        
+        Returns:
+            Dictionary mapping identifier to file information dict
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM files").fetchall()
+        return {row['identifier']: self._to_file_info(row) for row in rows}
+    
+    def record(
+        self,
+        identifier: str,
+        s3_key: str,
+        drive_file_id: str,
+        parent_id: str = None,
+        etag: str = None,
+        size: int = None,
+        md5: str = None
+    ):
+        """
+        Insert or update the record of a synced file in a single transaction
+        
+        A None parent_id keeps the previously stored value. The md5 is always replaced:
+        the content changed, so a previous md5Checksum would no longer match it.
+        
+        Args:
+            identifier: File identifier (path in Google Drive)
+            s3_key: Source S3 key
+            drive_file_id: Google Drive file ID
+            parent_id: Google Drive parent folder ID
+            etag: S3 ETag of the synced content
+            size: Size in bytes
+            md5: Google Drive md5Checksum
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO files (identifier, s3_key, drive_file_id, parent_id, etag, size, md5, synced_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(identifier) DO UPDATE SET
+                    s3_key = excluded.s3_key,
+                    drive_file_id = excluded.drive_file_id,
+                    parent_id = COALESCE(excluded.parent_id, files.parent_id),
+                    etag = excluded.etag,
+                    size = excluded.size,
+                    md5 = excluded.md5,
+                    synced_at = excluded.synced_at
+                """,
+                (identifier, s3_key, drive_file_id, parent_id, etag, size, md5, time.time())
+            )
+    
+    def remove(self, identifier: str):
+        """
+        Remove the record of a file deleted from Google Drive
+        
+        Args:
+            identifier: File identifier (path in Google Drive)
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE identifier = ?", (identifier,))
+    
+    def rebuild_from_listing(
+        self,
+        gdrive_map: Dict[str, Dict[str, any]],
+        complete: bool = True
+    ) -> Dict[str, Dict[str, any]]:
+        """
+        Replace stored records with a fresh Google Drive listing
+        
+        S3 ETags cannot be read back from Google Drive, so they are carried over
+        for files whose Drive ID is unchanged. Marks the store as verified.
+        
+        A listing that skipped folders (complete=False) only refreshes the files it
+        saw: records it did not cover are kept, and the store is not marked verified,
+        so the next run verifies again.
+        
+        Args:
+            gdrive_map: Dictionary mapping identifier to Drive file information dict
+            complete: Whether the listing covered the whole synced tree
+        
+        Returns:
+            The listing, with stored ETags merged in (plus the kept records when incomplete)
+        """
+        with self._lock, self._conn:
+            rows = list(self._conn.execute("SELECT * FROM files"))
+            previous = {row['identifier']: row for row in rows}
+            if complete:
+                self._conn.execute("DELETE FROM files")
+                merged = {}
+            else:
+                merged = {row['identifier']: self._to_file_info(row) for row in rows}
+            
+            now = time.time()
+            for identifier, gdrive_file in gdrive_map.items():
+                old = previous.get(identifier)
+                same_file = old is not None and old['drive_file_id'] == gdrive_file['id']
+                etag = old['etag'] if same_file else None
+                s3_key = old['s3_key'] if same_file else None
+                
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO files "
+                    "(identifier, s3_key, drive_file_id, parent_id, etag, size, md5, synced_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (identifier, s3_key, gdrive_file['id'], gdrive_file.get('parent_id'), etag,
+                     int(gdrive_file.get('size', 0)), gdrive_file.get('md5'), now)
+                )
+                merged[identifier] = {**gdrive_file, 'etag': etag}
+            
+            if complete:
+                self._set_meta('last_verified', str(now))
+        
+        if complete:
+            logger.info(f"Sync state store rebuilt from Google Drive listing ({len(merged)} files)")
+        else:
+            logger.warning(f"Google Drive listing was incomplete: refreshed {len(gdrive_map)} files, "
+                           "kept the other stored records and left verification due")
+        return merged
+    
+    def _set_meta(self, name: str, value: str):
+        """Set a metadata value (caller holds the lock and transaction)"""
+        self._conn.execute(
+            "INSERT INTO meta (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            (name, value)
+        )
+    
+    def get_meta(self, name: str) -> Optional[str]:
+        """
+        Get a metadata value
+        
+        Args:
+            name: Metadata name
+        
+        Returns:
+            Stored value, or None if not set
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row['value'] if row else None
+    
+    def set_meta(self, name: str, value: str):
+        """
+        Set a metadata value
+        
+        Args:
+            name: Metadata name
+            value: Value to store
+        """
+        with self._lock, self._conn:
+            self._set_meta(name, value)
+    
+    def verification_due(self, interval_seconds: int) -> bool:
+        """
+        Check whether the store should be verified against a full Google Drive listing
+        
+        Args:
+            interval_seconds: Maximum age of the last verification
+        
+        Returns:
+            True if never verified, invalidated, or verified longer ago than interval_seconds
+        """
+        last_verified = self.get_meta('last_verified')
+        if not last_verified:
+            return True
+        return time.time() - float(last_verified) >= interval_seconds
+    
+    def invalidate_verification(self):
+        """Force a full Google Drive listing on the next sync (e.g. after an out-of-band change)"""
+        self.set_meta('last_verified', '')
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,253 @@
+"""
+Streaming Module
+Feeds a sequential stream (e.g. an S3 GetObject body, or ranged reads prefetched in the
+background) into a Google Drive resumable upload without a temporary file
+"""
+
+import logging
+import queue
+import threading
+from typing import Callable, Optional, Tuple
+
+from googleapiclient.http import MediaUpload
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 8 * 1024 * 1024  # Bytes per resumable upload request (multiple of 256 KiB)
+READ_SIZE = 1024 * 1024  # Bytes read from the source stream at a time
+
+
+class StreamRewindError(Exception):
+    """The upload needs bytes that are no longer buffered (the source cannot seek back)"""
+
+
+class StreamReadError(Exception):
+    """Reading the source stream failed part-way (e.g. the S3 connection dropped)"""
+
+
+class StreamingMediaUpload(MediaUpload):
+    """
+    Resumable MediaUpload over a forward-only stream
+    
+    Resumable uploads ask for bytes in increasing offsets, one chunk at a time;
+    after a failed chunk they may ask again from inside that chunk. Only the bytes
+    from the start of the last requested chunk are kept, so memory stays around
+    one chunk whatever the object size. Asking for anything older raises
+    StreamRewindError, and callers fall back to a seekable (temp file) source. A
+    failing read of the source raises StreamReadError, with the same fallback.
+    """
+    
+    def __init__(
+        self,
+        stream,
+        size: Optional[int],
+        mimetype: str = 'application/octet-stream',
+        chunksize: int = STREAM_CHUNK_SIZE
+    ):
+        """
+        Initialize streaming upload
+        
+        Args:
+            stream: Object with read(n) returning bytes (b'' at EOF)
+            size: Total size in bytes, or None if unknown
+            mimetype: Content type of the upload
+            chunksize: Bytes per resumable upload request (multiple of 256 KiB)
+        """
+        super().__init__()
+        self._stream = stream
+        self._size = size
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._buffer = bytearray()
+        self._buffer_start = 0  # Stream offset of self._buffer[0]
+        self._eof = False
+    
+    def chunksize(self) -> int:
+        return self._chunksize
+    
+    def mimetype(self) -> str:
+        return self._mimetype
+    
+    def size(self) -> Optional[int]:
+        return self._size
+    
+    def resumable(self) -> bool:
+        return True
+    
+    def has_stream(self) -> bool:
+        # Not seekable: the client must go through getbytes()
+        return False
+    
+    def _read(self, size: int) -> bytes:
+        """Read from the source stream, wrapping its errors in StreamReadError"""
+        try:
+            return self._stream.read(size)
+        except Exception as e:
+            raise StreamReadError(f"Reading the source stream failed: {e}") from e
+    
+    def _seekable(self) -> bool:
+        seekable = getattr(self._stream, 'seekable', None)
+        return bool(seekable and seekable())
+    
+    def getbytes(self, begin: int, length: int) -> bytes:
+        """
+        Get bytes from the stream, reading forward as needed
+        
+        Args:
+            begin: Offset from the beginning of the stream
+            length: Number of bytes to read, starting at begin
+        
+        Returns:
+            Bytes read (shorter than length at EOF)
+        
+        Raises:
+            StreamRewindError: begin is before the buffered bytes
+            StreamReadError: Reading the source stream failed
+        """
+        if begin < self._buffer_start:
+            raise StreamRewindError(
+                f"Upload asked for offset {begin} but the stream is buffered from {self._buffer_start}"
+            )
+        
+        # Forget everything before the requested chunk (skipping unread bytes if needed)
+        skip = begin - self._buffer_start - len(self._buffer)
+        if skip > 0 and self._seekable():
+            # E.g. a resumed upload: jump to the first byte Drive is missing instead of reading up to it
+            self._stream.seek(begin)
+            self._buffer.clear()
+            self._buffer_start = begin
+            skip = 0
+        while skip > 0 and not self._eof:
+            data = self._read(min(READ_SIZE, skip))
+            self._eof = not data
+            skip -= len(data)
+        del self._buffer[:begin - self._buffer_start]
+        self._buffer_start = begin
+        
+        while len(self._buffer) < length and not self._eof:
+            data = self._read(min(READ_SIZE, length - len(self._buffer)))
+            if not data:
+                self._eof = True
+            self._buffer.extend(data)
+        
+        return bytes(self._buffer[:length])
+    
+    def to_json(self):
+        raise NotImplementedError("Streaming uploads cannot be serialized")
+
+
+class PrefetchReader:
+    """
+    Forward-only reader over ranged S3 reads, fetching ahead on a background thread
+    
+    While the caller sends chunk N (e.g. to a Drive resumable session), up to depth
+    following chunks are already being downloaded, so a large object moves at close
+    to the slower of the two links instead of alternating between them. Memory is
+    bounded to about (depth + 1) chunks.
+    """
+    
+    def __init__(
+        self,
+        read_range: Callable[[int, int], Optional[Tuple[bytes, int]]],
+        size: int,
+        chunksize: int = STREAM_CHUNK_SIZE,
+        depth: int = 2,
+        first_chunk: bytes = b''
+    ):
+        """
+        Initialize prefetch reader
+        
+        Args:
+            read_range: Callable (start, length) -> (bytes, total size) or None on error
+            size: Total size in bytes
+            chunksize: Bytes per ranged read
+            depth: Number of chunks fetched ahead of the reader
+            first_chunk: Bytes already read from the start of the object, if any
+        """
+        self._read_range = read_range
+        self._size = size
+        self._chunksize = chunksize
+        self._chunks = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._buffer = memoryview(first_chunk)
+        self._next_offset = len(first_chunk)  # First byte not yet requested by the prefetcher
+        self._thread = None
+        self._done = self._next_offset >= size
+    
+    def _prefetch(self):
+        """Background loop: queue chunks in order, then None (or the error that stopped it)"""
+        offset = self._next_offset
+        try:
+            while offset < self._size and not self._stop.is_set():
+                result = self._read_range(offset, min(self._chunksize, self._size - offset))
+                if result is None or not result[0]:
+                    raise IOError(f"Ranged read failed at offset {offset}")
+                offset += len(result[0])
+                if not self._put(result[0]):
+                    return
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+    
+    def _put(self, item) -> bool:
+        """Queue an item, giving up if the reader was closed"""
+        while not self._stop.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to size bytes (b'' at the end)
+        
+        Args:
+            size: Maximum number of bytes (-1 for the rest of the object)
+            
+        Returns:
+            Bytes read
+        """
+        if not self._buffer and not self._done:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._prefetch, name="s3-prefetch", daemon=True)
+                self._thread.start()
+            item = self._chunks.get()
+            if isinstance(item, Exception):
+                raise item
+            if item is None:
+                self._done = True
+            else:
+                self._buffer = memoryview(item)
+        
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        self._buffer = self._buffer[size:]
+        return data
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def seek(self, offset: int):
+        """
+        Continue reading from another offset, restarting the prefetch there
+        
+        Args:
+            offset: Offset from the beginning of the object
+        """
+        self.close()
+        self._stop = threading.Event()
+        self._thread = None
+        self._next_offset = offset
+        self._done = offset >= self._size
+    
+    def close(self):
+        """Stop prefetching and release buffered chunks"""
+        self._stop.set()
+        self._buffer = memoryview(b'')
+        if self._thread is not None:
+            self._thread.join()
+        while not self._chunks.empty():
+            self._chunks.get_nowait()
@@ -3,13 +3,26 @@ Sync Manager Module
 Handles the one-way synchronization from S3 to Google Drive
 """
 
+import asyncio
 import logging
-import os
-import tempfile
-from typing import Dict, Set
+import threading
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+from googleapiclient.errors import HttpError
+
+from .async_pipeline import AsyncSyncPipeline
+from .change_detection import content_changed, source_properties
+from .drive_changes import RemoteTreeCache
+from .folder_cache import FolderCache, is_stale_folder_error
 from .gdrive_client import GDriveClient
 from .s3_client import S3Client
+from .spool import SpoolBuffer, SpoolManager
+from .state_store import SyncStateStore
+from .streaming import STREAM_CHUNK_SIZE, PrefetchReader, StreamingMediaUpload, StreamReadError, StreamRewindError
+from .transfer_engine import TransferEngine
+from .transfer_scheduler import TransferScheduler
+from .upload_journal import UploadJournal
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +30,24 @@ logger = logging.getLogger(__name__)
 class SyncManager:
     """Manages one-way synchronization from S3 to Google Drive"""
     
-    def __init__(self, s3_client: S3Client, gdrive_client: GDriveClient, preserve_structure: bool = True):
+    def __init__(
+        self,
+        s3_client: S3Client,
+        gdrive_client: GDriveClient,
+        preserve_structure: bool = True,
+        state_store: SyncStateStore = None,
+        verify_interval_seconds: int = 86400,
+        remote_view: RemoteTreeCache = None,
+        folder_cache: FolderCache = None,
+        transfer_workers: int = 1,
+        async_pipeline: AsyncSyncPipeline = None,
+        streaming: bool = False,
+        prefetch_depth: int = 0,
+        upload_journal: UploadJournal = None,
+        spool: SpoolManager = None,
+        scheduler: TransferScheduler = None,
+        content_check: bool = False
+    ):
         """
         Initialize Sync Manager
         
@@ -26,13 +56,71 @@ class SyncManager:
             gdrive_client: Initialized Google Drive client
             preserve_structure: If True, recreates S3 directory structure in Google Drive (dir/file.txt -> dir/file.txt)
                                If False, flattens structure using _ (dir/file.txt -> dir_file.txt)
+            state_store: Optional persistent sync state. When set, the diff runs against the
+                         store and Google Drive is only listed to verify it
+            verify_interval_seconds: How often to verify the state store with a full Google Drive listing
+            remote_view: Optional Changes API tree cache used instead of walking the Drive folder tree
+            folder_cache: Optional (persisted) folder path -> ID cache; in-memory when not given
+            transfer_workers: Number of files transferred concurrently. Each worker uses its own
+                              clone() of the S3 and Google Drive clients
+            async_pipeline: Optional asyncio pipeline that runs sync() instead of the threaded path
+            streaming: Stream S3 objects straight into Google Drive resumable uploads instead of
+                       downloading them to a temporary file first (which stays as the fallback)
+            prefetch_depth: With streaming, number of chunks read ahead from S3 with ranged GETs
+                            while the current chunk is uploaded (0 reads one sequential GetObject)
+            upload_journal: Optional journal of open resumable upload sessions, so uploads
+                            interrupted by a crash or restart continue from the last committed byte
+            spool: Buffers between download and upload (default: a temporary file per transfer
+                   in the system temporary directory, without a budget)
+            scheduler: Transfer order and large-file lane (default: listing order, one lane)
+            content_check: Detect same-size changes by comparing the S3 ETag with the Drive
+                           md5Checksum, or with the ETag stamped into appProperties on upload
+                           (see change_detection). Otherwise only size and state-store ETags are compared
         """
+        self._local = threading.local()  # Per-worker clients
+        self._folder_lock = threading.Lock()
+        self.transfer_workers = transfer_workers
+        self.async_pipeline = async_pipeline
+        self.streaming = streaming
+        self.prefetch_depth = prefetch_depth
+        self.upload_journal = upload_journal
+        self.spool = spool or SpoolManager()
+        self.scheduler = scheduler or TransferScheduler()
+        self.content_check = content_check
         self.s3_client = s3_client
         self.gdrive_client = gdrive_client
         self.preserve_structure = preserve_structure
-        self.folder_cache = {}  # Cache for folder IDs {path: folder_id}
+        self.state_store = state_store
+        self.verify_interval_seconds = verify_interval_seconds
+        self.remote_view = remote_view
+        # Cache for folder IDs {path: folder_id}
+        self.folder_cache = folder_cache if folder_cache is not None else FolderCache()
+        self._s3_map = {}  # S3 file info of the current run {identifier: s3_file}
         logger.info(f"Sync Manager initialized (preserve_structure={preserve_structure})")
     
+    @property
+    def s3_client(self) -> S3Client:
+        """S3 client of the current transfer worker (the shared one outside workers)"""
+        return getattr(self._local, 's3_client', self._s3_client)
+    
+    @s3_client.setter
+    def s3_client(self, client: S3Client):
+        self._s3_client = client
+    
+    @property
+    def gdrive_client(self) -> GDriveClient:
+        """Google Drive client of the current transfer worker (the shared one outside workers)"""
+        return getattr(self._local, 'gdrive_client', self._gdrive_client)
+    
+    @gdrive_client.setter
+    def gdrive_client(self, client: GDriveClient):
+        self._gdrive_client = client
+    
+    def _init_transfer_worker(self):
+        """Give the current worker thread its own clients (httplib2 is not thread-safe)"""
+        self._local.s3_client = self._s3_client.clone()
+        self._local.gdrive_client = self._gdrive_client.clone()
+    
     def _parse_s3_key(self, s3_key: str) -> tuple[str, str]:
         """
         Parse S3 key into directory path and filename
@@ -64,13 +152,15 @@ class SyncManager:
         if not path:
             return self.gdrive_client.folder_id
         
-        # Check cache
-        if path in self.folder_cache:
-            return self.folder_cache[path]
-        
-        # Create path and cache it
-        folder_id = self.gdrive_client.get_or_create_path(path)
-        self.folder_cache[path] = folder_id
+        # Serialized so concurrent workers never create the same folder twice
+        with self._folder_lock:
+            # Check cache
+            if path in self.folder_cache:
+                return self.folder_cache[path]
+            
+            # Create path and cache it
+            folder_id = self.gdrive_client.get_or_create_path(path)
+            self.folder_cache[path] = folder_id
         
         return folder_id
     
@@ -91,6 +181,119 @@ class SyncManager:
             # Use flattened name (replace / with _)
             return s3_key.replace('/', '_')
     
+    def _list_gdrive_files(self) -> Tuple[List[Dict[str, any]], bool]:
+        """
+        List Google Drive files, through the Changes API cache when configured
+        
+        The folders seen by a complete listing replace the folder cache, so existing
+        folders resolve without any API call; an incomplete one only adds to it.
+        
+        Returns:
+            Tuple of (Google Drive file information dicts (name is the full path),
+            whether the listing covered the whole tree)
+        """
+        if self.remote_view:
+            self.remote_view.refresh(self.gdrive_client)
+            files, folders = self.remote_view.files(), self.remote_view.folders()
+            complete = True
+        else:
+            files, folders = self.gdrive_client.list_files_with_folders()
+            stats = getattr(self.gdrive_client, 'last_list_stats', None)
+            complete = not (isinstance(stats, dict) and stats.get('errors'))
+        
+        if complete:
+            self.folder_cache.replace(folders)
+        else:
+            self.folder_cache.update(folders)
+        logger.debug(f"Folder cache warmed with {len(folders)} folders from the Google Drive listing")
+        
+        return files, complete
+    
+    def _load_gdrive_map(self) -> Dict[str, Dict[str, any]]:
+        """
+        Get the current Google Drive files, from the state store when possible
+        
+        Returns:
+            Dictionary mapping file identifier to Google Drive file information
+        
+        Raises:
+            RuntimeError: The listing skipped folders and there is no state store to fill the gaps
+        """
+        if self.state_store and not self.state_store.verification_due(self.verify_interval_seconds):
+            logger.info("Using sync state store instead of listing Google Drive")
+            return self.state_store.load_all()
+        
+        gdrive_files, complete = self._list_gdrive_files()
+        
+        # Map: gdrive_name -> gdrive_file_info
+        gdrive_map = {f['name']: f for f in gdrive_files}
+        
+        if self.state_store:
+            return self.state_store.rebuild_from_listing(gdrive_map, complete=complete)
+        
+        if not complete:
+            # Files in the skipped folders would look deleted and be uploaded again as duplicates
+            raise RuntimeError("Google Drive listing skipped folders, aborting this sync")
+        return gdrive_map
+    
+    def _record_synced(self, identifier: str, s3_key: str, gdrive_file_id: str, parent_id: str = None):
+        """
+        Record a completed upload or update in the state store, closing its journaled session
+        
+        Args:
+            identifier: File identifier
+            s3_key: S3 object key
+            gdrive_file_id: Google Drive file ID
+            parent_id: Google Drive parent folder ID (None keeps the stored one)
+        """
+        if self.upload_journal:
+            self.upload_journal.remove(identifier)
+        
+        if not self.state_store:
+            return
+        
+        s3_file = self._s3_map.get(identifier, {})
+        self.state_store.record(
+            identifier,
+            s3_key,
+            gdrive_file_id,
+            parent_id=parent_id,
+            etag=s3_file.get('etag'),
+            size=s3_file.get('size')
+        )
+    
+    def _delete_gdrive_file(self, gdrive_file_id: str, identifier: str) -> bool:
+        """
+        Delete a file from Google Drive and forget it in the state store
+        
+        A file Google Drive no longer has (404) counts as deleted, so a record of a
+        file removed out-of-band is dropped instead of failing on every run.
+        
+        Args:
+            gdrive_file_id: Google Drive file ID
+            identifier: File identifier
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            deleted = self.gdrive_client.delete_file(gdrive_file_id, identifier)
+        except HttpError as e:
+            # GDriveOAuth2Client raises instead of returning False
+            deleted = e.resp.status == 404
+            if deleted:
+                logger.info(f"File already removed from Google Drive: {identifier}")
+        
+        if not deleted:
+            if self.state_store:
+                # The store may be stale (file removed out-of-band): verify on next run
+                self.state_store.invalidate_verification()
+            return False
+        
+        if self.state_store:
+            self.state_store.remove(identifier)
+        return True
+    
     def sync(self) -> Dict[str, int]:
         """
         Perform one-way sync from S3 to Google Drive
@@ -103,6 +306,9 @@ class SyncManager:
         Returns:
             Dictionary with sync statistics (uploaded, updated, deleted, errors)
         """
+        if self.async_pipeline is not None:
+            return self._sync_async()
+        
         stats = {
             'uploaded': 0,
             'updated': 0,
@@ -122,7 +328,6 @@ class SyncManager:
         try:
             # Get files from both sources
             s3_files = self.s3_client.list_files()
-            gdrive_files = self.gdrive_client.list_files()
             
             # Create maps with identifiers
             # Map: file_identifier -> s3_file_info
@@ -130,11 +335,10 @@ class SyncManager:
             for f in s3_files:
                 identifier = self._get_file_identifier(f['key'])
                 s3_map[identifier] = f
+            self._s3_map = s3_map
             
-            # Map: gdrive_name -> gdrive_file_info  
-            # Note: With preserve_structure, this only works for root level files
-            # TODO: Implement recursive listing for folder structure
-            gdrive_map = {f['name']: f for f in gdrive_files}
+            # Map: file_identifier -> gdrive_file_info (listing or state store)
+            gdrive_map = self._load_gdrive_map()
             
             s3_identifiers: Set[str] = set(s3_map.keys())
             gdrive_names: Set[str] = set(gdrive_map.keys())
@@ -155,42 +359,12 @@ class SyncManager:
             logger.info(f"Files to check for updates: {len(files_to_check)}")
             logger.info(f"Files to delete: {len(files_to_delete)}")
             
-            # Upload new files
-            for identifier in files_to_upload:
-                logger.info(f"Processing new file: {identifier}")
-                s3_file = s3_map[identifier]
-                if self._upload_file(identifier, s3_file['key']):
-                    stats['uploaded'] += 1
-                else:
-                    stats['errors'] += 1
+            # Upload, update and delete through the transfer engine (stats aggregated across workers)
+            self.spool.reset_stats()
+            self._run_transfers(s3_map, gdrive_map, files_to_upload, files_to_check, files_to_delete, stats)
+            self.spool.log_stats()
             
-            # Check and update existing files if needed
-            for identifier in files_to_check:
-                s3_file = s3_map[identifier]
-                gdrive_file = gdrive_map[identifier]
-                
-                # Check if file sizes differ (simple check for modifications)
-                s3_size = s3_file['size']
-                gdrive_size = int(gdrive_file.get('size', 0))
-                
-                if s3_size != gdrive_size:
-                    logger.info(f"File size mismatch for {identifier}: S3={s3_size}, GDrive={gdrive_size}")
-                    if self._update_file(identifier, gdrive_file['id'], s3_file['key']):
-                        stats['updated'] += 1
-                    else:
-                        stats['errors'] += 1
-                else:
-                    logger.debug(f"File unchanged: {identifier}")
-                    stats['unchanged'] += 1
-            
-            # Delete files that are no longer in S3
-            for identifier in files_to_delete:
-                gdrive_file = gdrive_map[identifier]
-                logger.info(f"Deleting file from Google Drive: {identifier}")
-                if self.gdrive_client.delete_file(gdrive_file['id'], identifier):
-                    stats['deleted'] += 1
-                else:
-                    stats['errors'] += 1
+            self.folder_cache.save()
             
             logger.info("=" * 60)
             logger.info("Synchronization completed")
@@ -203,6 +377,332 @@ class SyncManager:
             logger.error(f"Error during synchronization: {e}", exc_info=True)
             raise
     
+    def _sync_async(self) -> Dict[str, int]:
+        """
+        Perform the sync through the asyncio pipeline
+        
+        Returns:
+            Dictionary with sync statistics (uploaded, updated, deleted, errors, unchanged)
+        """
+        logger.info("=" * 60)
+        logger.info("Starting asyncio synchronization from S3 to Google Drive")
+        logger.info("=" * 60)
+        
+        try:
+            stats = asyncio.run(self.async_pipeline.run())
+        except Exception as e:
+            logger.error(f"Error during synchronization: {e}", exc_info=True)
+            raise
+        
+        self.folder_cache.save()
+        
+        logger.info("=" * 60)
+        logger.info("Synchronization completed")
+        logger.info(f"Statistics: {stats}")
+        logger.info("=" * 60)
+        
+        return stats
+    
+    def _run_transfers(
+        self,
+        s3_map: Dict[str, Dict[str, any]],
+        gdrive_map: Dict[str, Dict[str, any]],
+        files_to_upload: Set[str],
+        files_to_check: Set[str],
+        files_to_delete: Set[str],
+        stats: Dict[str, int]
+    ):
+        """
+        Run the transfers of a sync in scheduler order, with large files in their own lane
+        
+        Args:
+            s3_map: Dictionary mapping identifier to S3 file information
+            gdrive_map: Dictionary mapping identifier to Google Drive file information
+            files_to_upload: Identifiers only in S3
+            files_to_check: Identifiers in both S3 and Google Drive
+            files_to_delete: Identifiers only in Google Drive
+            stats: Sync statistics, updated in place
+        """
+        upload_small, upload_large = self.scheduler.split(files_to_upload, s3_map)
+        check_small, check_large = self.scheduler.split(files_to_check, s3_map)
+        
+        tasks = self._transfer_tasks(s3_map, gdrive_map, upload_small, check_small, files_to_delete, stats)
+        engine = TransferEngine(self.transfer_workers, worker_init=self._init_transfer_worker)
+        if not (upload_large or check_large):
+            engine.run(tasks, stats)
+            return
+        
+        logger.info(f"Large-file lane: {len(upload_large)} to upload, {len(check_large)} to check")
+        large_stats = dict.fromkeys(stats, 0)
+        large_tasks = self._transfer_tasks(s3_map, gdrive_map, upload_large, check_large, [], large_stats)
+        large_engine = TransferEngine(self.scheduler.large_workers, worker_init=self._init_transfer_worker)
+        self.scheduler.run_lanes((engine, tasks), (large_engine, large_tasks), stats, large_stats)
+    
+    def _transfer_tasks(
+        self,
+        s3_map: Dict[str, Dict[str, any]],
+        gdrive_map: Dict[str, Dict[str, any]],
+        files_to_upload: Iterable[str],
+        files_to_check: Iterable[str],
+        files_to_delete: Iterable[str],
+        stats: Dict[str, int]
+    ) -> Iterator[Tuple[str, Callable[[], bool]]]:
+        """
+        Generate the transfer tasks of a sync: uploads, then updates, then deletes
+        
+        Files that need no update are counted as unchanged here and produce no task.
+        
+        Args:
+            s3_map: Dictionary mapping identifier to S3 file information
+            gdrive_map: Dictionary mapping identifier to Google Drive file information
+            files_to_upload: Identifiers only in S3
+            files_to_check: Identifiers in both S3 and Google Drive
+            files_to_delete: Identifiers only in Google Drive
+            stats: Sync statistics
+            
+        Yields:
+            (stat name, callable returning True on success) pairs for TransferEngine
+        """
+        # Upload new files
+        for identifier in files_to_upload:
+            logger.info(f"Processing new file: {identifier}")
+            s3_file = s3_map[identifier]
+            yield 'uploaded', partial(self._upload_file, identifier, s3_file['key'])
+        
+        # Check and update existing files if needed
+        for identifier in files_to_check:
+            s3_file = s3_map[identifier]
+            gdrive_file = gdrive_map[identifier]
+            
+            reason = self._change_reason(s3_file, gdrive_file)
+            
+            if reason:
+                logger.info(f"File changed: {identifier} ({reason})")
+                yield 'updated', partial(self._update_synced_file, identifier, gdrive_file['id'], s3_file['key'])
+            else:
+                logger.debug(f"File unchanged: {identifier}")
+                stats['unchanged'] += 1
+        
+        # Delete files that are no longer in S3
+        for identifier in files_to_delete:
+            gdrive_file = gdrive_map[identifier]
+            logger.info(f"Deleting file from Google Drive: {identifier}")
+            yield 'deleted', partial(self._delete_gdrive_file, gdrive_file['id'], identifier)
+    
+    def _change_reason(self, s3_file: Dict[str, any], gdrive_file: Dict[str, any]) -> Optional[str]:
+        """
+        Decide whether a file present on both sides needs an update
+        
+        Args:
+            s3_file: S3 file information
+            gdrive_file: Google Drive file information
+            
+        Returns:
+            Reason for the update, or None when the file is unchanged
+        """
+        if self.content_check:
+            return content_changed(s3_file, gdrive_file)
+        
+        # Check if file sizes differ (simple check for modifications)
+        s3_size = s3_file['size']
+        gdrive_size = int(gdrive_file.get('size', 0))
+        if s3_size != gdrive_size:
+            return f"size S3={s3_size}, GDrive={gdrive_size}"
+        
+        # ETag of the last synced content, only known through the state store
+        synced_etag = gdrive_file.get('etag')
+        if synced_etag and synced_etag != s3_file.get('etag'):
+            return "ETag changed since last sync"
+        return None
+    
+    def _update_synced_file(self, identifier: str, gdrive_file_id: str, s3_key: str) -> bool:
+        """
+        Update a file found by the diff, flagging the state store for verification on failure
+        
+        Args:
+            identifier: File identifier
+            gdrive_file_id: Google Drive file ID
+            s3_key: S3 object key
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if self._update_file(identifier, gdrive_file_id, s3_key):
+            return True
+        
+        if self.state_store:
+            # The stored Drive file may be gone: verify on next run
+            self.state_store.invalidate_verification()
+        return False
+    
+    def _find_gdrive_file(self, s3_key: str) -> Optional[Dict[str, any]]:
+        """
+        Look up the Google Drive file that mirrors an S3 key, without creating folders
+        
+        Args:
+            s3_key: S3 object key
+            
+        Returns:
+            Google Drive file information dict if found, None otherwise
+        """
+        if not self.preserve_structure:
+            return self.gdrive_client.find_file_by_name(self._get_file_identifier(s3_key))
+        
+        dir_path, filename = self._parse_s3_key(s3_key)
+        
+        if not dir_path:
+            folder_id = self.gdrive_client.folder_id
+        elif dir_path in self.folder_cache:
+            folder_id = self.folder_cache[dir_path]
+        else:
+            folder_id = self.gdrive_client.find_path(dir_path)
+            if not folder_id:
+                return None
+            self.folder_cache[dir_path] = folder_id
+        
+        return self.gdrive_client.find_file_by_name(filename, folder_id)
+    
+    @staticmethod
+    def _coalesce_events(events: List[Dict[str, any]]) -> Dict[str, Dict[str, any]]:
+        """
+        Keep only the most recent event for each S3 key
+        
+        S3 sequencers are hex strings that only compare correctly for the same key
+        once padded to the same length; events without a sequencer keep arrival order.
+        
+        Args:
+            events: Parsed S3 key events
+            
+        Returns:
+            Dictionary mapping S3 key to its latest event
+        """
+        latest = {}
+        for event in events:
+            key = event['key']
+            current = latest.get(key)
+            if current is not None:
+                width = max(len(current.get('sequencer') or ''), len(event.get('sequencer') or ''))
+                if (current.get('sequencer') or '').ljust(width, '0') > (event.get('sequencer') or '').ljust(width, '0'):
+                    continue
+            latest[key] = event
+        return latest
+    
+    def sync_events(self, events: List[Dict[str, any]]) -> Dict[str, int]:
+        """
+        Incrementally sync only the S3 keys affected by event notifications
+        
+        Created keys are uploaded (or updated if they already exist in Google Drive),
+        removed keys are deleted from Google Drive. No full listing is performed.
+        
+        Args:
+            events: Parsed S3 key events (see event_queue.parse_s3_notification)
+            
+        Returns:
+            Dictionary with sync statistics (uploaded, updated, deleted, errors)
+        """
+        stats = {
+            'uploaded': 0,
+            'updated': 0,
+            'deleted': 0,
+            'errors': 0,
+            'unchanged': 0
+        }
+        
+        latest = self._coalesce_events(events)
+        self._s3_map = {
+            self._get_file_identifier(key): {'key': key, 'size': event.get('size'), 'etag': event.get('etag')}
+            for key, event in latest.items()
+        }
+        logger.info(f"Processing {len(latest)} changed keys from {len(events)} S3 events")
+        
+        for s3_key, event in latest.items():
+            # Directory markers are never synced as files
+            if s3_key.endswith('/') or (event.get('size') == 0 and '/' in s3_key):
+                continue
+            
+            identifier = self._get_file_identifier(s3_key)
+            
+            try:
+                gdrive_file = self._find_gdrive_file(s3_key)
+                
+                if event['action'] == 'created':
+                    if gdrive_file:
+                        logger.info(f"Processing changed file: {identifier}")
+                        success = self._update_file(identifier, gdrive_file['id'], s3_key)
+                        stat = 'updated'
+                    else:
+                        logger.info(f"Processing new file: {identifier}")
+                        success = self._upload_file(identifier, s3_key)
+                        stat = 'uploaded'
+                else:
+                    if not gdrive_file:
+                        logger.debug(f"Removed file not present in Google Drive: {identifier}")
+                        stats['unchanged'] += 1
+                        continue
+                    logger.info(f"Deleting file from Google Drive: {identifier}")
+                    success = self._delete_gdrive_file(gdrive_file['id'], identifier)
+                    stat = 'deleted'
+            
+            except Exception as e:
+                logger.error(f"Error processing event for {s3_key}: {e}", exc_info=True)
+                success = False
+            
+            if success:
+                stats[stat] += 1
+            else:
+                stats['errors'] += 1
+        
+        self.folder_cache.save()
+        logger.info(f"Event sync completed: {stats}")
+        return stats
+    
+    def _resume_options(self, identifier: str, target: str) -> Dict[str, any]:
+        """
+        Build the resumable session options of an upload from the upload journal
+        
+        A journaled session is reused when it was opened for the same target and the
+        S3 object still has the same ETag; every committed chunk is journaled.
+        
+        Args:
+            identifier: File identifier
+            target: 'create' for a new file, or the Google Drive file ID being updated
+            
+        Returns:
+            Keyword arguments for the Google Drive upload methods (empty without a journal
+            or when the S3 ETag is unknown)
+        """
+        etag = self._s3_map.get(identifier, {}).get('etag')
+        if not self.upload_journal or not etag:
+            return {}
+        
+        session = self.upload_journal.get(identifier, target, etag)
+        if session:
+            logger.info(f"Resuming upload of {identifier} ({session['committed']} bytes already committed)")
+        
+        return {
+            'session_uri': session['session_uri'] if session else None,
+            'on_progress': partial(self.upload_journal.save, identifier, target, etag)
+        }
+    
+    def _upload_options(self, identifier: str, target: str) -> Dict[str, any]:
+        """
+        Build the keyword arguments of a Google Drive upload or update
+        
+        Args:
+            identifier: File identifier
+            target: 'create' for a new file, or the Google Drive file ID being updated
+            
+        Returns:
+            Resumable session options, plus the appProperties stamp of the S3 content
+            when content_check is enabled
+        """
+        options = self._resume_options(identifier, target)
+        if self.content_check:
+            stamp = source_properties(self._s3_map.get(identifier, {}))
+            if stamp:
+                options['app_properties'] = stamp
+        return options
+    
     def _upload_file(self, identifier: str, s3_key: str) -> bool:
         """
         Download file from S3 and upload to Google Drive
@@ -214,41 +714,49 @@ class SyncManager:
         Returns:
             True if successful, False otherwise
         """
-        temp_file = None
-        try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                temp_file = tmp.name
-            
-            logger.info(f"Downloading from S3: {s3_key}")
-            
-            # Download from S3 using the original S3 key
-            if not self.s3_client.download_file(s3_key, temp_file):
-                logger.error(f"Failed to download file from S3: {s3_key}")
+        resume = self._upload_options(identifier, 'create')
+        
+        if self.streaming:
+            try:
+                return self._upload_file_streaming(identifier, s3_key, resume)
+            except (StreamRewindError, StreamReadError) as e:
+                logger.warning(f"Cannot stream {s3_key} ({e}), falling back to a spool buffer")
+            except Exception as e:
+                logger.error(f"Error uploading file {identifier}: {e}", exc_info=True)
                 return False
-            
-            # Determine target folder and filename
-            if self.preserve_structure:
-                # Parse path and filename
-                dir_path, filename = self._parse_s3_key(s3_key)
-                
-                # Get or create the target folder
-                target_folder_id = self._get_gdrive_folder_for_path(dir_path)
+        
+        try:
+            with self.spool.acquire(self._s3_map.get(identifier, {}).get('size')) as buffer:
+                logger.info(f"Downloading from S3: {s3_key}")
                 
-                logger.info(f"Uploading to Google Drive: {filename} (in folder: {dir_path or 'root'})")
+                # Download from S3 using the original S3 key
+                if not self._download_to_spool(s3_key, buffer):
+                    logger.error(f"Failed to download file from S3: {s3_key}")
+                    return False
                 
-                # Upload to the correct folder
-                file_id = self.gdrive_client.upload_file(temp_file, filename, target_folder_id)
-            else:
-                # Flatten mode: replace / with _
-                filename = identifier
-                logger.info(f"Uploading to Google Drive as: {filename}")
-                
-                # Upload to root folder
-                file_id = self.gdrive_client.upload_file(temp_file, filename)
+                # Determine target folder and filename
+                if self.preserve_structure:
+                    # Parse path and filename
+                    dir_path, filename = self._parse_s3_key(s3_key)
+                    
+                    logger.info(f"Uploading to Google Drive: {filename} (in folder: {dir_path or 'root'})")
+                    
+                    # Upload to the correct folder (created if needed)
+                    file_id, target_folder_id = self._upload_to_folder(
+                        self._spool_uploader(buffer, filename, resume), dir_path
+                    )
+                else:
+                    # Flatten mode: replace / with _
+                    filename = identifier
+                    target_folder_id = self.gdrive_client.folder_id
+                    logger.info(f"Uploading to Google Drive as: {filename}")
+                    
+                    # Upload to root folder
+                    file_id = self._spool_uploader(buffer, filename, resume)()
             
             if file_id:
                 logger.info(f"Successfully synced new file: {identifier}")
+                self._record_synced(identifier, s3_key, file_id, target_folder_id)
                 return True
             else:
                 logger.error(f"Failed to upload file to Google Drive: {identifier}")
@@ -257,14 +765,70 @@ class SyncManager:
         except Exception as e:
             logger.error(f"Error uploading file {identifier}: {e}", exc_info=True)
             return False
+    
+    def _download_to_spool(self, s3_key: str, buffer: SpoolBuffer) -> bool:
+        """
+        Download an S3 object into a spool buffer
         
-        finally:
-            # Clean up temporary file
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except Exception as e:
-                    logger.warning(f"Failed to remove temporary file {temp_file}: {e}")
+        Args:
+            s3_key: S3 object key
+            buffer: Buffer from the spool manager
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if buffer.in_memory:
+            return self.s3_client.download_fileobj(s3_key, buffer.file)
+        return self.s3_client.download_file(s3_key, buffer.path)
+    
+    def _spool_uploader(self, buffer: SpoolBuffer, filename: str, resume: Dict[str, any]) -> Callable[..., Optional[str]]:
+        """
+        Build the Google Drive upload call for a spool buffer
+        
+        Args:
+            buffer: Buffer holding the downloaded object
+            filename: Name of the file in Google Drive
+            resume: Upload options from _upload_options()
+            
+        Returns:
+            Callable taking an optional parent folder ID and returning the new file ID
+        """
+        if buffer.in_memory:
+            return partial(self.gdrive_client.upload_media, buffer.media(), filename, **resume)
+        return partial(self.gdrive_client.upload_file, buffer.path, filename, **resume)
+    
+    def _upload_to_folder(self, upload: Callable[[str], Optional[str]], dir_path: str) -> Tuple[Optional[str], str]:
+        """
+        Upload a file into the Google Drive folder for a path
+        
+        If Drive answers 404 for an upload into a cached folder, the cached ID is stale
+        (the folder was deleted since it was cached): the folder and its subtree are
+        dropped from the cache, resolved again and the upload is retried once. Any other
+        failure (quota, 5xx, network, stream errors) leaves the cache alone; those are
+        retried by the clients' retry policy or handled by the caller.
+        
+        Args:
+            upload: Callable uploading the file into the given folder ID, returning the file ID
+            dir_path: Directory path (e.g., 'dir1/dir2' or '' for root)
+            
+        Returns:
+            Tuple of (uploaded file ID or None, target folder ID)
+        """
+        from_cache = bool(dir_path) and dir_path in self.folder_cache
+        folder_id = self._get_gdrive_folder_for_path(dir_path)
+        
+        try:
+            return upload(folder_id), folder_id
+        except Exception as e:
+            if not (from_cache and is_stale_folder_error(e)):
+                raise
+            logger.warning(f"Cached folder {dir_path} no longer exists: {e}")
+        
+        logger.info(f"Re-resolving folder {dir_path} after a failed upload")
+        with self._folder_lock:
+            self.folder_cache.invalidate(dir_path)
+        folder_id = self._get_gdrive_folder_for_path(dir_path)
+        return upload(folder_id), folder_id
     
     def _update_file(self, filename: str, gdrive_file_id: str, s3_key: str) -> bool:
         """
@@ -278,26 +842,39 @@ class SyncManager:
         Returns:
             True if successful, False otherwise
         """
-        temp_file = None
-        try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                temp_file = tmp.name
-            
-            logger.info(f"Downloading from S3 for update: {s3_key}")
-            
-            # Download from S3 using the original S3 key
-            if not self.s3_client.download_file(s3_key, temp_file):
-                logger.error(f"Failed to download file from S3: {s3_key}")
+        resume = self._upload_options(filename, gdrive_file_id)
+        
+        if self.streaming:
+            try:
+                return self._update_file_streaming(filename, gdrive_file_id, s3_key, resume)
+            except (StreamRewindError, StreamReadError) as e:
+                logger.warning(f"Cannot stream {s3_key} ({e}), falling back to a spool buffer")
+            except Exception as e:
+                logger.error(f"Error updating file {filename}: {e}", exc_info=True)
                 return False
+        
+        try:
+            with self.spool.acquire(self._s3_map.get(filename, {}).get('size')) as buffer:
+                logger.info(f"Downloading from S3 for update: {s3_key}")
+                
+                # Download from S3 using the original S3 key
+                if not self._download_to_spool(s3_key, buffer):
+                    logger.error(f"Failed to download file from S3: {s3_key}")
+                    return False
+                
+                # Get identifier for logging
+                identifier = self._get_file_identifier(s3_key)
+                logger.info(f"Updating in Google Drive: {identifier}")
+                
+                # Update in Google Drive (filename stays the same, just update content)
+                if buffer.in_memory:
+                    updated = self.gdrive_client.update_media(gdrive_file_id, buffer.media(), filename, **resume)
+                else:
+                    updated = self.gdrive_client.update_file(gdrive_file_id, buffer.path, filename, **resume)
             
-            # Get identifier for logging
-            identifier = self._get_file_identifier(s3_key)
-            logger.info(f"Updating in Google Drive: {identifier}")
-            
-            # Update in Google Drive (filename stays the same, just update content)
-            if self.gdrive_client.update_file(gdrive_file_id, temp_file, filename):
+            if updated:
                 logger.info(f"Successfully updated file: {identifier}")
+                self._record_synced(filename, s3_key, gdrive_file_id)
                 return True
             else:
                 logger.error(f"Failed to update file in Google Drive: {identifier}")
@@ -306,11 +883,125 @@ class SyncManager:
         except Exception as e:
             logger.error(f"Error updating file {filename}: {e}", exc_info=True)
             return False
+    
+    def _open_s3_stream(self, s3_key: str) -> Optional[Tuple[any, int]]:
+        """
+        Open an S3 object for streaming, prefetching ranged chunks when prefetch_depth is set
+        
+        Args:
+            s3_key: S3 object key
+            
+        Returns:
+            Tuple of (reader with read()/close(), size in bytes), or None on error
+        """
+        if self.prefetch_depth <= 0:
+            return self.s3_client.open_stream(s3_key)
+        
+        # The first ranged read also tells the object size
+        first = self.s3_client.read_range(s3_key, 0, STREAM_CHUNK_SIZE)
+        if first is None:
+            return None
+        
+        data, size = first
+        reader = PrefetchReader(
+            partial(self.s3_client.read_range, s3_key),
+            size,
+            chunksize=STREAM_CHUNK_SIZE,
+            depth=self.prefetch_depth,
+            first_chunk=data
+        )
+        return reader, size
+    
+    def _upload_file_streaming(self, identifier: str, s3_key: str, resume: Dict[str, any] = None) -> bool:
+        """
+        Upload a new file by streaming it from S3 GetObject into a resumable upload
+        
+        The object is opened once, outside the stale-folder retry of _upload_to_folder,
+        so stream failures propagate to the caller's spool fallback without touching
+        the folder cache.
+        
+        Args:
+            identifier: File identifier (depends on preserve_structure mode)
+            s3_key: S3 object key
+            resume: Upload options from _upload_options()
+            
+        Returns:
+            True if successful, False otherwise
+        
+        Raises:
+            StreamRewindError: The upload needed to re-read data no longer buffered
+            StreamReadError: Reading the object from S3 failed part-way
+        """
+        opened = self._open_s3_stream(s3_key)
+        if opened is None:
+            logger.error(f"Failed to open file from S3: {s3_key}")
+            return False
         
+        body, size = opened
+        try:
+            media = StreamingMediaUpload(body, size)
+            upload = partial(self.gdrive_client.upload_media, media, **(resume or {}))
+            if self.preserve_structure:
+                dir_path, filename = self._parse_s3_key(s3_key)
+                logger.info(f"Streaming to Google Drive: {filename} (in folder: {dir_path or 'root'})")
+                file_id, target_folder_id = self._upload_to_folder(partial(upload, filename), dir_path)
+            else:
+                filename = identifier
+                target_folder_id = self.gdrive_client.folder_id
+                logger.info(f"Streaming to Google Drive as: {filename}")
+                file_id = upload(filename, None)
         finally:
-            # Clean up temporary file
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except Exception as e:
-                    logger.warning(f"Failed to remove temporary file {temp_file}: {e}")
+            body.close()
+        
+        if file_id:
+            logger.info(f"Successfully synced new file: {identifier}")
+            self._record_synced(identifier, s3_key, file_id, target_folder_id)
+            return True
+        
+        logger.error(f"Failed to upload file to Google Drive: {identifier}")
+        return False
+    
+    def _update_file_streaming(
+        self,
+        filename: str,
+        gdrive_file_id: str,
+        s3_key: str,
+        resume: Dict[str, any] = None
+    ) -> bool:
+        """
+        Update a file by streaming its new content from S3 GetObject into a resumable upload
+        
+        Args:
+            filename: Google Drive filename (identifier)
+            gdrive_file_id: Google Drive file ID
+            s3_key: S3 object key
+            resume: Upload options from _upload_options()
+            
+        Returns:
+            True if successful, False otherwise
+        
+        Raises:
+            StreamRewindError: The upload needed to re-read data no longer buffered
+            StreamReadError: Reading the object from S3 failed part-way
+        """
+        opened = self._open_s3_stream(s3_key)
+        if opened is None:
+            logger.error(f"Failed to open file from S3: {s3_key}")
+            return False
+        
+        body, size = opened
+        try:
+            logger.info(f"Streaming update to Google Drive: {filename}")
+            updated = self.gdrive_client.update_media(
+                gdrive_file_id, StreamingMediaUpload(body, size), filename, **(resume or {})
+            )
+        finally:
+            body.close()
+        
+        if updated:
+            logger.info(f"Successfully updated file: {filename}")
+            self._record_synced(filename, s3_key, gdrive_file_id)
+            return True
+        
+        logger.error(f"Failed to update file in Google Drive: {filename}")
+        return False
@@ -0,0 +1,107 @@
+"""
+Transfer Engine Module
+Runs file transfers (uploads, updates, deletes) on a pool of worker threads fed by a bounded queue
+"""
+
+import logging
+import queue
+import threading
+from typing import Callable, Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A task is (stat name counted on success, callable returning True on success)
+Task = Tuple[str, Callable[[], bool]]
+
+
+class TransferEngine:
+    """
+    Worker pool for transfer tasks
+    
+    Tasks are pulled lazily from an iterable into a bounded queue, so producing
+    tasks for a very large sync never holds more than queue_size of them at once.
+    Each worker runs worker_init once before its first task (e.g. to build its own
+    S3 and Drive clients). With a single worker, tasks run inline in order.
+    """
+    
+    def __init__(self, workers: int = 1, queue_size: int = None, worker_init: Callable[[], None] = None):
+        """
+        Initialize transfer engine
+        
+        Args:
+            workers: Number of transfers in flight
+            queue_size: Maximum number of queued tasks (default: 2 per worker)
+            worker_init: Optional callable run in each worker thread before its first task
+        """
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or self.workers * 2
+        self.worker_init = worker_init
+        self._lock = threading.Lock()
+    
+    def _run_task(self, name: str, task: Callable[[], bool], stats: Dict[str, int]):
+        """Run one task and count it as name on success, as an error otherwise"""
+        try:
+            success = task()
+        except Exception as e:
+            logger.error(f"Transfer task failed: {e}", exc_info=True)
+            success = False
+        
+        with self._lock:
+            if success:
+                stats[name] += 1
+            else:
+                stats['errors'] += 1
+    
+    def _worker(self, tasks: queue.Queue, stats: Dict[str, int]):
+        """Worker thread loop: run queued tasks until the None sentinel"""
+        try:
+            if self.worker_init:
+                self.worker_init()
+        except Exception as e:
+            # Keep draining the queue so the producer never blocks forever
+            logger.error(f"Transfer worker initialization failed: {e}", exc_info=True)
+            while tasks.get() is not None:
+                with self._lock:
+                    stats['errors'] += 1
+            return
+        
+        while True:
+            item = tasks.get()
+            if item is None:
+                return
+            self._run_task(item[0], item[1], stats)
+    
+    def run(self, tasks: Iterable[Task], stats: Dict[str, int]) -> Dict[str, int]:
+        """
+        Run all tasks and aggregate their results into stats
+        
+        Args:
+            tasks: Iterable of (stat name, callable) pairs
+            stats: Statistics dict updated in place ('errors' counts failures)
+        
+        Returns:
+            The updated stats dict
+        """
+        if self.workers == 1:
+            for name, task in tasks:
+                self._run_task(name, task, stats)
+            return stats
+        
+        work_queue = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._worker, args=(work_queue, stats), name=f"transfer-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        
+        try:
+            for task in tasks:
+                work_queue.put(task)
+        finally:
+            for _ in threads:
+                work_queue.put(None)
+            for thread in threads:
+                thread.join()
+        
+        return stats
@@ -0,0 +1,167 @@
+"""
+Transfer Scheduler Module
+Orders the files of a sync by a configurable policy and splits them into a small-file lane
+and a large-file lane that run side by side, so one huge object cannot hold up thousands of small ones
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .transfer_engine import Task, TransferEngine
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_POLICIES = ('none', 'smallest', 'oldest', 'prefix')
+
+
+class TransferScheduler:
+    """
+    Size-aware ordering of transfers
+    
+    Policies:
+    - none: listing order (no sorting)
+    - smallest: shortest job first, to maximise files per second
+    - oldest: oldest LastModified first, so the longest-waiting changes land first
+    - prefix: keys under priority_prefixes first (in the order given), then smallest first
+    
+    With large_threshold set, objects of at least that size go to a separate lane
+    with its own large_workers workers, running next to the small-file lane. Large
+    objects then use the chunked transfer paths (multipart/ranged downloads,
+    resumable uploads) without taking a small-file worker.
+    """
+    
+    def __init__(
+        self,
+        policy: str = 'none',
+        large_threshold: int = None,
+        large_workers: int = 1,
+        priority_prefixes: Sequence[str] = ()
+    ):
+        """
+        Initialize transfer scheduler
+        
+        Args:
+            policy: Ordering policy (one of SCHEDULE_POLICIES)
+            large_threshold: Object size from which files go to the large-file lane (None for one lane)
+            large_workers: Concurrent transfers in the large-file lane
+            priority_prefixes: Key prefixes sent first by the 'prefix' policy
+        
+        Raises:
+            ValueError: Unknown policy
+        """
+        if policy not in SCHEDULE_POLICIES:
+            raise ValueError(f"Unknown transfer order '{policy}' (expected one of {', '.join(SCHEDULE_POLICIES)})")
+        
+        self.policy = policy
+        self.large_threshold = large_threshold
+        self.large_workers = max(1, large_workers)
+        self.priority_prefixes = tuple(priority_prefixes)
+    
+    @property
+    def laned(self) -> bool:
+        """True when large files get their own lane"""
+        return self.large_threshold is not None
+    
+    def _prefix_rank(self, key: str) -> int:
+        for rank, prefix in enumerate(self.priority_prefixes):
+            if key.startswith(prefix):
+                return rank
+        return len(self.priority_prefixes)
+    
+    @staticmethod
+    def _modified(s3_file: Dict[str, any]) -> float:
+        last_modified = s3_file.get('last_modified')
+        return last_modified.timestamp() if hasattr(last_modified, 'timestamp') else 0.0
+    
+    def order(self, identifiers: Iterable[str], s3_map: Dict[str, Dict[str, any]]) -> List[str]:
+        """
+        Sort identifiers by the policy
+        
+        Args:
+            identifiers: File identifiers to transfer
+            s3_map: Dictionary mapping identifier to S3 file information
+        
+        Returns:
+            Identifiers in transfer order
+        """
+        identifiers = list(identifiers)
+        if self.policy == 'smallest':
+            identifiers.sort(key=lambda i: s3_map[i]['size'])
+        elif self.policy == 'oldest':
+            identifiers.sort(key=lambda i: self._modified(s3_map[i]))
+        elif self.policy == 'prefix':
+            identifiers.sort(key=lambda i: (self._prefix_rank(s3_map[i]['key']), s3_map[i]['size']))
+        return identifiers
+    
+    def split(
+        self,
+        identifiers: Iterable[str],
+        s3_map: Dict[str, Dict[str, any]]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Order identifiers and divide them between the lanes
+        
+        Args:
+            identifiers: File identifiers to transfer
+            s3_map: Dictionary mapping identifier to S3 file information
+        
+        Returns:
+            Tuple of (small-file lane, large-file lane), each in transfer order
+        """
+        small, large = [], []
+        for identifier in self.order(identifiers, s3_map):
+            if self.laned and s3_map[identifier]['size'] >= self.large_threshold:
+                large.append(identifier)
+            else:
+                small.append(identifier)
+        return small, large
+    
+    def run_lanes(
+        self,
+        small: Tuple[TransferEngine, Iterable[Task]],
+        large: Tuple[TransferEngine, Iterable[Task]],
+        stats: Dict[str, int],
+        large_stats: Dict[str, int]
+    ) -> Dict[str, int]:
+        """
+        Run both lanes at the same time and add their results into stats
+        
+        The large-file lane runs in its own thread with its own stats dict, added
+        into stats when both lanes are done, so the lanes never write the same counters.
+        
+        Args:
+            small: (engine, tasks) of the small-file lane, run in the calling thread
+            large: (engine, tasks) of the large-file lane
+            stats: Statistics dict of the small-file lane, updated in place
+            large_stats: Statistics dict the large-file lane tasks were generated with
+        
+        Returns:
+            The updated stats dict
+        """
+        large_engine, large_tasks = large
+        
+        def run_large():
+            try:
+                if large_engine.workers == 1 and large_engine.worker_init:
+                    # A single-worker engine runs inline, so this thread is its worker
+                    large_engine.worker_init()
+                large_engine.run(large_tasks, large_stats)
+            except Exception as e:
+                logger.error(f"Large-file lane failed: {e}", exc_info=True)
+                large_stats['errors'] += 1
+        
+        thread = threading.Thread(target=run_large, name="transfer-large", daemon=True)
+        thread.start()
+        try:
+            small[0].run(small[1], stats)
+        finally:
+            thread.join()
+        
+        for name, count in large_stats.items():
+            stats[name] = stats.get(name, 0) + count
+        logger.info(
+            f"Large-file lane: {large_stats.get('uploaded', 0)} uploaded, "
+            f"{large_stats.get('updated', 0)} updated, {large_stats.get('errors', 0)} errors"
+        )
+        return stats
@@ -0,0 +1,129 @@
+"""
+Upload Journal Module
+Persists open Google Drive resumable upload sessions in a local SQLite database
+so that an interrupted upload continues from its last committed byte after a restart
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Google Drive keeps a resumable session open for about a week
+SESSION_TTL_SECONDS = 6 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    identifier TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    session_uri TEXT NOT NULL,
+    committed INTEGER NOT NULL,
+    started_at REAL,
+    updated_at REAL
+);
+"""
+
+
+class UploadJournal:
+    """SQLite-backed record of open resumable upload sessions, keyed by file identifier"""
+    
+    def __init__(self, db_path: str):
+        """
+        Initialize upload journal (creates the database if needed)
+        
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        
+        logger.info(f"Upload journal opened: {db_path}")
+    
+    def get(self, identifier: str, target: str, etag: str) -> Optional[Dict[str, any]]:
+        """
+        Get the open session for a file, if it can still be resumed
+        
+        A session for another target (e.g. a different Drive file), for content with
+        another ETag, or older than SESSION_TTL_SECONDS is dropped instead.
+        
+        Args:
+            identifier: File identifier (path in Google Drive)
+            target: What the session writes to ('create' or the Drive file ID being updated)
+            etag: Current S3 ETag of the content
+        
+        Returns:
+            Dict with session_uri and committed (bytes acknowledged), or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM sessions WHERE identifier = ?", (identifier,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        if row['target'] != target or row['etag'] != etag:
+            logger.info(f"Discarding upload session for {identifier}: the source or target changed")
+            self.remove(identifier)
+            return None
+        
+        if time.time() - row['started_at'] > SESSION_TTL_SECONDS:
+            logger.info(f"Discarding expired upload session for {identifier}")
+            self.remove(identifier)
+            return None
+        
+        return {'session_uri': row['session_uri'], 'committed': row['committed']}
+    
+    def save(self, identifier: str, target: str, etag: str, session_uri: str, committed: int):
+        """
+        Record an open session and the bytes it has committed
+        
+        Args:
+            identifier: File identifier (path in Google Drive)
+            target: What the session writes to ('create' or the Drive file ID being updated)
+            etag: S3 ETag of the content being uploaded
+            session_uri: Resumable session URI
+            committed: Bytes acknowledged by Google Drive
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO sessions (identifier, target, etag, session_uri, committed, started_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(identifier) DO UPDATE SET
+                    target = excluded.target,
+                    etag = excluded.etag,
+                    session_uri = excluded.session_uri,
+                    committed = excluded.committed,
+                    started_at = CASE WHEN sessions.session_uri = excluded.session_uri
+                                      THEN sessions.started_at ELSE excluded.started_at END,
+                    updated_at = excluded.updated_at
+                """,
+                (identifier, target, etag, session_uri, committed, now, now)
+            )
+    
+    def remove(self, identifier: str):
+        """
+        Forget the session of a file (completed or no longer resumable)
+        
+        Args:
+            identifier: File identifier (path in Google Drive)
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE identifier = ?", (identifier,))
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -24,6 +24,7 @@ def mock_gdrive_client():
     mock = Mock()
     mock.folder_id = "test-folder-id"
     mock.list_files = Mock(return_value=[])
+    mock.list_files_with_folders = Mock(side_effect=lambda: (mock.list_files(), {}))
     mock.upload_file = Mock(return_value="file-id-123")
     mock.delete_file = Mock(return_value=True)
     mock.find_file_by_name = Mock(return_value=None)
@@ -0,0 +1,252 @@
+"""
+Unit tests for the asyncio sync pipeline, with in-memory stand-ins for S3 and Drive
+"""
+
+import asyncio
+
+import pytest
+
+from src.async_pipeline import AioS3Backend, AsyncSyncPipeline
+from src.sync_manager import SyncManager
+
+
+class FakeS3Backend:
+    """In-memory async S3 backend"""
+    
+    def __init__(self, objects):
+        self.objects = objects
+        self.entered = False
+    
+    async def __aenter__(self):
+        self.entered = True
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.entered = False
+    
+    async def iter_files(self):
+        for key, data in self.objects.items():
+            await asyncio.sleep(0)
+            yield {'key': key, 'size': len(data), 'etag': 'e'}
+    
+    async def read(self, key):
+        await asyncio.sleep(0)
+        if key.startswith('broken'):
+            raise IOError("read failed")
+        return self.objects[key]
+
+
+class FakePaginator:
+    """Async list_objects_v2 paginator over one page"""
+    
+    def __init__(self, contents):
+        self.contents = contents
+    
+    async def _pages(self):
+        yield {'Contents': self.contents}
+    
+    def paginate(self, **kwargs):
+        return self._pages()
+
+
+class FakeDriveBackend:
+    """In-memory async Drive backend recording every call"""
+    
+    folder_id = 'root'
+    
+    def __init__(self, files=(), folders=None):
+        self.files = list(files)
+        self.folders = dict(folders or {})
+        self.uploads = []
+        self.updates = []
+        self.deletes = []
+        self.created_folders = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        pass
+    
+    async def list_files(self):
+        return self.files, self.folders
+    
+    async def upload(self, data, name, parent_id):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        self.uploads.append((name, parent_id, data))
+        return f'id-{name}'
+    
+    async def update(self, file_id, data):
+        self.updates.append((file_id, data))
+        return True
+    
+    async def delete(self, file_id):
+        self.deletes.append(file_id)
+        return True
+    
+    async def get_or_create_folder(self, name, parent_id):
+        await asyncio.sleep(0.001)
+        self.created_folders.append((name, parent_id))
+        return f'folder-{name}'
+
+
+class TestAsyncSyncPipeline:
+    """Test suite for AsyncSyncPipeline"""
+    
+    def test_upload_update_delete(self):
+        """Test the diff produces uploads, updates, deletes and unchanged counts"""
+        s3 = FakeS3Backend({'new.txt': b'new', 'changed.txt': b'longer', 'same.txt': b'abc'})
+        drive = FakeDriveBackend(files=[
+            {'id': 'gd-changed', 'name': 'changed.txt', 'size': 1},
+            {'id': 'gd-same', 'name': 'same.txt', 'size': 3},
+            {'id': 'gd-old', 'name': 'old.txt', 'size': 1}
+        ])
+        
+        stats = asyncio.run(AsyncSyncPipeline(s3, drive, workers=4).run())
+        
+        assert stats == {'uploaded': 1, 'updated': 1, 'deleted': 1, 'errors': 0, 'unchanged': 1}
+        assert drive.uploads == [('new.txt', 'root', b'new')]
+        assert drive.updates == [('gd-changed', b'longer')]
+        assert drive.deletes == ['gd-old']
+    
+    def test_folders_created_once_under_concurrency(self):
+        """Test concurrent uploads into the same new folder create it once, parents first"""
+        s3 = FakeS3Backend({f'docs/img/{n}.png': b'x' for n in range(20)})
+        drive = FakeDriveBackend()
+        
+        stats = asyncio.run(AsyncSyncPipeline(s3, drive, workers=8).run())
+        
+        assert stats['uploaded'] == 20
+        assert drive.created_folders == [('docs', 'root'), ('img', 'folder-docs')]
+        assert {parent for _, parent, _ in drive.uploads} == {'folder-img'}
+        assert drive.max_in_flight > 1
+    
+    def test_listed_folders_are_reused(self):
+        """Test folders from the Drive listing need no folder calls"""
+        s3 = FakeS3Backend({'docs/a.txt': b'a'})
+        drive = FakeDriveBackend(folders={'docs': 'folder-existing'})
+        
+        asyncio.run(AsyncSyncPipeline(s3, drive).run())
+        
+        assert drive.created_folders == []
+        assert drive.uploads == [('a.txt', 'folder-existing', b'a')]
+    
+    def test_flatten_structure(self):
+        """Test flattened names upload into the root folder"""
+        s3 = FakeS3Backend({'docs/a.txt': b'a'})
+        drive = FakeDriveBackend()
+        
+        asyncio.run(AsyncSyncPipeline(s3, drive, preserve_structure=False).run())
+        
+        assert drive.uploads == [('docs_a.txt', 'root', b'a')]
+    
+    def test_transfer_errors_are_counted(self):
+        """Test a failing transfer is counted without stopping the others"""
+        s3 = FakeS3Backend({'broken.txt': b'x', 'ok.txt': b'y'})
+        drive = FakeDriveBackend()
+        
+        stats = asyncio.run(AsyncSyncPipeline(s3, drive, workers=2).run())
+        
+        assert stats['uploaded'] == 1
+        assert stats['errors'] == 1
+    
+    def test_queues_are_bounded(self):
+        """Test a sync larger than the queues completes"""
+        s3 = FakeS3Backend({f'{n}.txt': b'x' for n in range(200)})
+        drive = FakeDriveBackend()
+        
+        stats = asyncio.run(AsyncSyncPipeline(s3, drive, workers=3, queue_size=2).run())
+        
+        assert stats['uploaded'] == 200
+    
+    def test_listing_error_propagates(self):
+        """Test a failed Drive listing fails the sync instead of deleting nothing silently"""
+        s3 = FakeS3Backend({f'{n}.txt': b'x' for n in range(10)})
+        drive = FakeDriveBackend()
+        
+        async def fail():
+            raise RuntimeError("listing failed")
+        drive.list_files = fail
+        
+        with pytest.raises(RuntimeError):
+            asyncio.run(AsyncSyncPipeline(s3, drive, queue_size=2).run())
+    
+    def test_s3_listing_error_deletes_nothing(self):
+        """Test a failed S3 listing propagates without deleting the Drive files it did not reach"""
+        s3 = FakeS3Backend({'a.txt': b'a', 'b.txt': b'b', 'c.txt': b'c'})
+        drive = FakeDriveBackend(files=[
+            {'id': f'id-{name}', 'name': f'{name}.txt', 'size': 1} for name in 'abc'
+        ])
+        
+        async def iter_files():
+            yield {'key': 'a.txt', 'size': 1, 'etag': 'e'}
+            raise ConnectionError("listing dropped")
+        s3.iter_files = iter_files
+        
+        with pytest.raises(ConnectionError):
+            asyncio.run(AsyncSyncPipeline(s3, drive, workers=2).run())
+        
+        assert drive.deletes == []
+    
+    def test_buffer_budget_limits_bytes_in_memory(self):
+        """Test transfers wait for buffer budget, and an oversized file still goes through alone"""
+        s3 = FakeS3Backend({f'{n}.bin': b'x' * 40 for n in range(10)})
+        s3.objects['big.bin'] = b'x' * 500
+        drive = FakeDriveBackend()
+        pipeline = AsyncSyncPipeline(s3, drive, workers=8, max_buffer_bytes=100)
+        peak = []
+        
+        original_upload = drive.upload
+        async def upload(data, name, parent_id):
+            peak.append(pipeline._buffered)
+            return await original_upload(data, name, parent_id)
+        drive.upload = upload
+        
+        stats = asyncio.run(pipeline.run())
+        
+        assert stats['uploaded'] == 11
+        assert max(peak) == 500
+        assert max(value for value in peak if value != 500) <= 100
+        assert pipeline._buffered == 0
+    
+    def test_directory_markers_are_skipped(self):
+        """Test the aiobotocore backend skips the same markers as S3Client.list_files()"""
+        backend = AioS3Backend('key', 'secret', 'us-east-1', 'bucket')
+        backend.client = type('Client', (), {'get_paginator': lambda self, name: FakePaginator([
+            {'Key': 'docs/', 'Size': 0, 'ETag': '"a"'},
+            {'Key': 'docs/placeholder', 'Size': 0, 'ETag': '"b"'},
+            {'Key': 'marker/', 'Size': 5, 'ETag': '"c"'},
+            {'Key': 'docs/a.txt', 'Size': 3, 'ETag': '"d"'},
+            {'Key': 'empty.txt', 'Size': 0, 'ETag': '"e"'}
+        ])})()
+        
+        async def collect():
+            return [item['key'] async for item in backend.iter_files()]
+        
+        assert asyncio.run(collect()) == ['docs/a.txt', 'empty.txt']
+
+
+class TestSyncManagerAsync:
+    """Test suite for selecting the asyncio pipeline in SyncManager"""
+    
+    def test_sync_runs_pipeline(self, mock_s3_client, mock_gdrive_client):
+        """Test sync() delegates to the pipeline and shares the folder cache"""
+        s3 = FakeS3Backend({'docs/a.txt': b'a'})
+        drive = FakeDriveBackend()
+        manager = SyncManager(mock_s3_client, mock_gdrive_client)
+        manager.async_pipeline = AsyncSyncPipeline(s3, drive, folder_cache=manager.folder_cache)
+        
+        stats = manager.sync()
+        
+        assert stats['uploaded'] == 1
+        assert manager.folder_cache == {'docs': 'folder-docs'}
+        mock_s3_client.list_files.assert_not_called()
+        mock_gdrive_client.list_files.assert_not_called()
+        
+        # A second run uses a new event loop
+        assert manager.sync()['unchanged'] == 0
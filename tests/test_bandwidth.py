@@ -0,0 +1,158 @@
+"""
+Unit tests for the bandwidth limiter
+"""
+
+import datetime
+import io
+import threading
+import time
+
+import pytest
+
+from src.bandwidth import RateSchedule, ThrottledReader, TokenBucket, build_limiter
+
+
+class FakeClock:
+    """Monotonic clock advanced only by sleeps"""
+    
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def at(hour, minute=0):
+    return lambda: datetime.datetime(2024, 1, 1, hour, minute)
+
+
+class TestRateSchedule:
+    """Test suite for RateSchedule"""
+    
+    def test_parse_windows(self):
+        """Test windows are parsed into minutes of day and scaled by the unit"""
+        schedule = RateSchedule.parse('08:00-19:00=2, 19:00-08:00=0', default=5, unit=10)
+        
+        assert schedule.windows == [(480, 1140, 20.0), (1140, 480, 0.0)]
+        assert schedule.default == 5
+    
+    def test_rate_at(self):
+        """Test window lookup, including windows past midnight and the default rate"""
+        schedule = RateSchedule([(480, 1140, 100), (1320, 360, 0)], default=50)
+        
+        assert schedule.rate_at(datetime.datetime(2024, 1, 1, 8, 0)) == 100
+        assert schedule.rate_at(datetime.datetime(2024, 1, 1, 18, 59)) == 100
+        assert schedule.rate_at(datetime.datetime(2024, 1, 1, 19, 0)) == 50
+        assert schedule.rate_at(datetime.datetime(2024, 1, 1, 23, 30)) == 0
+        assert schedule.rate_at(datetime.datetime(2024, 1, 1, 2, 0)) == 0
+    
+    @pytest.mark.parametrize('spec', ['08:00=2', '8-19=2', '25:00-08:00=1', '08:00-19:00=fast'])
+    def test_parse_rejects_malformed_windows(self, spec):
+        """Test malformed windows raise ValueError naming the window"""
+        with pytest.raises(ValueError, match='Invalid bandwidth schedule'):
+            RateSchedule.parse(spec)
+
+
+class TestTokenBucket:
+    """Test suite for TokenBucket"""
+    
+    def test_unlimited_never_sleeps(self):
+        """Test a rate of 0 passes everything through"""
+        clock = FakeClock()
+        bucket = TokenBucket(0, clock=clock, sleep=clock.sleep)
+        
+        assert bucket.consume(10 ** 9) == 0
+        assert clock.sleeps == []
+        assert bucket.bytes == 10 ** 9
+    
+    def test_steady_rate(self):
+        """Test back-to-back consumers are paced to the rate"""
+        clock = FakeClock()
+        bucket = TokenBucket(100, clock=clock, sleep=clock.sleep)
+        
+        for _ in range(10):
+            bucket.consume(50)
+        
+        assert clock.now == pytest.approx(5.0)
+        assert bucket.wait_seconds == pytest.approx(5.0)
+    
+    def test_idle_allowance_capped_at_burst(self):
+        """Test an idle period earns at most burst_seconds of allowance"""
+        clock = FakeClock()
+        bucket = TokenBucket(100, burst_seconds=1.0, clock=clock, sleep=clock.sleep)
+        
+        clock.now = 60.0
+        assert bucket.consume(100) == 0
+        assert bucket.consume(100) == pytest.approx(1.0)
+    
+    def test_schedule_switches_rate(self):
+        """Test the schedule decides the rate at the time of each call"""
+        clock = FakeClock()
+        now = [at(9)]
+        bucket = TokenBucket(
+            schedule=RateSchedule([(480, 1140, 100)], default=0),
+            clock=clock, sleep=clock.sleep, now=lambda: now[0]()
+        )
+        
+        assert bucket.rate == 100
+        assert bucket.consume(200) == pytest.approx(2.0)
+        
+        now[0] = at(20)
+        assert bucket.rate == 0
+        assert bucket.consume(10 ** 6) == 0
+    
+    def test_shared_between_threads(self):
+        """Test concurrent consumers share one budget"""
+        bucket = TokenBucket(4000, burst_seconds=0.01)
+        started = time.monotonic()
+        
+        threads = [threading.Thread(target=lambda: [bucket.consume(100) for _ in range(5)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        # 2000 bytes at 4000 B/s: about half a second in total, not per thread
+        assert 0.4 <= time.monotonic() - started < 2.0
+
+
+class TestThrottledReader:
+    """Test suite for ThrottledReader"""
+    
+    def test_charges_bytes_read(self):
+        """Test every read takes tokens for the bytes it returned"""
+        clock = FakeClock()
+        bucket = TokenBucket(100, clock=clock, sleep=clock.sleep)
+        reader = ThrottledReader(io.BytesIO(b'x' * 250), bucket)
+        
+        assert reader.read(200) == b'x' * 200
+        assert reader.read(200) == b'x' * 50
+        assert reader.read(200) == b''
+        
+        assert bucket.bytes == 250
+        assert clock.now == pytest.approx(2.5)
+
+
+class TestBuildLimiter:
+    """Test suite for build_limiter"""
+    
+    def test_no_limit(self):
+        """Test no bucket is built without a rate or schedule"""
+        assert build_limiter(0) is None
+        assert build_limiter(None, '') is None
+    
+    def test_rate_in_units(self):
+        """Test the rate is scaled by the unit"""
+        assert build_limiter(2, unit=1024).rate == 2048
+    
+    def test_schedule_with_default(self):
+        """Test the plain rate applies outside the schedule windows"""
+        bucket = build_limiter(1, '08:00-19:00=4', unit=1024)
+        
+        assert bucket.schedule.windows == [(480, 1140, 4096.0)]
+        assert bucket.schedule.default == 1024
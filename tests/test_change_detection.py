@@ -0,0 +1,65 @@
+"""
+Unit tests for content change detection
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from src.change_detection import content_changed, is_multipart_etag, source_properties
+
+MD5 = '9e107d9d372bb6826bd81d3542a419d6'
+OTHER_MD5 = 'e4d909c290d0fb1ca068ffaddf22cbd0'
+MULTIPART = '6f5902ac237024bdd0c176cb93063dc4-12'
+LAST_MODIFIED = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def s3_file(etag, size=100, last_modified=LAST_MODIFIED):
+    return {'key': 'a.txt', 'size': size, 'etag': etag, 'last_modified': last_modified}
+
+
+class TestSourceProperties:
+    """Test suite for the appProperties stamp"""
+    
+    def test_stamp(self):
+        """Test the stamp holds the ETag and LastModified"""
+        assert source_properties(s3_file(f'"{MULTIPART}"')) == {
+            's3_etag': MULTIPART,
+            's3_last_modified': '2024-05-01T12:00:00+00:00'
+        }
+    
+    def test_no_etag(self):
+        """Test objects without an ETag get no stamp"""
+        assert source_properties({'key': 'a.txt', 'size': 1}) == {}
+    
+    def test_multipart_etag(self):
+        """Test multipart ETags are told apart from MD5s"""
+        assert is_multipart_etag(MULTIPART)
+        assert not is_multipart_etag(f'"{MD5}"')
+
+
+class TestContentChanged:
+    """Test suite for content_changed"""
+    
+    @pytest.mark.parametrize('s3, gdrive, changed', [
+        # Size
+        (s3_file(MD5, size=200), {'size': 100, 'md5': MD5}, True),
+        # Single-part ETag against md5Checksum
+        (s3_file(MD5), {'size': 100, 'md5': MD5}, False),
+        (s3_file(MD5), {'size': '100', 'md5': OTHER_MD5}, True),
+        (s3_file(MD5), {'size': 100}, False),
+        # State store ETag of the last sync wins
+        (s3_file(MD5), {'size': 100, 'md5': OTHER_MD5, 'etag': MD5}, False),
+        (s3_file(MD5), {'size': 100, 'md5': MD5, 'etag': OTHER_MD5}, True),
+        # appProperties stamp
+        (s3_file(MULTIPART), {'size': 100, 'md5': MD5, 'app_properties': {'s3_etag': MULTIPART}}, False),
+        (s3_file(MULTIPART), {'size': 100, 'md5': MD5, 'app_properties': {'s3_etag': 'old-3'}}, True),
+        (s3_file(OTHER_MD5), {'size': 100, 'md5': MD5, 'app_properties': {'s3_etag': OTHER_MD5}}, False),
+        # Unstamped multipart: modified after the Drive copy was written
+        (s3_file(MULTIPART), {'size': 100, 'md5': MD5, 'modified_time': '2024-05-01T13:00:00.000Z'}, False),
+        (s3_file(MULTIPART), {'size': 100, 'md5': MD5, 'modified_time': '2024-05-01T11:00:00.000Z'}, True),
+        (s3_file(MULTIPART), {'size': 100, 'md5': MD5}, False)
+    ])
+    def test_comparison(self, s3, gdrive, changed):
+        """Test size, state store ETag, stamp, md5Checksum and LastModified checks"""
+        assert bool(content_changed(s3, gdrive)) is changed
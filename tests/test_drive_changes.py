@@ -0,0 +1,151 @@
+"""
+Unit tests for the Changes API remote tree cache
+"""
+
+from unittest.mock import Mock
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.drive_changes import RemoteTreeCache
+from src.drive_listing import FOLDER_MIME_TYPE
+
+
+def item(item_id, name, parent, folder=False, size=0, created='2024-01-01T00:00:00.000Z'):
+    """Build a raw Drive item"""
+    return {
+        'id': item_id,
+        'name': name,
+        'parents': [parent],
+        'mimeType': FOLDER_MIME_TYPE if folder else 'text/plain',
+        'size': str(size),
+        'createdTime': created
+    }
+
+
+def change(drive_item=None, file_id=None, removed=False):
+    """Build a changes.list entry"""
+    return {'changeType': 'file', 'fileId': file_id or drive_item['id'], 'removed': removed, 'file': drive_item}
+
+
+def http_error(status):
+    """HttpError as returned by the Drive API"""
+    return HttpError(httplib2.Response({'status': str(status)}), b'{}')
+
+
+def make_client():
+    """Fake Drive client with a small tree under 'root'"""
+    client = Mock()
+    client.get_start_page_token.return_value = 'token-1'
+    client.list_tree.return_value = [
+        item('docs', 'docs', 'root', folder=True),
+        item('f1', 'a.txt', 'docs', size=10),
+        item('f2', 'b.txt', 'root', size=20),
+    ]
+    return client
+
+
+class TestRemoteTreeCache:
+    """Test suite for RemoteTreeCache"""
+    
+    def test_bootstrap_from_full_listing(self, tmp_path):
+        """Test the first refresh takes a cursor and lists the tree once"""
+        client = make_client()
+        cache = RemoteTreeCache(str(tmp_path / "tree.json"), 'root')
+        
+        cache.refresh(client)
+        
+        assert cache.page_token == 'token-1'
+        assert sorted(f['name'] for f in cache.files()) == ['b.txt', 'docs/a.txt']
+        assert cache.folders() == {'docs': 'docs'}
+        client.list_changes.assert_not_called()
+    
+    def test_applies_changes_under_folder_only(self, tmp_path):
+        """Test deltas update the tree and ignore files outside the sync folder"""
+        client = make_client()
+        cache = RemoteTreeCache(str(tmp_path / "tree.json"), 'root')
+        cache.refresh(client)
+        client.list_tree.reset_mock()
+        
+        client.list_changes.return_value = ([
+            change(item('f3', 'new.txt', 'docs', size=5, created='2999-01-01T00:00:00.000Z')),
+            change(item('f1', 'a.txt', 'docs', size=99)),
+            change(file_id='f2', removed=True),
+            change(item('x1', 'elsewhere.txt', 'other-folder')),
+        ], 'token-2')
+        
+        cache.refresh(client)
+        files = {f['name']: f for f in cache.files()}
+        
+        assert cache.page_token == 'token-2'
+        assert set(files) == {'docs/a.txt', 'docs/new.txt'}
+        assert files['docs/a.txt']['size'] == 99
+        client.list_tree.assert_not_called()
+    
+    def test_trashed_folder_drops_subtree(self, tmp_path):
+        """Test trashing a folder removes its descendants from the cache"""
+        client = make_client()
+        cache = RemoteTreeCache(str(tmp_path / "tree.json"), 'root')
+        cache.refresh(client)
+        
+        trashed = item('docs', 'docs', 'root', folder=True)
+        trashed['trashed'] = True
+        client.list_changes.return_value = ([change(trashed)], 'token-2')
+        cache.refresh(client)
+        
+        assert [f['name'] for f in cache.files()] == ['b.txt']
+    
+    def test_moved_in_folder_is_listed(self, tmp_path):
+        """Test a pre-existing folder moved into the tree has its children listed"""
+        client = make_client()
+        cache = RemoteTreeCache(str(tmp_path / "tree.json"), 'root')
+        cache.refresh(client)
+        
+        client.list_changes.return_value = ([change(item('old', 'old', 'root', folder=True))], 'token-2')
+        client.list_tree.return_value = [item('f9', 'inside.txt', 'old', size=1)]
+        cache.refresh(client)
+        
+        client.list_tree.assert_called_with('old')
+        assert 'old/inside.txt' in [f['name'] for f in cache.files()]
+    
+    def test_state_persists(self, tmp_path):
+        """Test the cursor and tree are reloaded from disk"""
+        path = str(tmp_path / "tree.json")
+        RemoteTreeCache(path, 'root').refresh(make_client())
+        
+        reloaded = RemoteTreeCache(path, 'root')
+        other_folder = RemoteTreeCache(path, 'another-root')
+        
+        assert reloaded.page_token == 'token-1'
+        assert len(reloaded.files()) == 2
+        assert other_folder.page_token is None
+    
+    @pytest.mark.parametrize("status", [400, 404])
+    def test_rejected_cursor_rebuilds(self, tmp_path, status):
+        """Test an expired or invalid cursor is discarded and the tree listed again"""
+        client = make_client()
+        cache = RemoteTreeCache(str(tmp_path / "tree.json"), 'root')
+        cache.refresh(client)
+        cache.nodes['stale'] = cache._to_node(item('stale', 'gone.txt', 'root'))
+        client.list_changes.side_effect = http_error(status)
+        client.get_start_page_token.return_value = 'token-2'
+        
+        cache.refresh(client)
+        
+        assert cache.page_token == 'token-2'
+        assert sorted(f['name'] for f in cache.files()) == ['b.txt', 'docs/a.txt']
+        assert RemoteTreeCache(str(tmp_path / "tree.json"), 'root').page_token == 'token-2'
+    
+    def test_other_changes_errors_propagate(self, tmp_path):
+        """Test transient errors keep the cursor for the next refresh"""
+        client = make_client()
+        cache = RemoteTreeCache(str(tmp_path / "tree.json"), 'root')
+        cache.refresh(client)
+        client.list_changes.side_effect = http_error(503)
+        
+        with pytest.raises(HttpError):
+            cache.refresh(client)
+        
+        assert cache.page_token == 'token-1'
+        assert client.list_tree.call_count == 1
@@ -0,0 +1,172 @@
+"""
+Unit tests for pre-generated Drive IDs and idempotent creates
+"""
+
+import json
+import socket
+from unittest.mock import Mock
+
+import httplib2
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaInMemoryUpload
+
+from src.drive_ids import DriveIdPool, execute_create, is_duplicate_id
+from src.drive_quota import DriveQuotaGovernor
+
+
+class FlakyDriveHttp:
+    """Drive server that creates files by their given ID and loses the response of the first create"""
+    
+    def __init__(self):
+        self.files = {}
+        self.creates = 0
+        self.generated = 0
+    
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        if 'generateIds' in uri:
+            self.generated += 1
+            count = int(uri.split('count=')[1].split('&')[0])
+            ids = [f'gen-{self.generated}-{n}' for n in range(count)]
+            return httplib2.Response({'status': '200'}), json.dumps({'ids': ids}).encode()
+        
+        if method == 'POST':
+            self.creates += 1
+            metadata = json.loads(body)
+            if metadata['id'] in self.files:
+                error = {'error': {'code': 409, 'message': 'A file already exists with the provided ID.',
+                                   'errors': [{'reason': 'duplicate'}]}}
+                return httplib2.Response({'status': '409'}), json.dumps(error).encode()
+            self.files[metadata['id']] = metadata
+            if self.creates == 1:
+                raise socket.timeout('timed out')
+            return httplib2.Response({'status': '200'}), json.dumps({'id': metadata['id']}).encode()
+        
+        file_id = uri.split('/files/')[1].split('?')[0]
+        return httplib2.Response({'status': '200'}), json.dumps({'id': file_id, 'name': self.files[file_id]['name']}).encode()
+
+
+class TimeoutOnceHttp:
+    """Drive server whose first create times out after the file was created"""
+    
+    def __init__(self):
+        self.creates = 0
+    
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        self.creates += 1
+        if self.creates == 1:
+            raise socket.timeout('timed out')
+        return httplib2.Response({'status': '200'}), json.dumps({'id': f'created-{self.creates}'}).encode()
+
+
+def http_error(status):
+    return HttpError(httplib2.Response({'status': str(status)}), b'{}')
+
+
+class TestDriveIdPool:
+    """Test suite for DriveIdPool"""
+    
+    def test_ids_fetched_in_batches(self):
+        """Test one generateIds call serves batch_size creates"""
+        service = Mock()
+        service.files.return_value.generateIds.return_value.execute.side_effect = [
+            {'ids': ['a', 'b']}, {'ids': ['c', 'd']}
+        ]
+        pool = DriveIdPool(batch_size=2)
+        
+        ids = {pool.take(service) for _ in range(3)}
+        
+        assert len(ids) == 3
+        assert service.files.return_value.generateIds.call_count == 2
+        service.files.return_value.generateIds.assert_called_with(count=2, space='drive')
+    
+    def test_assign(self):
+        """Test assign() puts the ID into the create body"""
+        service = Mock()
+        service.files.return_value.generateIds.return_value.execute.return_value = {'ids': ['x']}
+        metadata = {'name': 'a.txt'}
+        
+        assert DriveIdPool().assign(service, metadata) == 'x'
+        assert metadata == {'name': 'a.txt', 'id': 'x'}
+    
+    def test_empty_refill_creates_without_id(self):
+        """Test an empty generateIds response leaves the create body without an ID"""
+        service = Mock()
+        service.files.return_value.generateIds.return_value.execute.return_value = {'ids': []}
+        metadata = {'name': 'a.txt'}
+        
+        assert DriveIdPool().assign(service, metadata) is None
+        assert metadata == {'name': 'a.txt'}
+
+
+class TestExecuteCreate:
+    """Test suite for execute_create"""
+    
+    def test_duplicate_id_returns_existing_file(self):
+        """Test a duplicate-ID rejection resolves to the file created by the earlier attempt"""
+        service = Mock()
+        service.files.return_value.get.return_value.execute.return_value = {'id': 'x'}
+        
+        def send():
+            raise http_error(409)
+        
+        assert execute_create(service, send, {'name': 'a', 'id': 'x'}, 'id') == {'id': 'x'}
+        service.files.return_value.get.assert_called_once_with(fileId='x', fields='id')
+    
+    def test_conflict_without_own_id_raised(self):
+        """Test errors are raised when the create did not carry a pre-generated ID"""
+        def send():
+            raise http_error(409)
+        
+        with pytest.raises(HttpError):
+            execute_create(Mock(), send, {'name': 'a'}, 'id')
+    
+    def test_other_errors_raised(self):
+        """Test errors other than duplicate IDs are raised"""
+        def send():
+            raise http_error(403)
+        
+        assert not is_duplicate_id(http_error(403))
+        with pytest.raises(HttpError):
+            execute_create(Mock(), send, {'name': 'a', 'id': 'x'}, 'id')
+    
+    def test_retried_create_after_lost_response(self):
+        """Test a create retried after a timeout yields the one file the first attempt created"""
+        governor = DriveQuotaGovernor(sleep=lambda s: None)
+        http = FlakyDriveHttp()
+        service = build('drive', 'v3', http=http, static_discovery=True, requestBuilder=governor.request_builder)
+        metadata = {'name': 'docs', 'mimeType': 'application/vnd.google-apps.folder'}
+        DriveIdPool().assign(service, metadata)
+        
+        folder = execute_create(service, service.files().create(body=metadata, fields='id, name').execute,
+                                metadata, 'id, name')
+        
+        assert folder == {'id': metadata['id'], 'name': 'docs'}
+        assert http.creates == 2
+        assert len(http.files) == 1
+    
+    @pytest.mark.parametrize("multipart", [False, True])
+    def test_create_without_id_not_retried(self, multipart):
+        """Test the governor sends an unkeyed create once, so a lost response cannot duplicate it"""
+        governor = DriveQuotaGovernor(sleep=lambda s: None)
+        http = TimeoutOnceHttp()
+        service = build('drive', 'v3', http=http, static_discovery=True, requestBuilder=governor.request_builder)
+        media = MediaInMemoryUpload(b'data', resumable=False) if multipart else None
+        
+        with pytest.raises(socket.timeout):
+            service.files().create(body={'name': 'a.txt'}, media_body=media, fields='id').execute()
+        
+        assert http.creates == 1
+    
+    def test_multipart_create_with_id_retried(self):
+        """Test a multipart create carrying a pre-generated ID is still retried"""
+        governor = DriveQuotaGovernor(sleep=lambda s: None)
+        http = TimeoutOnceHttp()
+        service = build('drive', 'v3', http=http, static_discovery=True, requestBuilder=governor.request_builder)
+        media = MediaInMemoryUpload(b'data', resumable=False)
+        
+        response = service.files().create(body={'name': 'a.txt', 'id': 'x'}, media_body=media, fields='id').execute()
+        
+        assert response == {'id': 'created-2'}
+        assert http.creates == 2
@@ -0,0 +1,219 @@
+"""
+Unit tests for the breadth-first Drive tree lister
+"""
+
+import re
+import threading
+from unittest.mock import Mock
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.drive_listing import FOLDER_MIME_TYPE, DriveTreeLister
+
+
+class FakeDriveService:
+    """Minimal files().list() fake serving pages from a {folder_id: [items]} tree, including multi-parent queries"""
+    
+    def __init__(self, tree, page_size=2, failing=()):
+        self.tree = tree
+        self.page_size = page_size
+        self.failing = set(failing)
+        self.calls = []
+    
+    def files(self):
+        return self
+    
+    def list(self, q, fields, pageSize, pageToken=None):
+        folder_ids = re.findall(r"'([^']+)' in parents", q)
+        folder_id = folder_ids[0] if len(folder_ids) == 1 else tuple(folder_ids)
+        self.calls.append((folder_id, pageToken))
+        service = self
+        
+        class Request:
+            def execute(self):
+                # A query without a parents clause is a flat scan of everything
+                parents = folder_ids or list(service.tree)
+                if service.failing.intersection(parents):
+                    raise HttpError(Mock(status=500), b'error')
+                children = [
+                    {**child, 'parents': [parent]} for parent in parents for child in service.tree.get(parent, [])
+                ]
+                start = int(pageToken or 0)
+                page = {'files': [dict(child) for child in children[start:start + service.page_size]]}
+                if start + service.page_size < len(children):
+                    page['nextPageToken'] = str(start + service.page_size)
+                return page
+        
+        return Request()
+
+
+def folder(item_id, name):
+    return {'id': item_id, 'name': name, 'mimeType': FOLDER_MIME_TYPE}
+
+
+def file(item_id, name):
+    return {'id': item_id, 'name': name, 'mimeType': 'text/plain', 'size': '1'}
+
+
+TREE = {
+    'root': [folder('a', 'a'), file('r1', 'r1.txt'), file('r2', 'r2.txt'), file('r3', 'r3.txt')],
+    'a': [folder('b', 'b'), file('a1', 'a1.txt')],
+    'b': [file('b1', 'b1.txt')]
+}
+
+
+class TestDriveTreeLister:
+    """Test suite for DriveTreeLister"""
+    
+    def test_follows_page_tokens(self):
+        """Test folders with more children than one page are not truncated"""
+        service = FakeDriveService(TREE, page_size=2)
+        client = Mock(service=service)
+        lister = DriveTreeLister(client)
+        
+        items = lister.walk('root')
+        
+        assert sorted(i['path'] for i in items) == [
+            'a', 'a/a1.txt', 'a/b', 'a/b/b1.txt', 'r1.txt', 'r2.txt', 'r3.txt'
+        ]
+        assert ('root', '2') in service.calls
+        assert lister.last_stats['api_calls'] == len(service.calls) == 4
+        assert lister.last_stats['folders'] == 3
+        assert lister.last_stats['items'] == 7
+    
+    def test_walk_is_breadth_first(self):
+        """Test a folder's children are listed before its grandchildren"""
+        service = FakeDriveService(TREE, page_size=10)
+        lister = DriveTreeLister(Mock(service=service))
+        
+        lister.walk('root')
+        
+        assert [folder_id for folder_id, _ in service.calls] == ['root', 'a', 'b']
+    
+    def test_parent_id_is_listed_folder(self):
+        """Test items carry the ID of the folder they were listed from"""
+        lister = DriveTreeLister(Mock(service=FakeDriveService(TREE)))
+        
+        items = {i['id']: i for i in lister.walk('root')}
+        
+        assert items['b1']['parent_id'] == 'b'
+        assert items['r1']['parent_id'] == 'root'
+    
+    def test_workers_use_one_service_per_thread(self):
+        """Test parallel listing builds a service per worker thread"""
+        services = {}
+        lock = threading.Lock()
+        
+        def build_service():
+            with lock:
+                services.setdefault(threading.get_ident(), FakeDriveService(TREE))
+                return services[threading.get_ident()]
+        
+        client = Mock()
+        client._build_service.side_effect = build_service
+        lister = DriveTreeLister(client, workers=4)
+        
+        items = lister.walk('root')
+        
+        assert len(items) == 7
+        assert client._build_service.call_count == len(services)
+        client.service.files.assert_not_called()
+    
+    def test_error_skips_folder(self):
+        """Test a failing folder is logged and skipped by default"""
+        lister = DriveTreeLister(Mock(service=FakeDriveService(TREE, failing=['a'])))
+        
+        items = lister.walk('root')
+        
+        assert sorted(i['id'] for i in items) == ['a', 'r1', 'r2', 'r3']
+        assert lister.last_stats['errors'] == 1
+    
+    def test_error_raises_when_strict(self):
+        """Test strict listing raises instead of returning a partial tree"""
+        lister = DriveTreeLister(Mock(service=FakeDriveService(TREE, failing=['b'])), workers=2)
+        lister.gdrive_client._build_service.side_effect = lambda: FakeDriveService(TREE, failing=['b'])
+        
+        with pytest.raises(HttpError):
+            lister.walk('root', strict=True)
+    
+    def test_batches_sibling_folders_into_one_query(self):
+        """Test folders pending at the same time are listed with one combined query"""
+        tree = {'root': [folder(f'c{n}', f'c{n}') for n in range(5)]}
+        tree.update({f'c{n}': [file(f'f{n}', f'f{n}.txt')] for n in range(5)})
+        service = FakeDriveService(tree, page_size=100)
+        lister = DriveTreeLister(Mock(service=service))
+        
+        items = {i['id']: i for i in lister.walk('root')}
+        
+        assert service.calls == [('root', None), (('c0', 'c1', 'c2', 'c3', 'c4'), None)]
+        assert items['f3']['path'] == 'c3/f3.txt'
+        assert items['f3']['parent_id'] == 'c3'
+        assert lister.last_stats['folders'] == 6
+    
+    def test_failing_batch_is_split(self):
+        """Test one unlistable folder in a batch does not drop its siblings"""
+        tree = {'root': [folder(f'c{n}', f'c{n}') for n in range(5)]}
+        tree.update({f'c{n}': [file(f'f{n}', f'f{n}.txt')] for n in range(5)})
+        service = FakeDriveService(tree, page_size=100, failing=['c3'])
+        lister = DriveTreeLister(Mock(service=service))
+        
+        items = {i['id'] for i in lister.walk('root')}
+        
+        assert {'f0', 'f1', 'f2', 'f4'} <= items
+        assert 'f3' not in items
+        assert lister.last_stats['errors'] == 1
+        assert ('c3', None) in service.calls
+        with pytest.raises(HttpError):
+            DriveTreeLister(Mock(service=service)).walk('root', strict=True)
+    
+    def test_batches_respect_query_length(self):
+        """Test batches are split when the combined query would be too long"""
+        tree = {'root': [folder(f'c{n}', f'c{n}') for n in range(5)]}
+        service = FakeDriveService(tree, page_size=100)
+        lister = DriveTreeLister(Mock(service=service), max_query_length=0)
+        
+        lister.walk('root')
+        
+        assert len(service.calls) == 6
+
+
+class TestDriveTreeListerScan:
+    """Test suite for the flat-scan listing mode"""
+    
+    def test_scan_rebuilds_paths_from_parents(self):
+        """Test one paginated scan yields the same tree as the folder walk"""
+        service = FakeDriveService(TREE, page_size=3)
+        lister = DriveTreeLister(Mock(service=service))
+        
+        items = {i['id']: i for i in lister.scan('root')}
+        
+        assert sorted(i['path'] for i in items.values()) == [
+            'a', 'a/a1.txt', 'a/b', 'a/b/b1.txt', 'r1.txt', 'r2.txt', 'r3.txt'
+        ]
+        assert items['b1']['parent_id'] == 'b'
+        assert all(call[0] == () for call in service.calls)
+        assert lister.last_stats['api_calls'] == 3
+        assert lister.last_stats['folders'] == 3
+    
+    def test_scan_drops_items_outside_root(self):
+        """Test files not under the root folder, and parent cycles, are ignored"""
+        tree = dict(TREE)
+        tree['elsewhere'] = [file('x1', 'x1.txt')]
+        tree['loop1'] = [folder('loop2', 'loop2')]
+        tree['loop2'] = [folder('loop1', 'loop1')]
+        lister = DriveTreeLister(Mock(service=FakeDriveService(tree, page_size=100)))
+        
+        items = lister.scan('a')
+        
+        assert sorted(i['path'] for i in items) == ['a1.txt', 'b', 'b/b1.txt']
+    
+    def test_scan_error_raises_when_strict(self):
+        """Test a failing page raises in strict mode"""
+        service = FakeDriveService(TREE)
+        service.failing = set(TREE)
+        lister = DriveTreeLister(Mock(service=service))
+        
+        assert lister.scan('root') == []
+        with pytest.raises(HttpError):
+            lister.scan('root', strict=True)
@@ -0,0 +1,166 @@
+"""
+Unit tests for the Drive API quota governor
+"""
+
+import json
+import threading
+import time
+
+import httplib2
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from src.drive_quota import DriveQuotaGovernor
+
+
+def http_error(status, reason=None):
+    """HttpError as returned by the Drive API"""
+    errors = [{'domain': 'usageLimits', 'reason': reason, 'message': reason}] if reason else []
+    content = json.dumps({'error': {'code': status, 'message': reason or 'error', 'errors': errors}})
+    return HttpError(httplib2.Response({'status': str(status)}), content.encode())
+
+
+class FlakyRequest:
+    """Request failing with the given errors before succeeding"""
+    
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+    
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {'id': 'ok'}
+
+
+class ThrottlingHttp:
+    """Drive server answering the first `throttled` requests with 403 userRateLimitExceeded"""
+    
+    def __init__(self, throttled):
+        self.throttled = throttled
+        self.requests = 0
+    
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        self.requests += 1
+        if self.requests <= self.throttled:
+            error = {'error': {'code': 403, 'message': 'Rate limit', 'errors': [{'reason': 'userRateLimitExceeded'}]}}
+            return httplib2.Response({'status': '403'}), json.dumps(error).encode()
+        return httplib2.Response({'status': '200'}), json.dumps({'id': 'file-1'}).encode()
+
+
+def new_governor(**kwargs):
+    sleeps = []
+    governor = DriveQuotaGovernor(sleep=sleeps.append, **kwargs)
+    return governor, sleeps
+
+
+class TestDriveQuotaGovernor:
+    """Test suite for DriveQuotaGovernor"""
+    
+    def test_retries_throttled_request_with_backoff(self):
+        """Test throttled requests are retried after growing, jittered delays"""
+        governor, sleeps = new_governor(base_delay=1.0)
+        request = FlakyRequest(http_error(429), http_error(403, 'userRateLimitExceeded'), http_error(503))
+        
+        assert governor.call(request) == {'id': 'ok'}
+        
+        assert request.calls == 4
+        assert 0.5 <= sleeps[0] <= 1.0
+        assert 1.0 <= sleeps[1] <= 2.0
+        assert 2.0 <= sleeps[2] <= 4.0
+        assert governor.stats()['retries'] == 3
+        assert governor.stats()['throttled'] == 2
+    
+    def test_gives_up_after_max_retries(self):
+        """Test the error is raised once the retries are used up"""
+        governor, sleeps = new_governor(max_retries=2)
+        request = FlakyRequest(*[http_error(429)] * 5)
+        
+        with pytest.raises(HttpError):
+            governor.call(request)
+        assert request.calls == 3
+    
+    def test_other_errors_not_retried(self):
+        """Test errors other than throttling and 5xx are raised at once"""
+        governor, sleeps = new_governor()
+        request = FlakyRequest(http_error(404, 'notFound'))
+        
+        with pytest.raises(HttpError):
+            governor.call(request)
+        assert request.calls == 1
+        assert sleeps == []
+    
+    def test_aimd(self):
+        """Test throttling halves the limit and successes grow it back gradually, up to the maximum"""
+        clock = [0.0]
+        governor, _ = new_governor(max_concurrency=8, base_delay=1.0, clock=lambda: clock[0])
+        
+        governor.call(FlakyRequest(http_error(429)))
+        assert governor.concurrency == 4
+        
+        # A second rejection within the backoff period is the same congestion signal
+        governor.call(FlakyRequest(http_error(429)))
+        assert governor.concurrency == 4
+        
+        clock[0] = 200.0
+        governor.call(FlakyRequest(http_error(429)))
+        assert governor.concurrency == 2
+        
+        for _ in range(10):
+            governor.call(FlakyRequest())
+        assert 2 < governor.concurrency < 8
+        
+        for _ in range(100):
+            governor.call(FlakyRequest())
+        assert governor.concurrency == 8
+    
+    def test_concurrency_limit(self):
+        """Test no more than the allowed number of requests run at once"""
+        governor = DriveQuotaGovernor(max_concurrency=2)
+        running = []
+        peak = []
+        lock = threading.Lock()
+        
+        def request():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+        
+        threads = [threading.Thread(target=governor.call, args=(request,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert max(peak) == 2
+    
+    def test_requests_per_100s(self):
+        """Test requests are counted in the 100 second window and capped by the quota"""
+        clock = [0.0]
+        governor, _ = new_governor(requests_per_100s=2, clock=lambda: clock[0])
+        
+        governor.call(FlakyRequest())
+        clock[0] = 50.0
+        governor.call(FlakyRequest())
+        assert governor.requests_in_window() == 2
+        
+        clock[0] = 100.0
+        governor.call(FlakyRequest())
+        assert governor.requests_in_window() == 2
+    
+    def test_drive_service_requests_are_governed(self):
+        """Test requests built by a Drive service with the governor's requestBuilder are retried"""
+        governor, sleeps = new_governor()
+        http = ThrottlingHttp(throttled=2)
+        service = build('drive', 'v3', http=http, static_discovery=True, requestBuilder=governor.request_builder)
+        
+        response = service.files().get(fileId='file-1').execute()
+        
+        assert response == {'id': 'file-1'}
+        assert http.requests == 3
+        assert len(sleeps) == 2
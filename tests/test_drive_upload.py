@@ -0,0 +1,270 @@
+"""
+Unit tests for the Drive upload strategy (multipart for small files, adaptive resumable chunks)
+"""
+
+import json
+import threading
+
+import httplib2
+from googleapiclient.discovery import build
+from googleapiclient.http import MediaFileUpload, MediaInMemoryUpload
+
+from src.bandwidth import TokenBucket
+from src.drive_upload import CHUNK_ALIGNMENT, AdaptiveChunkMedia, ChunkSizer, DriveUploader
+from src.streaming import StreamingMediaUpload
+
+CHUNK = CHUNK_ALIGNMENT
+
+
+class FakeUploadHttp:
+    """Resumable upload server: opens a session, acknowledges each chunk, completes at the end"""
+    
+    def __init__(self, size, received=b'', expired=()):
+        self.size = size
+        self.received = received
+        self.expired = set(expired)
+        self.requests = []
+    
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        self.requests.append((uri, dict(headers or {})))
+        if 'uploadType=multipart' in uri:
+            return httplib2.Response({'status': '200'}), json.dumps({'id': 'multipart-id'})
+        if 'uploadType=resumable' in uri:
+            return httplib2.Response({'status': '200', 'location': 'http://upload.example/session'}), ''
+        
+        if headers.get('Content-Range', '').startswith('bytes */'):
+            # Status query of a resumed session
+            if uri in self.expired:
+                return httplib2.Response({'status': '404'}), b''
+            if len(self.received) >= self.size:
+                return httplib2.Response({'status': '200'}), json.dumps({'id': 'file-1'})
+            if not self.received:
+                return httplib2.Response({'status': '308'}), ''
+            return httplib2.Response({'status': '308', 'range': f'0-{len(self.received) - 1}'}), ''
+        
+        self.received += body.read() if hasattr(body, 'read') else body
+        if len(self.received) >= self.size:
+            return httplib2.Response({'status': '200'}), json.dumps({'id': 'file-1'})
+        return httplib2.Response({'status': '308', 'range': f'0-{len(self.received) - 1}'}), ''
+
+
+class ForwardReader:
+    """Forward-only reader over bytes"""
+    
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+    
+    def read(self, size):
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+
+def make_request(http, media):
+    """Build a real files().create() request over the fake server"""
+    service = build('drive', 'v3', http=http, static_discovery=True)
+    return service.files().create(body={'name': 'file.bin'}, media_body=media, fields='id')
+
+
+class TestChunkSizer:
+    """Test suite for ChunkSizer"""
+    
+    def test_grows_at_most_double_per_request(self):
+        """Test a fast link doubles the chunk size per request, up to the maximum"""
+        sizer = ChunkSizer(initial=CHUNK, maximum=4 * CHUNK, target_seconds=1.0)
+        
+        sizes = []
+        for _ in range(4):
+            sizer.record(sizer.chunksize, 0.001)
+            sizes.append(sizer.chunksize)
+        
+        assert sizes == [2 * CHUNK, 4 * CHUNK, 4 * CHUNK, 4 * CHUNK]
+    
+    def test_shrinks_to_target_seconds(self):
+        """Test a slow link shrinks chunks so a request takes about target_seconds"""
+        sizer = ChunkSizer(initial=64 * CHUNK, target_seconds=1.0)
+        
+        # 64 chunks in 16s is 4 chunks per second
+        sizer.record(64 * CHUNK, 16.0)
+        
+        assert sizer.chunksize == 4 * CHUNK
+    
+    def test_sizes_stay_aligned_and_bounded(self):
+        """Test chunk sizes are multiples of 256 KiB and never below the minimum"""
+        sizer = ChunkSizer(initial=CHUNK * 3 + 1000, target_seconds=1.0)
+        assert sizer.chunksize == 3 * CHUNK
+        
+        sizer.record(1000, 10.0)
+        assert sizer.chunksize == CHUNK
+        
+        sizer.record(0, 1.0)  # Nothing acknowledged: no information
+        assert sizer.chunksize == CHUNK
+
+
+class TestDriveUploader:
+    """Test suite for DriveUploader"""
+    
+    def test_small_media_is_one_multipart_request(self):
+        """Test media up to the threshold is sent in a single request without a session"""
+        uploader = DriveUploader(multipart_threshold=1024)
+        body = uploader.prepare(MediaInMemoryUpload(b'small', resumable=True))
+        http = FakeUploadHttp(5)
+        
+        assert isinstance(body, MediaInMemoryUpload)
+        assert body.resumable() is False
+        
+        response = uploader.execute(make_request(http, body), body)
+        
+        assert len(http.requests) == 1
+        assert 'uploadType=multipart' in http.requests[0][0]
+        assert response == {'id': 'multipart-id'}
+    
+    def test_large_file_uses_adaptive_resumable_session(self, tmp_path):
+        """Test large files go through a resumable session in aligned chunks"""
+        data = b'a' * (2 * CHUNK + 1000)
+        path = tmp_path / 'large.bin'
+        path.write_bytes(data)
+        uploader = DriveUploader(multipart_threshold=1024, max_chunk_size=CHUNK)
+        body = uploader.prepare(MediaFileUpload(str(path), resumable=True))
+        http = FakeUploadHttp(len(data))
+        
+        assert isinstance(body, AdaptiveChunkMedia)
+        
+        response = uploader.execute(make_request(http, body), body)
+        
+        assert response == {'id': 'file-1'}
+        assert http.received == data
+        assert uploader.last_stats['requests'] == 3
+        assert [h['Content-Range'] for _, h in http.requests[1:]] == [
+            f'bytes 0-{CHUNK - 1}/{len(data)}',
+            f'bytes {CHUNK}-{2 * CHUNK - 1}/{len(data)}',
+            f'bytes {2 * CHUNK}-{len(data) - 1}/{len(data)}'
+        ]
+    
+    def test_stream_chunks_capped_by_source(self):
+        """Test non-seekable sources never get chunks larger than their own buffer"""
+        data = b's' * (3 * CHUNK)
+        uploader = DriveUploader(multipart_threshold=0)
+        stream = StreamingMediaUpload(ForwardReader(data), len(data), chunksize=CHUNK)
+        body = uploader.prepare(stream)
+        http = FakeUploadHttp(len(data))
+        
+        uploader.execute(make_request(http, body), body)
+        
+        assert http.received == data
+        assert uploader.last_stats['chunk_size'] == CHUNK
+    
+    def test_next_session_starts_from_settled_size(self, tmp_path):
+        """Test a session starts from the chunk size the previous one settled on"""
+        path = tmp_path / 'large.bin'
+        path.write_bytes(b'b' * (2 * CHUNK))
+        uploader = DriveUploader(multipart_threshold=0, max_chunk_size=4 * CHUNK)
+        uploader.initial_chunk_size = CHUNK
+        
+        body = uploader.prepare(MediaFileUpload(str(path), resumable=True))
+        uploader.execute(make_request(FakeUploadHttp(2 * CHUNK), body), body)
+        
+        assert uploader.initial_chunk_size == uploader.last_stats['chunk_size'] > CHUNK
+        assert uploader.prepare(MediaFileUpload(str(path), resumable=True)).chunksize() == uploader.initial_chunk_size
+    
+    def test_bandwidth_charged_per_request(self, tmp_path):
+        """Test each chunk takes its bytes from the shared token bucket before it is sent"""
+        data = b'c' * (2 * CHUNK + 1000)
+        path = tmp_path / 'large.bin'
+        path.write_bytes(data)
+        sleeps = []
+        bucket = TokenBucket(10 ** 12, burst_seconds=0, sleep=sleeps.append)
+        uploader = DriveUploader(multipart_threshold=0, max_chunk_size=CHUNK, bandwidth=bucket)
+        
+        body = uploader.prepare(MediaFileUpload(str(path), resumable=True))
+        uploader.execute(make_request(FakeUploadHttp(len(data)), body), body)
+        small = uploader.prepare(MediaInMemoryUpload(b'small', resumable=True))
+        DriveUploader(bandwidth=bucket).execute(make_request(FakeUploadHttp(5), small), small)
+        
+        assert bucket.bytes == len(data) + 5
+        assert len(sleeps) == 4
+    
+    def test_concurrent_uploads_keep_their_own_stats(self, tmp_path):
+        """Test uploads sharing one uploader from several threads each get their own stats"""
+        uploader = DriveUploader(multipart_threshold=0, max_chunk_size=CHUNK)
+        results = {}
+        
+        def upload(chunks):
+            path = tmp_path / f'{chunks}.bin'
+            path.write_bytes(b'x' * (chunks * CHUNK))
+            body = uploader.prepare(MediaFileUpload(str(path), resumable=True))
+            _, stats = uploader.execute_with_stats(make_request(FakeUploadHttp(chunks * CHUNK), body), body)
+            results[chunks] = (stats, uploader.last_stats)
+        
+        threads = [threading.Thread(target=upload, args=(chunks,)) for chunks in (2, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert {chunks: stats['requests'] for chunks, (stats, _) in results.items()} == {2: 2, 5: 5}
+        assert all(stats is last for stats, last in results.values())
+        assert uploader.last_stats is None
+
+
+class TestDriveUploaderResume:
+    """Test suite for continuing saved resumable sessions"""
+    
+    def test_progress_reports_session_and_committed_bytes(self, tmp_path):
+        """Test every committed chunk is reported with the session URI"""
+        path = tmp_path / 'large.bin'
+        path.write_bytes(b'p' * (3 * CHUNK))
+        uploader = DriveUploader(multipart_threshold=0, max_chunk_size=CHUNK)
+        body = uploader.prepare(MediaFileUpload(str(path), resumable=True))
+        progress = []
+        
+        uploader.execute(make_request(FakeUploadHttp(3 * CHUNK), body), body,
+                         on_progress=lambda uri, committed: progress.append((uri, committed)))
+        
+        assert progress == [('http://upload.example/session', CHUNK), ('http://upload.example/session', 2 * CHUNK)]
+    
+    def test_resumes_from_committed_byte(self, tmp_path):
+        """Test a saved session is queried and only the missing bytes are sent"""
+        data = bytes(range(256)) * (3 * CHUNK // 256)
+        path = tmp_path / 'large.bin'
+        path.write_bytes(data)
+        http = FakeUploadHttp(len(data), received=data[:2 * CHUNK])
+        uploader = DriveUploader(multipart_threshold=0, max_chunk_size=CHUNK)
+        body = uploader.prepare(MediaFileUpload(str(path), resumable=True))
+        
+        response = uploader.execute(make_request(http, body), body, session_uri='http://upload.example/saved')
+        
+        assert response == {'id': 'file-1'}
+        assert http.received == data
+        assert [uri for uri, _ in http.requests] == ['http://upload.example/saved'] * 2
+        assert http.requests[1][1]['Content-Range'] == f'bytes {2 * CHUNK}-{3 * CHUNK - 1}/{len(data)}'
+    
+    def test_expired_session_starts_over(self, tmp_path):
+        """Test an expired saved session is replaced by a new one"""
+        data = b'e' * (2 * CHUNK)
+        path = tmp_path / 'large.bin'
+        path.write_bytes(data)
+        http = FakeUploadHttp(len(data), expired=['http://upload.example/old'])
+        uploader = DriveUploader(multipart_threshold=0, max_chunk_size=CHUNK)
+        body = uploader.prepare(MediaFileUpload(str(path), resumable=True))
+        
+        response = uploader.execute(make_request(http, body), body, session_uri='http://upload.example/old')
+        
+        assert response == {'id': 'file-1'}
+        assert http.received == data
+        assert 'uploadType=resumable' in http.requests[1][0]
+    
+    def test_completed_session_is_not_resent(self, tmp_path):
+        """Test a saved session Drive already completed returns its file without sending data"""
+        data = b'd' * (2 * CHUNK)
+        path = tmp_path / 'large.bin'
+        path.write_bytes(data)
+        http = FakeUploadHttp(len(data), received=data)
+        uploader = DriveUploader(multipart_threshold=0, max_chunk_size=CHUNK)
+        body = uploader.prepare(MediaFileUpload(str(path), resumable=True))
+        
+        response = uploader.execute(make_request(http, body), body, session_uri='http://upload.example/saved')
+        
+        assert response == {'id': 'file-1'}
+        assert len(http.requests) == 1
@@ -0,0 +1,112 @@
+"""
+Unit tests for S3 event notification queues
+"""
+
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.event_queue import (EventQueue, FileEventQueue, InMemoryEventQueue, SQSEventQueue,
+                             create_event_queue, parse_s3_notification)
+
+
+def s3_notification(event_name, key, size=10, sequencer='0A'):
+    """Build a minimal S3 event notification"""
+    return {
+        'Records': [{
+            'eventName': event_name,
+            's3': {'object': {'key': key, 'size': size, 'eTag': 'abc', 'sequencer': sequencer}}
+        }]
+    }
+
+
+class TestParseS3Notification:
+    """Test suite for parse_s3_notification"""
+    
+    def test_created_and_removed(self):
+        """Test ObjectCreated/ObjectRemoved records are parsed"""
+        events = parse_s3_notification(json.dumps(s3_notification('ObjectCreated:Put', 'docs/my+file.txt')))
+        events += parse_s3_notification(s3_notification('ObjectRemoved:Delete', 'old.txt'))
+        
+        assert [(e['action'], e['key']) for e in events] == [
+            ('created', 'docs/my file.txt'),
+            ('removed', 'old.txt')
+        ]
+    
+    def test_sns_envelope(self):
+        """Test notifications wrapped in SNS messages are unwrapped"""
+        envelope = {'Type': 'Notification', 'Message': json.dumps(s3_notification('ObjectCreated:Put', 'a.txt'))}
+        
+        events = parse_s3_notification(envelope)
+        
+        assert events[0]['key'] == 'a.txt'
+    
+    def test_test_event_ignored(self):
+        """Test s3:TestEvent and malformed bodies produce no events"""
+        assert parse_s3_notification({'Event': 's3:TestEvent', 'Bucket': 'bucket'}) == []
+        assert parse_s3_notification('not json') == []
+
+
+class TestEventQueues:
+    """Test suite for EventQueue implementations"""
+    
+    def test_in_memory_queue(self):
+        """Test in-process queue batches pending notifications"""
+        event_queue = InMemoryEventQueue()
+        event_queue.put(s3_notification('ObjectCreated:Put', 'a.txt'))
+        event_queue.put(s3_notification('ObjectCreated:Put', 'b.txt'))
+        
+        messages = event_queue.receive(wait_seconds=0)
+        
+        assert [m['events'][0]['key'] for m in messages] == ['a.txt', 'b.txt']
+        assert event_queue.receive(wait_seconds=0) == []
+    
+    def test_file_queue_resumes_after_ack(self, tmp_path):
+        """Test file queue redelivers until ack and persists its offset"""
+        path = tmp_path / "events.jsonl"
+        path.write_text(json.dumps(s3_notification('ObjectCreated:Put', 'a.txt')) + "\n")
+        
+        event_queue = FileEventQueue(str(path))
+        messages = event_queue.receive(wait_seconds=0)
+        assert len(messages) == 1
+        
+        # Not acknowledged yet: delivered again
+        assert len(event_queue.receive(wait_seconds=0)) == 1
+        event_queue.ack(messages)
+        
+        with open(path, 'a') as f:
+            f.write(json.dumps(s3_notification('ObjectRemoved:Delete', 'a.txt')) + "\n")
+        
+        restarted = FileEventQueue(str(path))
+        messages = restarted.receive(wait_seconds=0)
+        assert [m['events'][0]['action'] for m in messages] == ['removed']
+    
+    def test_sqs_queue(self):
+        """Test SQS queue receives and deletes messages"""
+        with mock_aws():
+            sqs = boto3.client('sqs', region_name='us-east-1')
+            queue_url = sqs.create_queue(QueueName='s3-events')['QueueUrl']
+            sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(s3_notification('ObjectCreated:Put', 'a.txt')))
+            
+            event_queue = SQSEventQueue(queue_url, region='us-east-1')
+            messages = event_queue.receive(wait_seconds=0)
+            event_queue.ack(messages)
+            
+            assert messages[0]['events'][0]['key'] == 'a.txt'
+            assert event_queue.receive(wait_seconds=0) == []
+    
+    def test_create_event_queue_unknown_type(self):
+        """Test factory rejects unknown queue types"""
+        with pytest.raises(ValueError):
+            create_event_queue('kafka')
+    
+    def test_incomplete_backend_rejected_at_construction(self):
+        """Test a backend missing ack() cannot be instantiated"""
+        class ReceiveOnlyQueue(EventQueue):
+            def receive(self, max_messages=10, wait_seconds=20):
+                return []
+        
+        with pytest.raises(TypeError):
+            ReceiveOnlyQueue()
@@ -0,0 +1,54 @@
+"""
+Unit tests for the persisted folder cache
+"""
+
+from src.folder_cache import FolderCache
+
+
+class TestFolderCache:
+    """Test suite for FolderCache"""
+    
+    def test_save_and_reload(self, tmp_path):
+        """Test the map survives a restart"""
+        path = str(tmp_path / "folders.json")
+        cache = FolderCache(path, 'root')
+        cache['docs'] = 'f-docs'
+        cache['docs/images'] = 'f-images'
+        cache.save()
+        
+        reloaded = FolderCache(path, 'root')
+        
+        assert reloaded == {'docs': 'f-docs', 'docs/images': 'f-images'}
+    
+    def test_ignores_cache_for_other_folder(self, tmp_path):
+        """Test a map saved for another root folder is not reused"""
+        path = str(tmp_path / "folders.json")
+        cache = FolderCache(path, 'root')
+        cache['docs'] = 'f-docs'
+        cache.save()
+        
+        assert FolderCache(path, 'other-root') == {}
+    
+    def test_ignores_unreadable_file(self, tmp_path):
+        """Test a corrupt cache file starts an empty cache"""
+        path = tmp_path / "folders.json"
+        path.write_text("{not json")
+        
+        assert FolderCache(str(path), 'root') == {}
+    
+    def test_invalidate_drops_subtree(self):
+        """Test invalidating a folder drops it and its descendants only"""
+        cache = FolderCache()
+        cache.update({'docs': '1', 'docs/a': '2', 'docs/a/b': '3', 'docs2': '4'})
+        
+        cache.invalidate('docs')
+        
+        assert cache == {'docs2': '4'}
+    
+    def test_in_memory_save_is_noop(self):
+        """Test a cache without a path does not write anything"""
+        cache = FolderCache()
+        cache['docs'] = '1'
+        cache.save()
+        
+        assert cache.path is None
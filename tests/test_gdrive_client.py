@@ -7,6 +7,7 @@ from unittest.mock import MagicMock, Mock, mock_open, patch
 import pytest
 from googleapiclient.errors import HttpError
 
+from src.drive_quota import DriveQuotaGovernor, GovernedHttpRequest
 from src.gdrive_client import GDriveClient
 
 
@@ -30,6 +31,23 @@ class TestGDriveClient:
         assert client.folder_id == "folder-123"
         mock_build.assert_called_once_with('drive', 'v3', credentials=mock_creds)
     
+    @patch('src.gdrive_client.os.path.exists')
+    @patch('src.gdrive_client.service_account')
+    @patch('src.gdrive_client.build')
+    def test_init_with_governor(self, mock_build, mock_service_account, mock_exists):
+        """Test services of the client and its clones send requests through the quota governor"""
+        mock_exists.return_value = True
+        governor = DriveQuotaGovernor()
+        
+        client = GDriveClient("/path/to/creds.json", "folder-123", governor=governor)
+        client.clone()
+        
+        assert mock_build.call_count == 2
+        for call in mock_build.call_args_list:
+            builder = call[1]['requestBuilder']
+            assert builder.func is GovernedHttpRequest
+            assert builder.keywords == {'governor': governor}
+    
     @patch('src.gdrive_client.os.path.exists')
     def test_init_missing_credentials(self, mock_exists):
         """Test initialization with missing credentials file"""
@@ -66,6 +84,27 @@ class TestGDriveClient:
         assert files[0]['name'] == 'file1.txt'
         assert files[1]['name'] == 'file2.txt'
     
+    @patch('src.gdrive_client.os.path.exists')
+    @patch('src.gdrive_client.service_account')
+    @patch('src.gdrive_client.build')
+    def test_list_files_with_folders(self, mock_build, mock_service_account, mock_exists):
+        """Test the listing also returns the path -> ID of every folder walked"""
+        mock_exists.return_value = True
+        
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        mock_service.files().list().execute.side_effect = [
+            {'files': [{'id': 'f-docs', 'name': 'docs', 'mimeType': 'application/vnd.google-apps.folder'}]},
+            {'files': [{'id': '1', 'name': 'a.txt', 'size': '10'}]}
+        ]
+        
+        client = GDriveClient("/path/to/creds.json", "folder-123")
+        files, folders = client.list_files_with_folders()
+        
+        assert [f['name'] for f in files] == ['docs/a.txt']
+        assert files[0]['parent_id'] == 'f-docs'
+        assert folders == {'docs': 'f-docs'}
+    
     @patch('src.gdrive_client.os.path.exists')
     @patch('src.gdrive_client.service_account')
     @patch('src.gdrive_client.build')
@@ -84,6 +123,27 @@ class TestGDriveClient:
         
         assert file_id == "new-file-id"
     
+    @pytest.mark.parametrize('status, raised', [(404, True), (500, False)])
+    @patch('src.gdrive_client.os.path.exists')
+    @patch('src.gdrive_client.service_account')
+    @patch('src.gdrive_client.build')
+    def test_upload_file_missing_parent_raised(self, mock_build, mock_service_account, mock_exists,
+                                               status, raised, temp_file):
+        """Test a 404 (parent folder gone) is raised while other upload errors return None"""
+        mock_exists.return_value = True
+        
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        mock_service.files().create().execute.side_effect = HttpError(Mock(status=status), b'error')
+        
+        client = GDriveClient("/path/to/creds.json", "folder-123")
+        
+        if raised:
+            with pytest.raises(HttpError):
+                client.upload_file(temp_file, "uploaded.txt", "gone-folder")
+        else:
+            assert client.upload_file(temp_file, "uploaded.txt") is None
+    
     @patch('src.gdrive_client.os.path.exists')
     @patch('src.gdrive_client.service_account')
     @patch('src.gdrive_client.build')
@@ -156,6 +216,22 @@ class TestGDriveClient:
         
         assert result is True
         mock_service.files().update.assert_called_once()
+    
+    @patch('src.gdrive_client.os.path.exists')
+    @patch('src.gdrive_client.service_account')
+    @patch('src.gdrive_client.build')
+    def test_update_file_app_properties(self, mock_build, mock_service_account, mock_exists, temp_file):
+        """Test an update rewrites the appProperties stamp along with the content"""
+        mock_exists.return_value = True
+        
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        
+        client = GDriveClient("/path/to/creds.json", "folder-123")
+        client.update_file("file-id-123", temp_file, "updated.txt", app_properties={'s3_etag': 'abc'})
+        
+        call_args = mock_service.files().update.call_args
+        assert call_args[1]['body'] == {'appProperties': {'s3_etag': 'abc'}}
 
 
 class TestGDriveFolderOperations:
@@ -299,3 +375,46 @@ class TestGDriveFolderOperations:
             assert folder_id == "folder-id-3"
             # Should have called 3 times with correct parent chain
             assert client.get_or_create_folder.call_count == 3
+    
+    @patch('src.gdrive_client.os.path.exists')
+    @patch('src.gdrive_client.service_account')
+    @patch('src.gdrive_client.build')
+    def test_find_path_missing_folder(self, mock_build, mock_service_account, mock_exists):
+        """Test find_path stops at the first missing folder without creating it"""
+        mock_exists.return_value = True
+        
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        
+        client = GDriveClient("/path/to/creds.json", "root-folder-123")
+        
+        with patch.object(client, 'find_folder_by_name', side_effect=['folder-id-1', None]) as mock_find, \
+             patch.object(client, 'create_folder') as mock_create:
+            
+            assert client.find_path("dir1/dir2/dir3") is None
+            assert mock_find.call_count == 2
+            mock_create.assert_not_called()
+
+
+class TestGDriveChanges:
+    """Test suite for Changes API operations"""
+    
+    @patch('src.gdrive_client.os.path.exists')
+    @patch('src.gdrive_client.service_account')
+    @patch('src.gdrive_client.build')
+    def test_list_changes_follows_pages(self, mock_build, mock_service_account, mock_exists):
+        """Test list_changes pages until newStartPageToken"""
+        mock_exists.return_value = True
+        
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        mock_service.changes().list().execute.side_effect = [
+            {'changes': [{'fileId': 'a'}], 'nextPageToken': 'page-2'},
+            {'changes': [{'fileId': 'b'}], 'newStartPageToken': 'token-2'}
+        ]
+        
+        client = GDriveClient("/path/to/creds.json", "folder-123")
+        changes, token = client.list_changes('token-1')
+        
+        assert [c['fileId'] for c in changes] == ['a', 'b']
+        assert token == 'token-2'
@@ -0,0 +1,124 @@
+"""
+Unit tests for the shared error classification and retry policy
+"""
+
+import json
+import socket
+
+import httplib2
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError, NoCredentialsError, ReadTimeoutError
+from googleapiclient.errors import HttpError
+
+from src.retry import FATAL, RETRYABLE, THROTTLED, RetryPolicy, classify_error, is_rate_limited
+from src.s3_ranged_downloader import IncompleteRangeError
+
+
+def http_error(status, reason=None):
+    """HttpError as returned by the Drive API"""
+    errors = [{'domain': 'usageLimits', 'reason': reason, 'message': reason}] if reason else []
+    content = json.dumps({'error': {'code': status, 'message': reason or 'error', 'errors': errors}})
+    return HttpError(httplib2.Response({'status': str(status)}), content.encode())
+
+
+def client_error(code, status):
+    return ClientError({'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, 'GetObject')
+
+
+class TestIsRateLimited:
+    """Test suite for is_rate_limited"""
+    
+    @pytest.mark.parametrize('error, expected', [
+        (http_error(429), True),
+        (http_error(403, 'userRateLimitExceeded'), True),
+        (http_error(403, 'rateLimitExceeded'), True),
+        (http_error(403, 'insufficientFilePermissions'), False),
+        (http_error(404, 'notFound'), False),
+        (http_error(500), False)
+    ])
+    def test_classification(self, error, expected):
+        """Test only quota errors count as throttling"""
+        assert is_rate_limited(error) is expected
+
+
+class TestClassifyError:
+    """Test suite for classify_error"""
+    
+    @pytest.mark.parametrize('error, expected', [
+        (http_error(403, 'userRateLimitExceeded'), THROTTLED),
+        (http_error(503), RETRYABLE),
+        (http_error(404, 'notFound'), FATAL),
+        (http_error(403, 'insufficientFilePermissions'), FATAL),
+        (client_error('SlowDown', 503), THROTTLED),
+        (client_error('InternalError', 500), RETRYABLE),
+        (client_error('RequestTimeout', 400), RETRYABLE),
+        (client_error('NoSuchKey', 404), FATAL),
+        (client_error('PreconditionFailed', 412), FATAL),
+        (EndpointConnectionError(endpoint_url='https://s3'), RETRYABLE),
+        (ReadTimeoutError(endpoint_url='https://s3'), RETRYABLE),
+        (NoCredentialsError(), FATAL),
+        (httplib2.ServerNotFoundError('dns'), RETRYABLE),
+        (socket.timeout('timed out'), RETRYABLE),
+        (ConnectionResetError(), RETRYABLE),
+        (IncompleteRangeError('short read'), RETRYABLE),
+        (OSError(28, 'No space left on device'), FATAL),
+        (ValueError('bug'), FATAL)
+    ])
+    def test_classification(self, error, expected):
+        """Test S3, Drive and network errors map to retryable, throttled or fatal"""
+        assert classify_error(error) == expected
+
+
+class TestRetryPolicy:
+    """Test suite for RetryPolicy"""
+    
+    def test_retries_until_success(self):
+        """Test non-fatal failures are retried with growing delays"""
+        sleeps = []
+        errors = [socket.timeout('timed out'), client_error('SlowDown', 503)]
+        retries = []
+        
+        def request():
+            if errors:
+                raise errors.pop(0)
+            return 'done'
+        
+        policy = RetryPolicy(max_retries=3, base_delay=1.0, sleep=sleeps.append)
+        result = policy.call(request, on_retry=lambda e, kind: retries.append(kind))
+        
+        assert result == 'done'
+        assert retries == [RETRYABLE, THROTTLED]
+        assert 0.5 <= sleeps[0] <= 1.0
+        assert 1.0 <= sleeps[1] <= 2.0
+    
+    def test_fatal_error_raised_at_once(self):
+        """Test fatal errors are not retried"""
+        sleeps = []
+        calls = []
+        
+        def request():
+            calls.append(1)
+            raise client_error('NoSuchKey', 404)
+        
+        with pytest.raises(ClientError):
+            RetryPolicy(sleep=sleeps.append).call(request)
+        assert len(calls) == 1
+        assert sleeps == []
+    
+    def test_gives_up_after_max_retries(self):
+        """Test the last error is raised once the retries are used up"""
+        calls = []
+        
+        def request():
+            calls.append(1)
+            raise http_error(503)
+        
+        with pytest.raises(HttpError):
+            RetryPolicy(max_retries=2, sleep=lambda s: None).call(request)
+        assert len(calls) == 3
+    
+    def test_backoff_capped(self):
+        """Test the delay never exceeds max_delay"""
+        policy = RetryPolicy(base_delay=1.0, max_delay=10.0)
+        
+        assert all(policy.backoff(attempt) <= 10.0 for attempt in range(1, 20))
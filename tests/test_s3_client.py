@@ -5,8 +5,10 @@ Unit tests for S3 Client
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
-from botocore.exceptions import ClientError
+from botocore.exceptions import ClientError, EndpointConnectionError
 
+from src.bandwidth import TokenBucket
+from src.retry import RetryPolicy
 from src.s3_client import S3Client
 
 
@@ -104,6 +106,47 @@ class TestS3Client:
         assert result is True
         mock_s3.download_file.assert_called_once_with("bucket", "file.txt", local_path)
     
+    @patch('src.s3_client.boto3')
+    def test_download_file_transfer_config(self, mock_boto3, tmp_path):
+        """Test custom multipart settings are passed to boto3 as a TransferConfig"""
+        mock_s3 = MagicMock()
+        mock_boto3.client.return_value = mock_s3
+        
+        client = S3Client("key", "secret", "us-east-1", "bucket",
+                          multipart_threshold=64 * 1024 * 1024, max_concurrency=16)
+        client.download_file("file.txt", "/tmp/file.txt")
+        
+        config = mock_s3.download_file.call_args[1]['Config']
+        assert config.multipart_threshold == 64 * 1024 * 1024
+        assert config.max_concurrency == 16
+    
+    @patch('src.s3_client.boto3')
+    def test_download_file_bandwidth_callback(self, mock_boto3):
+        """Test the bandwidth limit is applied through the boto3 progress callback"""
+        mock_s3 = MagicMock()
+        mock_boto3.client.return_value = mock_s3
+        bucket = TokenBucket(1024)
+        
+        client = S3Client("key", "secret", "us-east-1", "bucket", bandwidth=bucket)
+        client.download_file("file.txt", "/tmp/file.txt")
+        
+        mock_s3.download_file.assert_called_once_with("bucket", "file.txt", "/tmp/file.txt", Callback=bucket.consume)
+        assert client.clone().bandwidth is bucket
+    
+    @patch('src.s3_client.boto3')
+    def test_download_file_retried(self, mock_boto3):
+        """Test a download interrupted by a network error is retried under the retry policy"""
+        mock_s3 = MagicMock()
+        mock_boto3.client.return_value = mock_s3
+        mock_s3.download_file.side_effect = [EndpointConnectionError(endpoint_url='https://s3'), None]
+        sleeps = []
+        
+        client = S3Client("key", "secret", "us-east-1", "bucket", retry=RetryPolicy(sleep=sleeps.append))
+        
+        assert client.download_file("file.txt", "/tmp/file.txt") is True
+        assert mock_s3.download_file.call_count == 2
+        assert len(sleeps) == 1
+    
     @patch('src.s3_client.boto3')
     def test_download_file_error(self, mock_boto3, tmp_path):
         """Test download file with error"""
@@ -119,6 +162,63 @@ class TestS3Client:
         
         assert result is False
     
+    @patch('src.s3_client.boto3')
+    def test_open_stream(self, mock_boto3):
+        """Test open_stream returns the GetObject body and its size"""
+        mock_s3 = MagicMock()
+        mock_boto3.client.return_value = mock_s3
+        body = MagicMock()
+        mock_s3.get_object.return_value = {'Body': body, 'ContentLength': 42}
+        
+        client = S3Client("key", "secret", "us-east-1", "bucket")
+        
+        assert client.open_stream("file.txt") == (body, 42)
+        mock_s3.get_object.assert_called_once_with(Bucket="bucket", Key="file.txt")
+    
+    @patch('src.s3_client.boto3')
+    def test_open_stream_error(self, mock_boto3):
+        """Test open_stream returns None when the object cannot be read"""
+        mock_s3 = MagicMock()
+        mock_boto3.client.return_value = mock_s3
+        mock_s3.get_object.side_effect = ClientError(
+            {'Error': {'Code': '404', 'Message': 'Not Found'}},
+            'get_object'
+        )
+        
+        client = S3Client("key", "secret", "us-east-1", "bucket")
+        
+        assert client.open_stream("file.txt") is None
+    
+    @patch('src.s3_client.boto3')
+    def test_read_range(self, mock_boto3):
+        """Test read_range issues a ranged GetObject and returns the total size"""
+        mock_s3 = MagicMock()
+        mock_boto3.client.return_value = mock_s3
+        mock_s3.get_object.return_value = {
+            'Body': MagicMock(read=Mock(return_value=b'abcd')),
+            'ContentRange': 'bytes 10-13/100'
+        }
+        
+        client = S3Client("key", "secret", "us-east-1", "bucket")
+        
+        assert client.read_range("file.txt", 10, 4) == (b'abcd', 100)
+        mock_s3.get_object.assert_called_once_with(Bucket="bucket", Key="file.txt", Range="bytes=10-13")
+    
+    @patch('src.s3_client.boto3')
+    def test_read_range_empty_object(self, mock_boto3):
+        """Test reading the first range of an empty object returns no bytes"""
+        mock_s3 = MagicMock()
+        mock_boto3.client.return_value = mock_s3
+        mock_s3.get_object.side_effect = ClientError(
+            {'Error': {'Code': 'InvalidRange', 'Message': 'Not satisfiable'}},
+            'get_object'
+        )
+        
+        client = S3Client("key", "secret", "us-east-1", "bucket")
+        
+        assert client.read_range("empty.txt", 0, 1024) == (b'', 0)
+        assert client.read_range("empty.txt", 5, 1024) is None
+    
     @patch('src.s3_client.boto3')
     def test_file_exists_true(self, mock_boto3):
         """Test file_exists returns True"""
@@ -229,3 +329,68 @@ class TestS3Client:
         assert len(files) == 2
         assert files[0]['key'] == 'dir1/file.txt'
         assert files[1]['key'] == 'file.txt'
+    
+    @patch('src.s3_client.boto3')
+    def test_list_files_follows_continuation_token(self, mock_boto3):
+        """Test that list_files follows ContinuationToken across pages"""
+        mock_s3 = MagicMock()
+        mock_boto3.client.return_value = mock_s3
+        mock_s3.list_objects_v2.side_effect = [
+            {
+                'Contents': [{'Key': 'a.txt', 'Size': 1, 'LastModified': '2024-01-01', 'ETag': '"a"'}],
+                'IsTruncated': True,
+                'NextContinuationToken': 'token-2'
+            },
+            {
+                'Contents': [{'Key': 'b.txt', 'Size': 2, 'LastModified': '2024-01-01', 'ETag': '"b"'}],
+                'IsTruncated': False
+            }
+        ]
+        
+        client = S3Client("key", "secret", "us-east-1", "bucket")
+        files = client.list_files()
+        
+        assert [f['key'] for f in files] == ['a.txt', 'b.txt']
+        assert mock_s3.list_objects_v2.call_count == 2
+        second_call = mock_s3.list_objects_v2.call_args_list[1][1]
+        assert second_call['ContinuationToken'] == 'token-2'
+    
+    @patch('src.s3_client.boto3')
+    def test_iter_files_is_lazy(self, mock_boto3):
+        """Test that iter_files yields the first page before fetching the next"""
+        mock_s3 = MagicMock()
+        mock_boto3.client.return_value = mock_s3
+        mock_s3.list_objects_v2.side_effect = [
+            {
+                'Contents': [{'Key': 'a.txt', 'Size': 1, 'LastModified': '2024-01-01', 'ETag': '"a"'}],
+                'IsTruncated': True,
+                'NextContinuationToken': 'token-2'
+            },
+            {
+                'Contents': [{'Key': 'b.txt', 'Size': 2, 'LastModified': '2024-01-01', 'ETag': '"b"'}],
+                'IsTruncated': False
+            }
+        ]
+        
+        client = S3Client("key", "secret", "us-east-1", "bucket")
+        files = client.iter_files()
+        
+        first = next(files)
+        assert first['key'] == 'a.txt'
+        assert mock_s3.list_objects_v2.call_count == 1
+        
+        rest = list(files)
+        assert [f['key'] for f in rest] == ['b.txt']
+        assert mock_s3.list_objects_v2.call_count == 2
+    
+    @patch('src.s3_client.boto3')
+    def test_clone_builds_own_boto3_client(self, mock_boto3):
+        """Test clone() gives a copy with the same configuration and a new boto3 client"""
+        mock_boto3.client.side_effect = [Mock(), Mock()]
+        
+        client = S3Client("key", "secret", "us-east-1", "bucket", endpoint_url="http://localhost:9000")
+        clone = client.clone()
+        
+        assert clone.bucket_name == "bucket"
+        assert clone.s3_client is not client.s3_client
+        assert mock_boto3.client.call_args_list[0] == mock_boto3.client.call_args_list[1]
@@ -0,0 +1,102 @@
+"""
+Unit tests for S3 Inventory listing
+"""
+
+import gzip
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.s3_client import S3Client
+from src.s3_inventory import S3InventoryReader, normalize_prefixes
+
+
+def write_inventory(directory, rows, schema="Bucket, Key, Size, LastModifiedDate, ETag"):
+    """Write a CSV S3 Inventory report (manifest.json + one gzipped data file)"""
+    data_dir = directory / "data"
+    data_dir.mkdir()
+    with gzip.open(data_dir / "part-0.csv.gz", "wt") as f:
+        for row in rows:
+            f.write(",".join(f'"{value}"' for value in row) + "\n")
+    
+    manifest = {
+        "sourceBucket": "bucket",
+        "destinationBucket": "arn:aws:s3:::inventory-bucket",
+        "fileFormat": "CSV",
+        "fileSchema": schema,
+        "creationTimestamp": "1704067200000",
+        "files": [{"key": "bucket/config/data/part-0.csv.gz", "size": 1, "MD5checksum": "x"}]
+    }
+    (directory / "manifest.json").write_text(json.dumps(manifest))
+    return str(directory)
+
+
+class TestS3InventoryReader:
+    """Test suite for S3InventoryReader"""
+    
+    def test_reads_csv_inventory(self, tmp_path):
+        """Test reading objects from a gzipped CSV inventory"""
+        path = write_inventory(tmp_path, [
+            ("bucket", "docs/my+file.txt", "10", "2024-01-01T00:00:00.000Z", "abc"),
+            ("bucket", "root.txt", "20", "2024-01-02T00:00:00.000Z", "def"),
+        ])
+        
+        reader = S3InventoryReader(path)
+        objects = list(reader.iter_objects())
+        
+        assert reader.source_bucket == "bucket"
+        assert reader.creation_time.year == 2024
+        assert [o['Key'] for o in objects] == ["docs/my file.txt", "root.txt"]
+        assert objects[0]['Size'] == 10
+        assert objects[0]['ETag'] == "abc"
+        assert objects[0]['LastModified'].day == 1
+    
+    def test_skips_old_versions_and_delete_markers(self, tmp_path):
+        """Test versioned inventories only yield current, non-deleted objects"""
+        schema = "Bucket, Key, VersionId, IsLatest, IsDeleteMarker, Size, LastModifiedDate, ETag"
+        path = write_inventory(tmp_path, [
+            ("bucket", "a.txt", "v2", "true", "false", "1", "2024-01-01T00:00:00.000Z", "a2"),
+            ("bucket", "a.txt", "v1", "false", "false", "1", "2024-01-01T00:00:00.000Z", "a1"),
+            ("bucket", "b.txt", "v1", "true", "true", "0", "2024-01-01T00:00:00.000Z", ""),
+        ], schema=schema)
+        
+        objects = list(S3InventoryReader(path).iter_objects())
+        
+        assert [(o['Key'], o['ETag']) for o in objects] == [("a.txt", "a2")]
+    
+    def test_missing_manifest(self, tmp_path):
+        """Test a missing manifest raises FileNotFoundError"""
+        with pytest.raises(FileNotFoundError):
+            S3InventoryReader(str(tmp_path))
+    
+    def test_normalize_prefixes(self):
+        """Test overlapping live prefixes are collapsed"""
+        assert normalize_prefixes(["logs/2024/", "logs/", "", "data/"]) == ["data/", "logs/"]
+
+
+class TestS3ClientInventory:
+    """Test suite for S3Client inventory listing"""
+    
+    def test_list_files_from_inventory_with_live_prefix(self, tmp_path):
+        """Test inventory listing filters markers and refreshes live prefixes with LIST"""
+        path = write_inventory(tmp_path, [
+            ("bucket", "archive/", "0", "2024-01-01T00:00:00.000Z", "m"),
+            ("bucket", "archive/old.txt", "5", "2024-01-01T00:00:00.000Z", "o"),
+            ("bucket", "incoming/deleted.txt", "5", "2024-01-01T00:00:00.000Z", "d"),
+        ])
+        
+        with mock_aws():
+            s3 = boto3.client('s3', region_name='us-east-1')
+            s3.create_bucket(Bucket='bucket')
+            s3.put_object(Bucket='bucket', Key='incoming/new.txt', Body=b'new')
+            
+            client = S3Client(
+                "key", "secret", "us-east-1", "bucket",
+                inventory_manifest=path,
+                inventory_live_prefixes=["incoming/"]
+            )
+            keys = [f['key'] for f in client.list_files()]
+        
+        assert keys == ["archive/old.txt", "incoming/new.txt"]
@@ -0,0 +1,100 @@
+"""
+Unit tests for the parallel prefix-sharded S3 lister
+"""
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.s3_client import S3Client
+from src.s3_parallel_lister import ParallelS3Lister
+
+
+KEYS = [
+    'a.txt',
+    'a/1.txt', 'a/2.txt', 'a/3.txt',
+    'a/deep/x.txt', 'a/deep/y.txt', 'a/deep/z.txt',
+    'b/1.txt',
+    'c/', 'c/1.txt', 'c/2.txt', 'c/3.txt', 'c/4.txt',
+    'root.txt',
+]
+
+
+@pytest.fixture
+def s3_bucket():
+    """Moto-backed bucket with a small nested key space"""
+    with mock_aws():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='bucket')
+        for key in KEYS:
+            body = b'' if key.endswith('/') else b'data'
+            s3.put_object(Bucket='bucket', Key=key, Body=body)
+        yield
+
+
+@pytest.fixture
+def flat_bucket():
+    """Moto-backed bucket with one flat prefix and no '/' below it"""
+    with mock_aws():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='bucket')
+        keys = [f'logs/{n:03d}.log' for n in range(40)] + [f'logs/{c}-{n}' for c in 'AMZ_amz' for n in range(3)]
+        for key in keys:
+            s3.put_object(Bucket='bucket', Key=key, Body=b'data')
+        yield sorted(keys)
+
+
+class TestParallelS3Lister:
+    """Test suite for ParallelS3Lister"""
+    
+    def test_matches_sequential_listing(self, s3_bucket):
+        """Test parallel listing returns the same keys in the same order"""
+        sequential = S3Client("key", "secret", "us-east-1", "bucket")
+        parallel = S3Client("key", "secret", "us-east-1", "bucket", list_parallelism=4)
+        
+        # Tiny pages force the lister to split prefixes recursively
+        sequential.PAGE_SIZE = 2
+        parallel.PAGE_SIZE = 2
+        
+        expected = [f['key'] for f in sequential.list_files()]
+        actual = [f['key'] for f in parallel.list_files()]
+        
+        assert actual == expected
+        assert actual == sorted(actual)
+        assert 'c/' not in actual
+    
+    def test_reports_shard_stats(self, s3_bucket):
+        """Test every shard reports keys and keys per second"""
+        client = S3Client("key", "secret", "us-east-1", "bucket")
+        client.PAGE_SIZE = 2
+        
+        lister = ParallelS3Lister(client, parallelism=4)
+        objects = list(lister.iter_objects())
+        
+        assert len(objects) == len(KEYS)
+        assert sum(s['keys'] for s in lister.last_shard_stats) == len(KEYS)
+        assert len(lister.last_shard_stats) > 1
+        assert all('keys_per_second' in s for s in lister.last_shard_stats)
+    
+    def test_max_split_depth_lists_remaining_pages(self, s3_bucket):
+        """Test a shard at the depth limit is listed completely without splitting"""
+        client = S3Client("key", "secret", "us-east-1", "bucket")
+        client.PAGE_SIZE = 2
+        
+        lister = ParallelS3Lister(client, parallelism=2, max_split_depth=0)
+        keys = [obj['Key'] for obj in lister.iter_objects()]
+        
+        assert keys == sorted(KEYS)
+        assert len(lister.last_shard_stats) == 1
+    
+    def test_flat_prefix_is_split_into_key_ranges(self, flat_bucket):
+        """Test a prefix without sub-prefixes is listed as StartAfter key ranges"""
+        client = S3Client("key", "secret", "us-east-1", "bucket")
+        client.PAGE_SIZE = 4
+        
+        lister = ParallelS3Lister(client, parallelism=4)
+        keys = [obj['Key'] for obj in lister.iter_objects('logs/')]
+        
+        assert keys == flat_bucket
+        assert sum(s['keys'] for s in lister.last_shard_stats) == len(flat_bucket)
+        assert sum(1 for s in lister.last_shard_stats if s['prefix'].startswith('logs/ (')) > 4
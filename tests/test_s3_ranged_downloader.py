@@ -0,0 +1,231 @@
+"""
+Unit tests for the ranged S3 downloader
+"""
+
+import os
+from unittest.mock import patch
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError, ReadTimeoutError
+from moto import mock_aws
+
+from src.bandwidth import TokenBucket
+from src.retry import RetryPolicy
+from src.s3_client import S3Client
+from src.s3_ranged_downloader import RangedDownloader
+
+BUCKET = 'test-bucket'
+DATA = os.urandom(100 * 1024 + 17)
+
+
+@pytest.fixture
+def s3_client():
+    """S3Client backed by a moto bucket holding one object"""
+    with mock_aws():
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket=BUCKET)
+        client = S3Client('key', 'secret', 'us-east-1', BUCKET)
+        client.s3_client.put_object(Bucket=BUCKET, Key='big.bin', Body=DATA)
+        client.s3_client.put_object(Bucket=BUCKET, Key='empty.bin', Body=b'')
+        yield client
+
+
+class TestRangedDownloader:
+    """Test suite for RangedDownloader"""
+    
+    def test_parts_reassemble_object(self, s3_client, tmp_path):
+        """Test concurrent parts are written at their offsets into one identical file"""
+        local_path = str(tmp_path / 'big.bin')
+        downloader = RangedDownloader(s3_client, part_size=10 * 1024, workers=4, threshold=10 * 1024)
+        
+        stats = downloader.download('big.bin', local_path)
+        
+        with open(local_path, 'rb') as f:
+            assert f.read() == DATA
+        assert stats['bytes'] == len(DATA)
+        assert stats['parts'] == 11
+        assert stats['mib_per_second'] >= 0
+    
+    def test_small_object_single_request(self, s3_client, tmp_path):
+        """Test objects below the threshold are fetched with one request"""
+        downloader = RangedDownloader(s3_client, part_size=1024, threshold=len(DATA) + 1)
+        
+        stats = downloader.download('big.bin', str(tmp_path / 'big.bin'))
+        
+        assert stats['parts'] == 1
+    
+    def test_parts_charged_to_bandwidth(self, s3_client, tmp_path):
+        """Test every byte written is taken from the client's token bucket"""
+        s3_client.bandwidth = TokenBucket(10 ** 12)
+        downloader = RangedDownloader(s3_client, part_size=10 * 1024, workers=4, threshold=10 * 1024)
+        
+        downloader.download('big.bin', str(tmp_path / 'big.bin'))
+        
+        assert s3_client.bandwidth.bytes == len(DATA)
+    
+    def test_empty_object(self, s3_client, tmp_path):
+        """Test an empty object yields an empty file without part requests"""
+        local_path = tmp_path / 'empty.bin'
+        
+        stats = RangedDownloader(s3_client).download('empty.bin', str(local_path))
+        
+        assert stats['parts'] == 0
+        assert local_path.read_bytes() == b''
+    
+    def test_missing_object_raises(self, s3_client, tmp_path):
+        """Test a missing object raises the client error"""
+        with pytest.raises(ClientError):
+            RangedDownloader(s3_client).download('missing.bin', str(tmp_path / 'missing.bin'))
+    
+    def test_download_file_uses_ranged_download(self, tmp_path):
+        """Test S3Client.download_file routes through the ranged downloader and keeps its stats"""
+        with mock_aws():
+            boto3.client('s3', region_name='us-east-1').create_bucket(Bucket=BUCKET)
+            client = S3Client(
+                'key', 'secret', 'us-east-1', BUCKET,
+                multipart_threshold=8 * 1024, multipart_chunksize=8 * 1024, max_concurrency=3,
+                ranged_download=True
+            )
+            client.s3_client.put_object(Bucket=BUCKET, Key='big.bin', Body=DATA)
+            local_path = tmp_path / 'big.bin'
+            
+            assert client.download_file('big.bin', str(local_path)) is True
+            assert client.download_file('missing.bin', str(tmp_path / 'missing.bin')) is False
+        
+        assert local_path.read_bytes() == DATA
+        assert client.last_download_stats['parts'] == 13
+
+
+class FlakyBody:
+    """Response body that drops the connection after a number of bytes"""
+    
+    def __init__(self, body, fail_after):
+        self.body = body
+        self.remaining = fail_after
+    
+    def read(self, size):
+        if self.remaining <= 0:
+            raise ReadTimeoutError(endpoint_url='http://s3.example')
+        data = self.body.read(min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+    
+    def close(self):
+        self.body.close()
+
+
+class TestRangedDownloaderResume:
+    """Test suite for resuming interrupted ranges"""
+    
+    def flaky(self, s3_client, failures, fail_after=4096):
+        """Make the first get_object responses break after fail_after bytes"""
+        get_object = s3_client.s3_client.get_object
+        calls = []
+        
+        def flaky_get_object(**kwargs):
+            calls.append(kwargs)
+            response = get_object(**kwargs)
+            if len(calls) <= failures:
+                response['Body'] = FlakyBody(response['Body'], fail_after)
+            return response
+        
+        s3_client.s3_client.get_object = flaky_get_object
+        return calls
+    
+    def test_resumes_from_last_written_byte(self, s3_client, tmp_path):
+        """Test an interrupted range continues where it stopped, guarded by the ETag"""
+        calls = self.flaky(s3_client, failures=2)
+        local_path = tmp_path / 'big.bin'
+        downloader = RangedDownloader(s3_client, workers=1, threshold=float('inf'), retries=3, retry_delay=0)
+        
+        stats = downloader.download('big.bin', str(local_path))
+        
+        assert local_path.read_bytes() == DATA
+        assert stats['resumes'] == 2
+        assert [c['Range'] for c in calls] == [
+            f'bytes=0-{len(DATA) - 1}', f'bytes=4096-{len(DATA) - 1}', f'bytes=8192-{len(DATA) - 1}'
+        ]
+        assert all(c['IfMatch'] == calls[0]['IfMatch'] for c in calls)
+    
+    def test_gives_up_after_retries(self, s3_client, tmp_path):
+        """Test the error surfaces once the retries are used up"""
+        self.flaky(s3_client, failures=3)
+        downloader = RangedDownloader(s3_client, workers=1, threshold=float('inf'), retries=2, retry_delay=0)
+        
+        with pytest.raises(ReadTimeoutError):
+            downloader.download('big.bin', str(tmp_path / 'big.bin'))
+    
+    def test_changed_object_is_not_resumed(self, s3_client, tmp_path):
+        """Test a resume against a replaced object fails instead of mixing versions"""
+        get_object = s3_client.s3_client.get_object
+        
+        def replace_then_get(**kwargs):
+            if kwargs['Range'] != f'bytes=0-{len(DATA) - 1}':
+                s3_client.s3_client.put_object(Bucket=BUCKET, Key='big.bin', Body=b'new')
+            response = get_object(**kwargs)
+            if kwargs['Range'].startswith('bytes=0-'):
+                response['Body'] = FlakyBody(response['Body'], 4096)
+            return response
+        
+        s3_client.s3_client.get_object = replace_then_get
+        downloader = RangedDownloader(s3_client, workers=1, threshold=float('inf'), retries=3, retry_delay=0)
+        
+        with pytest.raises(ClientError) as error:
+            downloader.download('big.bin', str(tmp_path / 'big.bin'))
+        assert error.value.response['Error']['Code'] == 'PreconditionFailed'
+    
+    def test_download_file_resumes_with_retries(self, s3_client, tmp_path):
+        """Test plain S3Client downloads resume when download_retries is set"""
+        self.flaky(s3_client, failures=1)
+        s3_client.download_retries = 2
+        local_path = tmp_path / 'big.bin'
+        
+        with patch('src.s3_ranged_downloader.time.sleep'):
+            assert s3_client.download_file('big.bin', str(local_path)) is True
+        
+        assert local_path.read_bytes() == DATA
+        assert s3_client.last_download_stats['resumes'] == 1
+    
+    def test_head_object_is_retried(self, s3_client, tmp_path):
+        """Test a transient HeadObject failure goes through the retry policy"""
+        s3_client.retry = RetryPolicy(max_retries=2, sleep=lambda delay: None)
+        head_object = s3_client.s3_client.head_object
+        calls = []
+        
+        def flaky_head_object(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise ReadTimeoutError(endpoint_url='http://s3.example')
+            return head_object(**kwargs)
+        
+        s3_client.s3_client.head_object = flaky_head_object
+        local_path = tmp_path / 'big.bin'
+        
+        RangedDownloader(s3_client, part_size=8 * 1024, threshold=0).download('big.bin', str(local_path))
+        
+        assert len(calls) == 2
+        assert local_path.read_bytes() == DATA
+    
+    def test_policy_retry_skips_completed_parts(self, s3_client, tmp_path):
+        """Test a download retried by the policy keeps the file and refetches only failed parts"""
+        s3_client.retry = RetryPolicy(max_retries=2, sleep=lambda delay: None)
+        get_object = s3_client.s3_client.get_object
+        calls = []
+        failing_range = 'bytes=16384-24575'
+        
+        def get_object_failing_once(**kwargs):
+            calls.append(kwargs['Range'])
+            response = get_object(**kwargs)
+            if kwargs['Range'] == failing_range and calls.count(failing_range) == 1:
+                response['Body'] = FlakyBody(response['Body'], 1024)
+            return response
+        
+        s3_client.s3_client.get_object = get_object_failing_once
+        local_path = tmp_path / 'big.bin'
+        downloader = RangedDownloader(s3_client, part_size=8 * 1024, workers=2, threshold=0)
+        
+        stats = downloader.download('big.bin', str(local_path))
+        
+        assert local_path.read_bytes() == DATA
+        assert calls.count(failing_range) == 2
+        assert len(calls) == stats['parts'] + 1
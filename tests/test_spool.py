@@ -0,0 +1,85 @@
+"""
+Unit tests for the transfer spool manager
+"""
+
+import os
+import threading
+import time
+
+from src.spool import SpoolManager
+
+
+class TestSpoolManager:
+    """Test suite for SpoolManager"""
+    
+    def test_small_objects_in_memory(self, tmp_path):
+        """Test objects up to the memory threshold get an in-memory buffer"""
+        spool = SpoolManager(str(tmp_path), memory_threshold=100)
+        
+        with spool.acquire(100) as buffer:
+            assert buffer.in_memory
+            buffer.file.write(b'x' * 100)
+            assert buffer.media().getbytes(0, 100) == b'x' * 100
+        
+        assert os.listdir(tmp_path) == []
+        assert spool.stats()['peak_memory_bytes'] == 100
+    
+    def test_large_objects_spooled_to_directory(self, tmp_path):
+        """Test larger objects get a file in the spool directory, removed afterwards"""
+        spool = SpoolManager(str(tmp_path / 'spool'), memory_threshold=100)
+        
+        with spool.acquire(101) as buffer:
+            assert not buffer.in_memory
+            assert os.path.dirname(buffer.path) == str(tmp_path / 'spool')
+            assert os.path.exists(buffer.path)
+            path = buffer.path
+        
+        assert not os.path.exists(path)
+        assert spool.stats()['peak_disk_bytes'] == 101
+    
+    def test_unknown_size_goes_to_disk(self, tmp_path):
+        """Test objects of unknown size are spooled to disk"""
+        spool = SpoolManager(str(tmp_path), memory_threshold=100)
+        
+        with spool.acquire(None) as buffer:
+            assert not buffer.in_memory
+    
+    def test_waits_for_budget(self, tmp_path):
+        """Test a transfer that does not fit waits until another releases its buffer"""
+        spool = SpoolManager(str(tmp_path), max_bytes=100)
+        order = []
+        
+        def second():
+            with spool.acquire(60):
+                order.append('second acquired')
+        
+        with spool.acquire(60):
+            thread = threading.Thread(target=second)
+            thread.start()
+            time.sleep(0.1)
+            order.append('first released')
+        thread.join()
+        
+        assert order == ['first released', 'second acquired']
+        stats = spool.stats()
+        assert stats['waits'] == 1
+        assert stats['peak_disk_bytes'] == 60
+    
+    def test_oversized_object_runs_alone(self, tmp_path):
+        """Test an object larger than the whole budget still goes through when nothing else is in flight"""
+        spool = SpoolManager(str(tmp_path), max_bytes=10)
+        
+        with spool.acquire(50) as buffer:
+            assert buffer.size == 50
+        
+        assert spool.stats()['waits'] == 0
+    
+    def test_reset_stats(self, tmp_path):
+        """Test peaks restart from the current usage"""
+        spool = SpoolManager(str(tmp_path), memory_threshold=100)
+        with spool.acquire(80):
+            pass
+        
+        spool.reset_stats()
+        
+        assert spool.stats()['peak_memory_bytes'] == 0
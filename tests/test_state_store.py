@@ -0,0 +1,109 @@
+"""
+Unit tests for the sync state store
+"""
+
+import pytest
+
+from src.state_store import SyncStateStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """State store in a temporary database"""
+    state_store = SyncStateStore(str(tmp_path / "state.db"))
+    yield state_store
+    state_store.close()
+
+
+class TestSyncStateStore:
+    """Test suite for SyncStateStore"""
+    
+    def test_record_and_get(self, store):
+        """Test recording a synced file"""
+        store.record('docs/a.txt', 'docs/a.txt', 'drive-1', parent_id='folder-1', etag='e1', size=10)
+        
+        record = store.get('docs/a.txt')
+        
+        assert record['id'] == 'drive-1'
+        assert record['parent_id'] == 'folder-1'
+        assert record['etag'] == 'e1'
+        assert record['size'] == 10
+        assert store.get('missing.txt') is None
+    
+    def test_record_update_keeps_parent(self, store):
+        """Test updating content keeps the stored parent folder"""
+        store.record('a.txt', 'a.txt', 'drive-1', parent_id='folder-1', etag='e1', size=10)
+        store.record('a.txt', 'a.txt', 'drive-1', etag='e2', size=20)
+        
+        record = store.get('a.txt')
+        
+        assert record['parent_id'] == 'folder-1'
+        assert record['etag'] == 'e2'
+        assert record['size'] == 20
+    
+    def test_record_update_drops_old_md5(self, store):
+        """Test re-recorded content does not keep the md5Checksum of the previous content"""
+        store.record('a.txt', 'a.txt', 'drive-1', etag='e1', size=10, md5='m1')
+        store.record('a.txt', 'a.txt', 'drive-1', etag='e2', size=10)
+        
+        assert store.get('a.txt')['md5'] is None
+    
+    def test_remove(self, store):
+        """Test removing a record"""
+        store.record('a.txt', 'a.txt', 'drive-1')
+        store.remove('a.txt')
+        
+        assert store.load_all() == {}
+    
+    def test_persists_across_instances(self, tmp_path):
+        """Test records survive reopening the database"""
+        path = str(tmp_path / "state.db")
+        first = SyncStateStore(path)
+        first.record('a.txt', 'a.txt', 'drive-1', etag='e1', size=1)
+        first.close()
+        
+        second = SyncStateStore(path)
+        assert second.get('a.txt')['etag'] == 'e1'
+        second.close()
+    
+    def test_rebuild_from_listing_keeps_etags(self, store):
+        """Test verification keeps ETags only for unchanged Drive IDs"""
+        store.record('same.txt', 'same.txt', 'drive-1', etag='e1', size=1)
+        store.record('replaced.txt', 'replaced.txt', 'drive-2', etag='e2', size=1)
+        store.record('gone.txt', 'gone.txt', 'drive-3', etag='e3', size=1)
+        
+        merged = store.rebuild_from_listing({
+            'same.txt': {'id': 'drive-1', 'name': 'same.txt', 'size': 1, 'md5': 'm1'},
+            'replaced.txt': {'id': 'drive-9', 'name': 'replaced.txt', 'size': 1},
+        })
+        
+        assert merged['same.txt']['etag'] == 'e1'
+        assert merged['replaced.txt']['etag'] is None
+        assert set(store.load_all()) == {'same.txt', 'replaced.txt'}
+        assert store.get('same.txt')['md5'] == 'm1'
+    
+    def test_incomplete_listing_keeps_unlisted_records(self, store):
+        """Test a listing that skipped folders neither erases their records nor counts as verification"""
+        store.record('seen.txt', 'seen.txt', 'drive-1', etag='e1', size=1)
+        store.record('skipped/a.txt', 'skipped/a.txt', 'drive-2', etag='e2', size=1)
+        
+        merged = store.rebuild_from_listing({
+            'seen.txt': {'id': 'drive-1', 'name': 'seen.txt', 'size': 2, 'md5': 'm1'}
+        }, complete=False)
+        
+        assert set(merged) == {'seen.txt', 'skipped/a.txt'}
+        assert merged['skipped/a.txt']['etag'] == 'e2'
+        assert store.get('seen.txt')['size'] == 2
+        assert store.get('skipped/a.txt')['id'] == 'drive-2'
+        assert store.verification_due(3600) is True
+    
+    def test_verification_due(self, store):
+        """Test verification scheduling and invalidation"""
+        assert store.verification_due(3600) is True
+        
+        store.rebuild_from_listing({})
+        assert store.verification_due(3600) is False
+        assert store.verification_due(0) is True
+        
+        store.invalidate_verification()
+        assert store.verification_due(3600) is True
@@ -0,0 +1,206 @@
+"""
+Unit tests for streaming S3 bodies into Google Drive resumable uploads
+"""
+
+import io
+import json
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+from googleapiclient.http import HttpMockSequence, HttpRequest
+
+from src.streaming import PrefetchReader, StreamingMediaUpload, StreamReadError, StreamRewindError
+
+CHUNK = 256 * 1024
+
+
+class ForwardOnlyStream:
+    """Non-seekable stream, like an S3 GetObject body"""
+    
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+    
+    def read(self, size=-1):
+        return self._data.read(size)
+
+
+class TestStreamingMediaUpload:
+    """Test suite for StreamingMediaUpload"""
+    
+    def test_sequential_chunks(self):
+        """Test chunks are served in order and the last one is short"""
+        data = bytes(range(256)) * 5000
+        media = StreamingMediaUpload(ForwardOnlyStream(data), len(data), chunksize=CHUNK)
+        
+        chunks = []
+        offset = 0
+        while offset < len(data):
+            chunk = media.getbytes(offset, CHUNK)
+            chunks.append(chunk)
+            offset += len(chunk)
+        
+        assert b''.join(chunks) == data
+        assert len(chunks[-1]) < CHUNK
+        assert media.size() == len(data)
+        assert media.resumable() is True
+        assert media.has_stream() is False
+    
+    def test_memory_bounded_to_one_chunk(self):
+        """Test only the current chunk is buffered"""
+        data = b'x' * (10 * CHUNK)
+        media = StreamingMediaUpload(ForwardOnlyStream(data), len(data), chunksize=CHUNK)
+        
+        for offset in range(0, len(data), CHUNK):
+            media.getbytes(offset, CHUNK)
+            assert len(media._buffer) <= CHUNK
+    
+    def test_retry_within_last_chunk(self):
+        """Test a partially accepted chunk can be re-read from the server's offset"""
+        data = bytes(range(256)) * 4096
+        media = StreamingMediaUpload(ForwardOnlyStream(data), len(data), chunksize=CHUNK)
+        
+        media.getbytes(0, CHUNK)
+        assert media.getbytes(1000, CHUNK) == data[1000:1000 + CHUNK]
+    
+    def test_rewind_raises(self):
+        """Test asking for bytes before the buffered chunk raises StreamRewindError"""
+        data = b'y' * (3 * CHUNK)
+        media = StreamingMediaUpload(ForwardOnlyStream(data), len(data), chunksize=CHUNK)
+        media.getbytes(0, CHUNK)
+        media.getbytes(CHUNK, CHUNK)
+        
+        with pytest.raises(StreamRewindError):
+            media.getbytes(0, CHUNK)
+    
+    def test_read_error_raises(self):
+        """Test a failing source read raises StreamReadError"""
+        stream = Mock()
+        stream.read.side_effect = ConnectionResetError("reset")
+        media = StreamingMediaUpload(stream, 10, chunksize=CHUNK)
+        
+        with pytest.raises(StreamReadError):
+            media.getbytes(0, CHUNK)
+    
+    def test_resumable_upload_through_client_library(self):
+        """Test the Google API client drives a full resumable upload from the stream"""
+        data = b'z' * (CHUNK + 1000)
+        media = StreamingMediaUpload(ForwardOnlyStream(data), len(data), chunksize=CHUNK)
+        http = HttpMockSequence([
+            ({'status': '200', 'location': 'http://upload.example/session'}, ''),
+            ({'status': '308', 'range': f'0-{CHUNK - 1}'}, ''),
+            ({'status': '200'}, json.dumps({'id': 'file-1'}))
+        ])
+        request = HttpRequest(
+            http, lambda resp, content: json.loads(content), 'http://upload.example/files',
+            method='POST', body='{}', headers={'content-type': 'application/json'}, resumable=media
+        )
+        
+        assert request.execute() == {'id': 'file-1'}
+        assert media._buffer_start == CHUNK
+
+
+class RangeSource:
+    """Ranged reads over bytes, recording the requested ranges"""
+    
+    def __init__(self, data, delay=0.0, fail_at=None):
+        self.data = data
+        self.delay = delay
+        self.fail_at = fail_at
+        self.calls = []
+    
+    def __call__(self, start, length):
+        self.calls.append((start, length))
+        time.sleep(self.delay)
+        if start == self.fail_at:
+            return None
+        return self.data[start:start + length], len(self.data)
+
+
+class TestPrefetchReader:
+    """Test suite for PrefetchReader"""
+    
+    def test_reads_whole_object_in_order(self):
+        """Test the reader returns every byte once, in order, across chunk boundaries"""
+        data = bytes(range(256)) * 40
+        source = RangeSource(data)
+        reader = PrefetchReader(source, len(data), chunksize=1000, depth=2, first_chunk=data[:1000])
+        
+        out = b''.join(iter(lambda: reader.read(333), b''))
+        reader.close()
+        
+        assert out == data
+        assert source.calls[0] == (1000, 1000)
+        assert source.calls[-1] == (10000, 240)
+    
+    def test_feeds_streaming_upload(self):
+        """Test the reader works as the source of a streaming upload"""
+        data = b'x' * (3 * CHUNK + 7)
+        reader = PrefetchReader(RangeSource(data), len(data), chunksize=CHUNK)
+        media = StreamingMediaUpload(reader, len(data), chunksize=CHUNK)
+        
+        chunks = [media.getbytes(offset, CHUNK) for offset in range(0, len(data), CHUNK)]
+        reader.close()
+        
+        assert b''.join(chunks) == data
+    
+    def test_prefetches_while_consumer_works(self):
+        """Test later chunks are fetched while the current one is being consumed"""
+        data = b'y' * 5000
+        source = RangeSource(data, delay=0.05)
+        reader = PrefetchReader(source, len(data), chunksize=1000, depth=4)
+        
+        start = time.monotonic()
+        while reader.read(1000):
+            time.sleep(0.05)  # Simulated upload of the chunk
+        elapsed = time.monotonic() - start
+        reader.close()
+        
+        # Sequential fetch + send would take 5 * (0.05 + 0.05) = 0.5s
+        assert elapsed < 0.45
+    
+    def test_depth_bounds_read_ahead(self):
+        """Test no more than depth chunks are fetched ahead of the reader"""
+        data = b'z' * 10000
+        source = RangeSource(data)
+        reader = PrefetchReader(source, len(data), chunksize=1000, depth=2)
+        
+        reader.read(1000)
+        time.sleep(0.3)
+        
+        # The chunk being read, depth queued chunks and one blocked in put()
+        assert len(source.calls) <= 4
+        reader.close()
+    
+    def test_resumed_upload_seeks_instead_of_reading(self):
+        """Test a streaming upload starting past byte 0 restarts the prefetch at that offset"""
+        data = bytes(range(256)) * 16
+        source = RangeSource(data)
+        reader = PrefetchReader(source, len(data), chunksize=1024, first_chunk=data[:1024])
+        media = StreamingMediaUpload(reader, len(data), chunksize=1024)
+        
+        assert media.getbytes(3072, 1024) == data[3072:]
+        reader.close()
+        
+        assert source.calls == [(3072, 1024)]
+    
+    def test_failed_range_raises(self):
+        """Test a failed ranged read surfaces to the reader"""
+        data = b'w' * 3000
+        reader = PrefetchReader(RangeSource(data, fail_at=1000), len(data), chunksize=1000)
+        
+        assert reader.read(1000) == data[:1000]
+        with pytest.raises(IOError):
+            reader.read(1000)
+        reader.close()
+    
+    def test_close_stops_prefetch_thread(self):
+        """Test closing an unfinished reader stops the background thread"""
+        data = b'v' * 100000
+        reader = PrefetchReader(RangeSource(data), len(data), chunksize=100, depth=1)
+        reader.read(10)
+        
+        reader.close()
+        
+        assert not any(t.name == 's3-prefetch' and t.is_alive() for t in threading.enumerate())
@@ -2,11 +2,27 @@
 Integration tests for Sync Manager
 """
 
+import os
+import threading
+import time
 from unittest.mock import MagicMock, Mock, patch
 
+import httplib2
 import pytest
+from googleapiclient.errors import HttpError
 
+from src.folder_cache import FolderCache
+from src.spool import SpoolManager
+from src.state_store import SyncStateStore
+from src.streaming import STREAM_CHUNK_SIZE, StreamingMediaUpload, StreamRewindError
 from src.sync_manager import SyncManager
+from src.transfer_scheduler import TransferScheduler
+from src.upload_journal import UploadJournal
+
+
+def http_error(status):
+    """HttpError as returned by the Drive API"""
+    return HttpError(httplib2.Response({'status': str(status)}), b'{}')
 
 
 class TestSyncManager:
@@ -119,9 +135,9 @@ class TestSyncManager:
             assert stats['unchanged'] == 1 # unchanged.txt
             assert stats['errors'] == 0
     
-    @patch('src.sync_manager.tempfile.NamedTemporaryFile')
-    @patch('src.sync_manager.os.path.exists')
-    @patch('src.sync_manager.os.remove')
+    @patch('src.spool.tempfile.NamedTemporaryFile')
+    @patch('src.spool.os.path.exists')
+    @patch('src.spool.os.remove')
     def test_upload_file_success(self, mock_remove, mock_exists, mock_tempfile, 
                                   mock_s3_client, mock_gdrive_client):
         """Test _upload_file method success"""
@@ -139,9 +155,9 @@ class TestSyncManager:
         mock_gdrive_client.upload_file.assert_called_once_with('/tmp/test123', 'test.txt')
         mock_remove.assert_called_once()
     
-    @patch('src.sync_manager.tempfile.NamedTemporaryFile')
-    @patch('src.sync_manager.os.path.exists')
-    @patch('src.sync_manager.os.remove')
+    @patch('src.spool.tempfile.NamedTemporaryFile')
+    @patch('src.spool.os.path.exists')
+    @patch('src.spool.os.remove')
     def test_upload_file_download_failure(self, mock_remove, mock_exists, mock_tempfile,
                                           mock_s3_client, mock_gdrive_client):
         """Test _upload_file when S3 download fails"""
@@ -159,9 +175,9 @@ class TestSyncManager:
         assert result is False
         mock_gdrive_client.upload_file.assert_not_called()
     
-    @patch('src.sync_manager.tempfile.NamedTemporaryFile')
-    @patch('src.sync_manager.os.path.exists')
-    @patch('src.sync_manager.os.remove')
+    @patch('src.spool.tempfile.NamedTemporaryFile')
+    @patch('src.spool.os.path.exists')
+    @patch('src.spool.os.remove')
     def test_update_file_success(self, mock_remove, mock_exists, mock_tempfile,
                                  mock_s3_client, mock_gdrive_client):
         """Test _update_file method success"""
@@ -294,9 +310,9 @@ class TestSyncManagerPreserveStructure:
             # Should be called with flattened name
             mock_upload.assert_called_once_with('docs_readme.md', 'docs/readme.md')
     
-    @patch('src.sync_manager.tempfile.NamedTemporaryFile')
-    @patch('src.sync_manager.os.path.exists')
-    @patch('src.sync_manager.os.remove')
+    @patch('src.spool.tempfile.NamedTemporaryFile')
+    @patch('src.spool.os.path.exists')
+    @patch('src.spool.os.remove')
     def test_upload_file_with_folders(self, mock_remove, mock_exists, mock_tempfile,
                                      mock_s3_client, mock_gdrive_client):
         """Test _upload_file creates folders when preserve_structure=True"""
@@ -316,12 +332,95 @@ class TestSyncManagerPreserveStructure:
         mock_s3_client.download_file.assert_called_once_with('docs/images/logo.png', '/tmp/test123')
         # Should upload to correct folder with just filename
         mock_gdrive_client.upload_file.assert_called_once_with('/tmp/test123', 'logo.png', 'folder-id-123')
+    
+    @patch('src.spool.tempfile.NamedTemporaryFile')
+    @patch('src.spool.os.path.exists')
+    @patch('src.spool.os.remove')
+    def test_folder_cache_warmed_from_listing(self, mock_remove, mock_exists, mock_tempfile,
+                                              mock_s3_client, mock_gdrive_client):
+        """Test folders seen by the Drive listing are resolved without API calls"""
+        mock_temp = MagicMock()
+        mock_temp.name = '/tmp/test123'
+        mock_tempfile.return_value.__enter__.return_value = mock_temp
+        mock_exists.return_value = True
+        mock_s3_client.list_files.return_value = [
+            {'key': 'docs/images/new.png', 'size': 100, 'etag': 'abc', 'last_modified': '2024-01-01'}
+        ]
+        mock_gdrive_client.list_files_with_folders.side_effect = None
+        mock_gdrive_client.list_files_with_folders.return_value = (
+            [], {'docs': 'folder-docs', 'docs/images': 'folder-images'}
+        )
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=True)
+        stats = manager.sync()
+        
+        assert stats['uploaded'] == 1
+        mock_gdrive_client.get_or_create_path.assert_not_called()
+        mock_gdrive_client.upload_file.assert_called_once_with('/tmp/test123', 'new.png', 'folder-images')
+    
+    @patch('src.spool.tempfile.NamedTemporaryFile')
+    @patch('src.spool.os.path.exists')
+    @patch('src.spool.os.remove')
+    def test_stale_cached_folder_is_re_resolved(self, mock_remove, mock_exists, mock_tempfile,
+                                                mock_s3_client, mock_gdrive_client):
+        """Test a 404 upload into a cached folder drops its subtree and retries once"""
+        mock_temp = MagicMock()
+        mock_temp.name = '/tmp/test123'
+        mock_tempfile.return_value.__enter__.return_value = mock_temp
+        mock_exists.return_value = True
+        mock_gdrive_client.upload_file.side_effect = [http_error(404), 'file-id-new']
+        mock_gdrive_client.get_or_create_path.return_value = 'folder-new'
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=True)
+        manager.folder_cache.update({'docs': 'folder-gone', 'docs/sub': 'folder-gone-sub', 'other': 'folder-ok'})
+        result = manager._upload_file('docs/readme.md', 'docs/readme.md')
+        
+        assert result is True
+        mock_gdrive_client.get_or_create_path.assert_called_once_with('docs')
+        assert mock_gdrive_client.upload_file.call_args_list[-1][0] == ('/tmp/test123', 'readme.md', 'folder-new')
+        assert manager.folder_cache == {'docs': 'folder-new', 'other': 'folder-ok'}
+    
+    @pytest.mark.parametrize('failure', [None, http_error(403), http_error(503), ConnectionResetError()])
+    def test_cached_folder_kept_on_other_failures(self, failure, mock_s3_client, mock_gdrive_client, tmp_path):
+        """Test failures other than a Drive 404 leave the folder cache alone"""
+        mock_s3_client.download_fileobj.return_value = True
+        mock_gdrive_client.upload_media.side_effect = [failure]
+        spool = SpoolManager(str(tmp_path), memory_threshold=1024)
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=True, spool=spool)
+        manager._s3_map = {'docs/readme.md': {'key': 'docs/readme.md', 'size': 4}}
+        manager.folder_cache.update({'docs': 'folder-docs', 'docs/sub': 'folder-sub'})
+        
+        assert manager._upload_file('docs/readme.md', 'docs/readme.md') is False
+        
+        assert mock_gdrive_client.upload_media.call_count == 1
+        mock_gdrive_client.get_or_create_path.assert_not_called()
+        assert manager.folder_cache == {'docs': 'folder-docs', 'docs/sub': 'folder-sub'}
+    
+    def test_folder_cache_saved_after_sync(self, tmp_path, mock_s3_client, mock_gdrive_client):
+        """Test the folder cache is persisted at the end of a sync"""
+        path = str(tmp_path / "folders.json")
+        mock_gdrive_client.list_files_with_folders.side_effect = None
+        mock_gdrive_client.list_files_with_folders.return_value = ([], {'docs': 'folder-docs'})
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, folder_cache=FolderCache(path, 'test-folder-id'))
+        manager.sync()
+        
+        assert FolderCache(path, 'test-folder-id') == {'docs': 'folder-docs'}
+    
+    def test_folder_cache_replaced_on_listing(self, mock_s3_client, mock_gdrive_client):
+        """Test folders missing from a fresh listing are dropped from the cache"""
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=True)
+        manager.folder_cache.update({'deleted': 'folder-gone'})
+        
+        manager.sync()
+        
+        assert manager.folder_cache == {}
 
 
 class TestSyncManagerErrorHandling:
     """Test suite for error handling"""
     
-    @patch('src.sync_manager.tempfile.NamedTemporaryFile')
+    @patch('src.spool.tempfile.NamedTemporaryFile')
     def test_upload_file_exception_handling(self, mock_tempfile, mock_s3_client, mock_gdrive_client):
         """Test _upload_file handles exceptions"""
         mock_tempfile.side_effect = Exception("Temp file error")
@@ -331,7 +430,7 @@ class TestSyncManagerErrorHandling:
         
         assert result is False
     
-    @patch('src.sync_manager.tempfile.NamedTemporaryFile')
+    @patch('src.spool.tempfile.NamedTemporaryFile')
     def test_update_file_exception_handling(self, mock_tempfile, mock_s3_client, mock_gdrive_client):
         """Test _update_file handles exceptions"""
         mock_tempfile.side_effect = Exception("Temp file error")
@@ -372,3 +471,512 @@ class TestSyncManagerErrorHandling:
             
             assert stats['errors'] == 1
             assert stats['updated'] == 0
+
+
+class TestSyncManagerEvents:
+    """Test suite for event-driven incremental sync"""
+    
+    def test_sync_events_created_and_removed(self, mock_s3_client, mock_gdrive_client):
+        """Test created keys are uploaded or updated and removed keys deleted"""
+        mock_gdrive_client.find_path.return_value = 'folder-docs'
+        mock_gdrive_client.find_file_by_name.side_effect = lambda name, parent=None: (
+            {'id': 'existing-id', 'name': name} if name in ('changed.txt', 'gone.txt') else None
+        )
+        events = [
+            {'action': 'created', 'key': 'docs/new.txt', 'size': 10, 'sequencer': '01'},
+            {'action': 'created', 'key': 'docs/changed.txt', 'size': 10, 'sequencer': '02'},
+            {'action': 'removed', 'key': 'docs/gone.txt', 'size': None, 'sequencer': '03'},
+        ]
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=True)
+        
+        with patch.object(manager, '_upload_file', return_value=True) as mock_upload, \
+             patch.object(manager, '_update_file', return_value=True) as mock_update:
+            stats = manager.sync_events(events)
+        
+        assert stats['uploaded'] == 1
+        assert stats['updated'] == 1
+        assert stats['deleted'] == 1
+        mock_upload.assert_called_once_with('docs/new.txt', 'docs/new.txt')
+        mock_update.assert_called_once_with('docs/changed.txt', 'existing-id', 'docs/changed.txt')
+        mock_gdrive_client.delete_file.assert_called_once_with('existing-id', 'docs/gone.txt')
+        mock_gdrive_client.list_files.assert_not_called()
+        mock_s3_client.list_files.assert_not_called()
+        # Folder resolved once, then served from cache
+        mock_gdrive_client.find_path.assert_called_once_with('docs')
+    
+    def test_sync_events_keeps_latest_event_per_key(self, mock_s3_client, mock_gdrive_client):
+        """Test events for the same key are coalesced by sequencer"""
+        mock_gdrive_client.find_file_by_name.return_value = None
+        events = [
+            {'action': 'removed', 'key': 'a.txt', 'sequencer': '0B'},
+            {'action': 'created', 'key': 'a.txt', 'size': 1, 'sequencer': '0A'},
+        ]
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client)
+        
+        with patch.object(manager, '_upload_file', return_value=True) as mock_upload:
+            stats = manager.sync_events(events)
+        
+        mock_upload.assert_not_called()
+        assert stats['uploaded'] == 0
+        assert stats['unchanged'] == 1
+    
+    def test_sync_events_removed_missing_folder(self, mock_s3_client, mock_gdrive_client):
+        """Test removing a key whose folder does not exist creates nothing"""
+        mock_gdrive_client.find_path.return_value = None
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client)
+        stats = manager.sync_events([{'action': 'removed', 'key': 'dir/a.txt', 'sequencer': '01'}])
+        
+        assert stats['errors'] == 0
+        mock_gdrive_client.get_or_create_path.assert_not_called()
+        mock_gdrive_client.delete_file.assert_not_called()
+
+
+class TestSyncManagerStateStore:
+    """Test suite for sync with a persistent state store"""
+    
+    def test_first_sync_lists_drive_and_records_uploads(self, mock_s3_client, mock_gdrive_client, tmp_path):
+        """Test the first run verifies against Drive and records uploads"""
+        store = SyncStateStore(str(tmp_path / "state.db"))
+        mock_s3_client.list_files.return_value = [
+            {'key': 'new.txt', 'size': 10, 'etag': 'e1', 'last_modified': '2024-01-01'}
+        ]
+        mock_gdrive_client.list_files.return_value = []
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=False, state_store=store)
+        
+        with patch('src.spool.tempfile.NamedTemporaryFile'), \
+             patch('src.spool.os.path.exists', return_value=False):
+            stats = manager.sync()
+        
+        assert stats['uploaded'] == 1
+        mock_gdrive_client.list_files.assert_called_once()
+        record = store.get('new.txt')
+        assert record['id'] == 'file-id-123'
+        assert record['etag'] == 'e1'
+        assert record['parent_id'] == 'test-folder-id'
+    
+    def test_next_sync_uses_store_instead_of_listing(self, mock_s3_client, mock_gdrive_client, tmp_path):
+        """Test later runs diff against the store, detecting ETag changes"""
+        store = SyncStateStore(str(tmp_path / "state.db"))
+        store.rebuild_from_listing({})
+        store.record('same.txt', 'same.txt', 'drive-1', etag='e1', size=10)
+        store.record('edited.txt', 'edited.txt', 'drive-2', etag='old', size=10)
+        store.record('removed.txt', 'removed.txt', 'drive-3', etag='e3', size=10)
+        mock_s3_client.list_files.return_value = [
+            {'key': 'same.txt', 'size': 10, 'etag': 'e1', 'last_modified': '2024-01-01'},
+            {'key': 'edited.txt', 'size': 10, 'etag': 'new', 'last_modified': '2024-01-02'},
+        ]
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, state_store=store)
+        
+        with patch.object(manager, '_update_file', return_value=True) as mock_update:
+            stats = manager.sync()
+        
+        mock_gdrive_client.list_files.assert_not_called()
+        mock_update.assert_called_once_with('edited.txt', 'drive-2', 'edited.txt')
+        assert stats['unchanged'] == 1
+        assert stats['deleted'] == 1
+        assert store.get('removed.txt') is None
+    
+    def test_incomplete_listing_does_not_erase_store(self, mock_s3_client, mock_gdrive_client, tmp_path):
+        """Test files in folders the listing skipped are neither re-uploaded nor forgotten"""
+        store = SyncStateStore(str(tmp_path / "state.db"))
+        store.record('skipped/a.txt', 'skipped/a.txt', 'drive-1', etag='e1', size=10)
+        mock_s3_client.list_files.return_value = [
+            {'key': 'skipped/a.txt', 'size': 10, 'etag': 'e1', 'last_modified': '2024-01-01'}
+        ]
+        mock_gdrive_client.last_list_stats = {'errors': 1}
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, state_store=store)
+        manager.folder_cache.update({'skipped': 'folder-skipped'})
+        
+        stats = manager.sync()
+        
+        assert stats['uploaded'] == 0
+        assert stats['unchanged'] == 1
+        assert store.get('skipped/a.txt')['id'] == 'drive-1'
+        assert manager.folder_cache == {'skipped': 'folder-skipped'}
+    
+    def test_incomplete_listing_without_store_aborts(self, mock_s3_client, mock_gdrive_client):
+        """Test a partial listing aborts the sync instead of re-uploading the unlisted files"""
+        mock_s3_client.list_files.return_value = [{'key': 'a.txt', 'size': 10, 'etag': 'e1'}]
+        mock_gdrive_client.last_list_stats = {'errors': 1}
+        manager = SyncManager(mock_s3_client, mock_gdrive_client)
+        
+        with pytest.raises(RuntimeError):
+            manager.sync()
+        mock_gdrive_client.upload_file.assert_not_called()
+    
+    def test_failed_delete_forces_verification(self, mock_s3_client, mock_gdrive_client, tmp_path):
+        """Test a failed delete of a stored file schedules a Drive verification"""
+        store = SyncStateStore(str(tmp_path / "state.db"))
+        store.rebuild_from_listing({})
+        store.record('stale.txt', 'stale.txt', 'drive-1', etag='e1', size=10)
+        mock_gdrive_client.delete_file.return_value = False
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, state_store=store)
+        stats = manager.sync()
+        
+        assert stats['errors'] == 1
+        assert store.verification_due(3600) is True
+    
+    @pytest.mark.parametrize("status, deleted", [(404, True), (500, False)])
+    def test_raised_delete_error(self, mock_s3_client, mock_gdrive_client, tmp_path, status, deleted):
+        """Test a raising client: 404 drops the stale record, other errors force a verification"""
+        store = SyncStateStore(str(tmp_path / "state.db"))
+        store.rebuild_from_listing({})
+        store.record('stale.txt', 'stale.txt', 'drive-1', etag='e1', size=10)
+        mock_gdrive_client.delete_file.side_effect = http_error(status)
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, state_store=store)
+        stats = manager.sync()
+        
+        assert stats['deleted'] == int(deleted)
+        assert stats['errors'] == int(not deleted)
+        assert (store.get('stale.txt') is None) is deleted
+        assert store.verification_due(3600) is not deleted
+    
+    def test_sync_uses_remote_view(self, mock_s3_client, mock_gdrive_client):
+        """Test a Changes API remote view replaces the recursive Drive listing"""
+        remote_view = Mock()
+        remote_view.files.return_value = [{'id': 'gd-1', 'name': 'old.txt', 'size': 1}]
+        remote_view.folders.return_value = {}
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, remote_view=remote_view)
+        stats = manager.sync()
+        
+        remote_view.refresh.assert_called_once_with(mock_gdrive_client)
+        mock_gdrive_client.list_files.assert_not_called()
+        assert stats['deleted'] == 1
+
+
+class TestSyncManagerConcurrentTransfers:
+    """Test suite for transfers through multiple workers"""
+    
+    def test_parallel_sync_stats(self, mock_s3_client, mock_gdrive_client):
+        """Test a sync with several workers gives the same stats as a sequential one"""
+        mock_s3_client.list_files.return_value = [
+            {'key': f'new{n}.txt', 'size': 1, 'etag': 'e'} for n in range(20)
+        ] + [{'key': 'changed.txt', 'size': 2, 'etag': 'e'}]
+        mock_gdrive_client.list_files.return_value = [
+            {'id': 'gd-changed', 'name': 'changed.txt', 'size': 1},
+            {'id': 'gd-old', 'name': 'old.txt', 'size': 1}
+        ]
+        mock_s3_client.clone.return_value = mock_s3_client
+        mock_gdrive_client.clone.return_value = mock_gdrive_client
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, transfer_workers=4)
+        with patch.object(manager, '_upload_file', return_value=True), \
+                patch.object(manager, '_update_file', return_value=True):
+            stats = manager.sync()
+        
+        assert stats == {'uploaded': 20, 'updated': 1, 'deleted': 1, 'errors': 0, 'unchanged': 0}
+        assert mock_gdrive_client.clone.call_count == 4
+        assert mock_s3_client.clone.call_count == 4
+    
+    def test_workers_use_own_clients(self, mock_s3_client, mock_gdrive_client):
+        """Test transfers in a worker go through that worker's cloned clients"""
+        worker_drive = Mock()
+        worker_drive.delete_file.return_value = True
+        mock_gdrive_client.clone.return_value = worker_drive
+        mock_gdrive_client.list_files.return_value = [{'id': 'gd-old', 'name': 'old.txt', 'size': 1}]
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, transfer_workers=2)
+        stats = manager.sync()
+        
+        assert stats['deleted'] == 1
+        worker_drive.delete_file.assert_called_once_with('gd-old', 'old.txt')
+        mock_gdrive_client.delete_file.assert_not_called()
+        assert manager.gdrive_client is mock_gdrive_client
+    
+    def test_folder_creation_is_serialized(self, mock_s3_client, mock_gdrive_client):
+        """Test concurrent resolution of the same new folder creates it only once"""
+        def slow_create(path):
+            time.sleep(0.01)
+            return f'folder-{path}'
+        
+        mock_gdrive_client.get_or_create_path.side_effect = slow_create
+        manager = SyncManager(mock_s3_client, mock_gdrive_client)
+        
+        threads = [threading.Thread(target=manager._get_gdrive_folder_for_path, args=('docs',)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        mock_gdrive_client.get_or_create_path.assert_called_once_with('docs')
+    
+    def test_large_files_in_own_lane(self, mock_s3_client, mock_gdrive_client):
+        """Test large files run in the large-file lane, smallest first, stats merged"""
+        mock_s3_client.list_files.return_value = [
+            {'key': 'huge.bin', 'size': 10 ** 9, 'etag': 'e'},
+            {'key': 'b.txt', 'size': 20, 'etag': 'e'},
+            {'key': 'a.txt', 'size': 10, 'etag': 'e'},
+            {'key': 'same.bin', 'size': 10 ** 9, 'etag': 'e'}
+        ]
+        mock_gdrive_client.list_files.return_value = [{'id': 'gd-same', 'name': 'same.bin', 'size': 10 ** 9}]
+        mock_s3_client.clone.return_value = mock_s3_client
+        mock_gdrive_client.clone.return_value = mock_gdrive_client
+        uploads = []
+        
+        def upload(identifier, key):
+            uploads.append((threading.current_thread().name, identifier))
+            return True
+        
+        scheduler = TransferScheduler('smallest', large_threshold=1024)
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, scheduler=scheduler)
+        with patch.object(manager, '_upload_file', side_effect=upload):
+            stats = manager.sync()
+        
+        assert stats == {'uploaded': 3, 'updated': 0, 'deleted': 0, 'errors': 0, 'unchanged': 1}
+        assert [i for t, i in uploads if t != 'transfer-large'] == ['a.txt', 'b.txt']
+        assert [i for t, i in uploads if t == 'transfer-large'] == ['huge.bin']
+
+
+class TestSyncManagerStreaming:
+    """Test suite for streaming transfers without temporary files"""
+    
+    def test_upload_streams_from_s3(self, mock_s3_client, mock_gdrive_client):
+        """Test uploads go from GetObject straight into upload_media"""
+        body = Mock()
+        body.read.side_effect = [b'abc', b'']
+        mock_s3_client.open_stream.return_value = (body, 3)
+        mock_gdrive_client.upload_media.return_value = 'file-id-123'
+        mock_gdrive_client.get_or_create_path.return_value = 'folder-docs'
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, streaming=True)
+        
+        with patch('src.spool.tempfile.NamedTemporaryFile') as mock_tempfile:
+            assert manager._upload_file('docs/a.txt', 'docs/a.txt') is True
+            mock_tempfile.assert_not_called()
+        
+        media, filename, folder_id = mock_gdrive_client.upload_media.call_args[0]
+        assert isinstance(media, StreamingMediaUpload)
+        assert media.size() == 3
+        assert (filename, folder_id) == ('a.txt', 'folder-docs')
+        mock_s3_client.download_file.assert_not_called()
+        body.close.assert_called_once()
+    
+    def test_update_streams_from_s3(self, mock_s3_client, mock_gdrive_client):
+        """Test updates go from GetObject straight into update_media"""
+        mock_s3_client.open_stream.return_value = (Mock(), 10)
+        mock_gdrive_client.update_media.return_value = True
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, streaming=True)
+        
+        assert manager._update_file('a.txt', 'gd-1', 'a.txt') is True
+        mock_gdrive_client.update_media.assert_called_once()
+        mock_gdrive_client.update_file.assert_not_called()
+    
+    @patch('src.spool.tempfile.NamedTemporaryFile')
+    @patch('src.spool.os.path.exists')
+    @patch('src.spool.os.remove')
+    def test_falls_back_to_temp_file(self, mock_remove, mock_exists, mock_tempfile,
+                                     mock_s3_client, mock_gdrive_client):
+        """Test a stream that cannot be re-read falls back to the temporary file path"""
+        mock_temp = MagicMock()
+        mock_temp.name = '/tmp/test123'
+        mock_tempfile.return_value.__enter__.return_value = mock_temp
+        mock_exists.return_value = True
+        mock_s3_client.open_stream.return_value = (Mock(), 10)
+        mock_gdrive_client.upload_media.side_effect = StreamRewindError("rewind")
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=False, streaming=True)
+        
+        assert manager._upload_file('a.txt', 'a.txt') is True
+        mock_s3_client.download_file.assert_called_once_with('a.txt', '/tmp/test123')
+        mock_gdrive_client.upload_file.assert_called_once_with('/tmp/test123', 'a.txt')
+    
+    def test_stream_failure_keeps_folder_cache(self, mock_s3_client, mock_gdrive_client, tmp_path):
+        """Test a stream failure into a cached folder goes to the spool without invalidating the cache"""
+        mock_s3_client.open_stream.return_value = (Mock(), 4)
+        mock_s3_client.download_fileobj.return_value = True
+        mock_gdrive_client.upload_media.side_effect = [StreamRewindError("rewind"), 'file-id-123']
+        spool = SpoolManager(str(tmp_path), memory_threshold=1024)
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, streaming=True, spool=spool)
+        manager._s3_map = {'a/x.txt': {'key': 'a/x.txt', 'size': 4}}
+        manager.folder_cache.update({'a': 'folder-a', 'a/b': 'folder-b'})
+        
+        assert manager._upload_file('a/x.txt', 'a/x.txt') is True
+        
+        mock_s3_client.open_stream.assert_called_once_with('a/x.txt')
+        mock_s3_client.download_fileobj.assert_called_once()
+        mock_gdrive_client.get_or_create_path.assert_not_called()
+        assert manager.folder_cache == {'a': 'folder-a', 'a/b': 'folder-b'}
+        assert mock_gdrive_client.upload_media.call_args[0][2] == 'folder-a'
+    
+    def test_s3_read_error_falls_back_to_spool(self, mock_s3_client, mock_gdrive_client, tmp_path):
+        """Test a dropped S3 stream falls back to a spool buffer instead of failing the file"""
+        body = Mock()
+        body.read.side_effect = ConnectionResetError("reset")
+        mock_s3_client.open_stream.return_value = (body, 4)
+        mock_s3_client.download_fileobj.return_value = True
+        
+        def upload_media(media, filename, folder_id=None, **kwargs):
+            media.getbytes(0, media.chunksize())
+            return 'file-id-123'
+        
+        mock_gdrive_client.upload_media.side_effect = upload_media
+        spool = SpoolManager(str(tmp_path), memory_threshold=1024)
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=False,
+                              streaming=True, spool=spool)
+        manager._s3_map = {'a.txt': {'key': 'a.txt', 'size': 4}}
+        
+        assert manager._upload_file('a.txt', 'a.txt') is True
+        
+        mock_s3_client.download_fileobj.assert_called_once()
+        body.close.assert_called_once()
+    
+    def test_prefetch_uses_ranged_reads(self, mock_s3_client, mock_gdrive_client):
+        """Test prefetch_depth streams through ranged reads instead of one GetObject"""
+        mock_s3_client.read_range.side_effect = lambda key, start, length: (b'abc'[start:start + length], 3)
+        uploaded = []
+        
+        def upload_media(media, filename, folder_id=None):
+            uploaded.append(media.getbytes(0, media.chunksize()))
+            return 'file-id-123'
+        
+        mock_gdrive_client.upload_media.side_effect = upload_media
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=False,
+                              streaming=True, prefetch_depth=2)
+        
+        assert manager._upload_file('a.txt', 'a.txt') is True
+        assert uploaded == [b'abc']
+        mock_s3_client.read_range.assert_called_once_with('a.txt', 0, STREAM_CHUNK_SIZE)
+        mock_s3_client.open_stream.assert_not_called()
+    
+    def test_open_failure_is_an_error(self, mock_s3_client, mock_gdrive_client):
+        """Test an S3 object that cannot be opened fails the upload"""
+        mock_s3_client.open_stream.return_value = None
+        
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=False, streaming=True)
+        
+        assert manager._upload_file('a.txt', 'a.txt') is False
+        mock_gdrive_client.upload_media.assert_not_called()
+
+
+class TestSyncManagerUploadJournal:
+    """Test suite for resuming interrupted uploads through the upload journal"""
+    
+    @pytest.fixture
+    def journal(self, tmp_path):
+        journal = UploadJournal(str(tmp_path / 'uploads.db'))
+        yield journal
+        journal.close()
+    
+    def test_progress_journaled_and_cleared_on_success(self, mock_s3_client, mock_gdrive_client, journal):
+        """Test committed chunks are journaled and the session is dropped once the upload completes"""
+        mock_s3_client.open_stream.return_value = (Mock(), 10)
+        journaled = []
+        
+        def upload_media(media, filename, folder_id=None, session_uri=None, on_progress=None):
+            on_progress('http://session/1', 5)
+            journaled.append(journal.get('a.txt', 'create', 'etag-1'))
+            return 'file-id-123'
+        
+        mock_gdrive_client.upload_media.side_effect = upload_media
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=False,
+                              streaming=True, upload_journal=journal)
+        manager._s3_map = {'a.txt': {'key': 'a.txt', 'etag': 'etag-1', 'size': 10}}
+        
+        assert manager._upload_file('a.txt', 'a.txt') is True
+        assert journaled == [{'session_uri': 'http://session/1', 'committed': 5}]
+        assert journal.get('a.txt', 'create', 'etag-1') is None
+    
+    def test_interrupted_upload_resumes_saved_session(self, mock_s3_client, mock_gdrive_client, journal):
+        """Test the next run passes the saved session when the S3 ETag is unchanged"""
+        journal.save('a.txt', 'gd-1', 'etag-1', 'http://session/1', 5)
+        mock_gdrive_client.update_file.return_value = True
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, upload_journal=journal)
+        manager._s3_map = {'a.txt': {'key': 'a.txt', 'etag': 'etag-1', 'size': 10}}
+        
+        with patch('src.spool.tempfile.NamedTemporaryFile') as mock_tempfile:
+            mock_tempfile.return_value.__enter__.return_value.name = '/tmp/test123'
+            assert manager._update_file('a.txt', 'gd-1', 'a.txt') is True
+        
+        kwargs = mock_gdrive_client.update_file.call_args[1]
+        assert kwargs['session_uri'] == 'http://session/1'
+    
+    def test_changed_object_starts_new_session(self, mock_s3_client, mock_gdrive_client, journal):
+        """Test a saved session is not reused when the S3 object changed"""
+        journal.save('a.txt', 'gd-1', 'etag-old', 'http://session/1', 5)
+        mock_s3_client.open_stream.return_value = (Mock(), 10)
+        mock_gdrive_client.update_media.return_value = True
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, streaming=True, upload_journal=journal)
+        manager._s3_map = {'a.txt': {'key': 'a.txt', 'etag': 'etag-new', 'size': 10}}
+        
+        assert manager._update_file('a.txt', 'gd-1', 'a.txt') is True
+        assert mock_gdrive_client.update_media.call_args[1]['session_uri'] is None
+
+
+class TestSyncManagerSpool:
+    """Test suite for spooled transfer buffers"""
+    
+    def test_small_file_stays_in_memory(self, mock_s3_client, mock_gdrive_client, tmp_path):
+        """Test small objects are downloaded into memory and uploaded without a temporary file"""
+        mock_s3_client.download_fileobj.side_effect = lambda key, fileobj: fileobj.write(b'data') or True
+        mock_gdrive_client.upload_media.return_value = 'file-id-123'
+        spool = SpoolManager(str(tmp_path), memory_threshold=1024)
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=False, spool=spool)
+        manager._s3_map = {'a.txt': {'key': 'a.txt', 'size': 4}}
+        
+        assert manager._upload_file('a.txt', 'a.txt') is True
+        
+        media, filename = mock_gdrive_client.upload_media.call_args[0]
+        assert media.getbytes(0, 4) == b'data'
+        assert filename == 'a.txt'
+        mock_s3_client.download_file.assert_not_called()
+        mock_gdrive_client.upload_file.assert_not_called()
+    
+    def test_large_file_spooled_to_directory(self, mock_s3_client, mock_gdrive_client, tmp_path):
+        """Test larger objects go through a file in the spool directory"""
+        mock_s3_client.download_file.return_value = True
+        mock_gdrive_client.update_file.return_value = True
+        spool = SpoolManager(str(tmp_path), memory_threshold=1024)
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, spool=spool)
+        manager._s3_map = {'a.txt': {'key': 'a.txt', 'size': 4096}}
+        
+        assert manager._update_file('a.txt', 'gd-1', 'a.txt') is True
+        
+        path = mock_gdrive_client.update_file.call_args[0][1]
+        assert path.startswith(str(tmp_path))
+        assert os.listdir(tmp_path) == []
+
+
+class TestSyncManagerContentCheck:
+    """Test suite for content (ETag) change detection"""
+    
+    def test_same_size_edit_updated(self, mock_s3_client, mock_gdrive_client):
+        """Test a same-size edit is found through the Drive md5Checksum"""
+        mock_s3_client.list_files.return_value = [
+            {'key': 'edited.txt', 'size': 100, 'etag': 'a' * 32},
+            {'key': 'same.txt', 'size': 100, 'etag': 'b' * 32}
+        ]
+        mock_gdrive_client.list_files.return_value = [
+            {'id': 'drive-1', 'name': 'edited.txt', 'size': 100, 'md5': 'c' * 32},
+            {'id': 'drive-2', 'name': 'same.txt', 'size': 100, 'md5': 'b' * 32}
+        ]
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, content_check=True)
+        
+        with patch.object(manager, '_update_file', return_value=True) as mock_update:
+            stats = manager.sync()
+        
+        assert stats['updated'] == 1
+        assert stats['unchanged'] == 1
+        mock_update.assert_called_once_with('edited.txt', 'drive-1', 'edited.txt')
+    
+    def test_upload_stamped_with_etag(self, mock_s3_client, mock_gdrive_client, tmp_path):
+        """Test uploads record the S3 ETag in appProperties"""
+        mock_s3_client.download_fileobj.return_value = True
+        mock_gdrive_client.upload_media.return_value = 'file-id-123'
+        spool = SpoolManager(str(tmp_path), memory_threshold=1024)
+        manager = SyncManager(mock_s3_client, mock_gdrive_client, preserve_structure=False,
+                              spool=spool, content_check=True)
+        manager._s3_map = {'a.txt': {'key': 'a.txt', 'size': 4, 'etag': 'abc-2'}}
+        
+        assert manager._upload_file('a.txt', 'a.txt') is True
+        
+        assert mock_gdrive_client.upload_media.call_args[1]['app_properties'] == {'s3_etag': 'abc-2'}
@@ -0,0 +1,105 @@
+"""
+Unit tests for the transfer engine worker pool
+"""
+
+import threading
+import time
+
+from src.transfer_engine import TransferEngine
+
+
+def new_stats():
+    return {'uploaded': 0, 'updated': 0, 'deleted': 0, 'errors': 0, 'unchanged': 0}
+
+
+class TestTransferEngine:
+    """Test suite for TransferEngine"""
+    
+    def test_single_worker_runs_inline_in_order(self):
+        """Test one worker runs every task in the calling thread, in order"""
+        calls = []
+        caller = threading.get_ident()
+        
+        def task(n):
+            calls.append((n, threading.get_ident()))
+            return True
+        
+        stats = TransferEngine(1).run([('uploaded', lambda n=n: task(n)) for n in range(5)], new_stats())
+        
+        assert [n for n, _ in calls] == [0, 1, 2, 3, 4]
+        assert all(thread == caller for _, thread in calls)
+        assert stats['uploaded'] == 5
+    
+    def test_stats_aggregate_across_workers(self):
+        """Test successes and failures from all workers are counted exactly once"""
+        tasks = (
+            ('uploaded' if n % 3 else 'deleted', (lambda n=n: n % 5 != 0))
+            for n in range(1000)
+        )
+        
+        stats = TransferEngine(8).run(tasks, new_stats())
+        
+        assert stats['errors'] == 200
+        assert stats['uploaded'] + stats['deleted'] + stats['errors'] == 1000
+    
+    def test_exceptions_count_as_errors(self):
+        """Test a raising task is logged and counted as an error"""
+        def boom():
+            raise RuntimeError("boom")
+        
+        stats = TransferEngine(2).run([('uploaded', boom), ('uploaded', lambda: True)], new_stats())
+        
+        assert stats == {**new_stats(), 'uploaded': 1, 'errors': 1}
+    
+    def test_worker_init_runs_once_per_worker(self):
+        """Test each worker thread is initialized once before running tasks"""
+        initialized = []
+        lock = threading.Lock()
+        
+        def init():
+            with lock:
+                initialized.append(threading.get_ident())
+        
+        engine = TransferEngine(4, worker_init=init)
+        engine.run([('uploaded', lambda: True)] * 20, new_stats())
+        
+        assert len(initialized) == 4
+        assert len(set(initialized)) == 4
+    
+    def test_queue_is_bounded(self):
+        """Test the producer is never more than queue_size tasks ahead of the workers"""
+        produced = 0
+        started = 0
+        max_ahead = 0
+        lock = threading.Lock()
+        
+        def task():
+            nonlocal started
+            with lock:
+                started += 1
+            time.sleep(0.001)
+            return True
+        
+        def tasks():
+            nonlocal produced, max_ahead
+            for _ in range(50):
+                with lock:
+                    produced += 1
+                    max_ahead = max(max_ahead, produced - started)
+                yield 'uploaded', task
+        
+        engine = TransferEngine(2, queue_size=3)
+        stats = engine.run(tasks(), new_stats())
+        
+        assert stats['uploaded'] == 50
+        # Queued tasks + one in each worker's hands + the one being produced
+        assert max_ahead <= 3 + 2 + 1
+    
+    def test_failed_worker_init_counts_errors(self):
+        """Test tasks taken by a worker that failed to initialize count as errors"""
+        def init():
+            raise RuntimeError("no credentials")
+        
+        stats = TransferEngine(2, worker_init=init).run([('uploaded', lambda: True)] * 5, new_stats())
+        
+        assert stats['errors'] == 5
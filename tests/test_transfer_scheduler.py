@@ -0,0 +1,107 @@
+"""
+Unit tests for the size-aware transfer scheduler
+"""
+
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from src.transfer_engine import TransferEngine
+from src.transfer_scheduler import TransferScheduler
+
+S3_MAP = {
+    'big.bin': {'key': 'big.bin', 'size': 5000, 'last_modified': datetime(2024, 1, 1, tzinfo=timezone.utc)},
+    'logs/a.log': {'key': 'logs/a.log', 'size': 10, 'last_modified': datetime(2024, 3, 1, tzinfo=timezone.utc)},
+    'hot/b.txt': {'key': 'hot/b.txt', 'size': 300, 'last_modified': datetime(2024, 2, 1, tzinfo=timezone.utc)},
+    'c.txt': {'key': 'c.txt', 'size': 20, 'last_modified': datetime(2023, 6, 1, tzinfo=timezone.utc)}
+}
+
+
+def new_stats():
+    return {'uploaded': 0, 'updated': 0, 'deleted': 0, 'errors': 0, 'unchanged': 0}
+
+
+class TestTransferScheduler:
+    """Test suite for TransferScheduler ordering"""
+    
+    def test_none_keeps_order(self):
+        """Test the default policy keeps the listing order"""
+        assert TransferScheduler().order(list(S3_MAP), S3_MAP) == list(S3_MAP)
+    
+    def test_smallest_first(self):
+        """Test shortest-job-first ordering by size"""
+        order = TransferScheduler('smallest').order(S3_MAP, S3_MAP)
+        
+        assert order == ['logs/a.log', 'c.txt', 'hot/b.txt', 'big.bin']
+    
+    def test_oldest_first(self):
+        """Test ordering by LastModified"""
+        order = TransferScheduler('oldest').order(S3_MAP, S3_MAP)
+        
+        assert order == ['c.txt', 'big.bin', 'hot/b.txt', 'logs/a.log']
+    
+    def test_prefix_priority(self):
+        """Test priority prefixes go first in the order given, the rest smallest first"""
+        scheduler = TransferScheduler('prefix', priority_prefixes=['hot/', 'big'])
+        
+        assert scheduler.order(S3_MAP, S3_MAP) == ['hot/b.txt', 'big.bin', 'logs/a.log', 'c.txt']
+    
+    def test_unknown_policy(self):
+        """Test an unknown policy is rejected"""
+        with pytest.raises(ValueError, match='Unknown transfer order'):
+            TransferScheduler('largest')
+    
+    def test_split_by_threshold(self):
+        """Test objects at or above the threshold go to the large-file lane"""
+        scheduler = TransferScheduler('smallest', large_threshold=300)
+        
+        assert scheduler.split(S3_MAP, S3_MAP) == (['logs/a.log', 'c.txt'], ['hot/b.txt', 'big.bin'])
+    
+    def test_split_without_threshold(self):
+        """Test everything stays in one lane without a threshold"""
+        small, large = TransferScheduler().split(S3_MAP, S3_MAP)
+        
+        assert len(small) == 4
+        assert large == []
+
+
+class TestRunLanes:
+    """Test suite for running the two lanes side by side"""
+    
+    def test_small_files_pass_a_blocked_large_file(self):
+        """Test small transfers finish while a large one is still running"""
+        release = threading.Event()
+        small_done = []
+        
+        def large_task():
+            return release.wait(5)
+        
+        def small_task(n):
+            small_done.append(n)
+            if len(small_done) == 10:
+                release.set()
+            return True
+        
+        stats = new_stats()
+        large_stats = new_stats()
+        TransferScheduler(large_threshold=1).run_lanes(
+            (TransferEngine(1), [('uploaded', lambda n=n: small_task(n)) for n in range(10)]),
+            (TransferEngine(1), [('uploaded', large_task)]),
+            stats, large_stats
+        )
+        
+        assert stats['uploaded'] == 11
+        assert stats['errors'] == 0
+        assert large_stats['uploaded'] == 1
+    
+    def test_inline_large_lane_initializes_its_thread(self):
+        """Test a single-worker large lane runs worker_init in its own thread"""
+        threads = []
+        engine = TransferEngine(1, worker_init=lambda: threads.append(threading.current_thread().name))
+        
+        TransferScheduler(large_threshold=1).run_lanes(
+            (TransferEngine(1), []), (engine, [('uploaded', lambda: True)]), new_stats(), new_stats()
+        )
+        
+        assert threads == ['transfer-large']
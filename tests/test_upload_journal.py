@@ -0,0 +1,68 @@
+"""
+Unit tests for the resumable upload journal
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from src.upload_journal import SESSION_TTL_SECONDS, UploadJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    """Upload journal in a temporary database"""
+    journal = UploadJournal(str(tmp_path / 'uploads.db'))
+    yield journal
+    journal.close()
+
+
+class TestUploadJournal:
+    """Test suite for UploadJournal"""
+    
+    def test_save_and_get(self, journal):
+        """Test a saved session is returned with its committed bytes"""
+        journal.save('docs/a.bin', 'create', 'etag-1', 'http://session/1', 1024)
+        journal.save('docs/a.bin', 'create', 'etag-1', 'http://session/1', 2048)
+        
+        assert journal.get('docs/a.bin', 'create', 'etag-1') == {
+            'session_uri': 'http://session/1', 'committed': 2048
+        }
+    
+    def test_survives_reopen(self, tmp_path):
+        """Test sessions persist across processes"""
+        path = str(tmp_path / 'uploads.db')
+        first = UploadJournal(path)
+        first.save('a.bin', 'file-1', 'etag-1', 'http://session/1', 10)
+        first.close()
+        
+        second = UploadJournal(path)
+        
+        assert second.get('a.bin', 'file-1', 'etag-1')['session_uri'] == 'http://session/1'
+        second.close()
+    
+    def test_changed_etag_or_target_discards_session(self, journal):
+        """Test a session for other content or another target is dropped"""
+        journal.save('a.bin', 'create', 'etag-1', 'http://session/1', 10)
+        
+        assert journal.get('a.bin', 'create', 'etag-2') is None
+        assert journal.get('a.bin', 'create', 'etag-1') is None
+        
+        journal.save('b.bin', 'create', 'etag-1', 'http://session/2', 10)
+        
+        assert journal.get('b.bin', 'file-9', 'etag-1') is None
+    
+    def test_expired_session_discarded(self, journal):
+        """Test sessions older than the Drive session lifetime are dropped"""
+        with patch('src.upload_journal.time.time', return_value=1000.0):
+            journal.save('a.bin', 'create', 'etag-1', 'http://session/1', 10)
+        
+        with patch('src.upload_journal.time.time', return_value=1000.0 + SESSION_TTL_SECONDS + 1):
+            assert journal.get('a.bin', 'create', 'etag-1') is None
+    
+    def test_remove(self, journal):
+        """Test a completed upload's session is forgotten"""
+        journal.save('a.bin', 'create', 'etag-1', 'http://session/1', 10)
+        journal.remove('a.bin')
+        
+        assert journal.get('a.bin', 'create', 'etag-1') is None